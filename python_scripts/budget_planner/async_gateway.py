@@ -0,0 +1,71 @@
+"""
+async_gateway.py
+----------------
+Asyncio front end for the storage backend.
+
+gspread is blocking, so every read runs on a worker thread
+(asyncio.to_thread) and the event loop is free meanwhile. The services
+ask for all the tables a command needs in one read_tables() call,
+which fetches them in one request (values:batchGet on Sheets), so a
+command that needs users, budget and transactions waits for one round
+trip instead of three. The user lookup that follows is served from
+the users table that call just loaded. (On a backend that filters
+rows, see StorageBackend.filters_rows, the user is looked up first
+instead and only their rows are read.)
+
+Worker threads see the caller's context, so the current command scope
+(unit_of_work.py) still applies: each table is read once per command
+and the shared cache and API scheduler are used as before.
+
+The Typer commands stay synchronous and call run_sync().
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from .storage import Condition, get_backend
+from .table_cache import TableEntry, TableSpec
+
+
+async def call(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Run a blocking function on a worker thread."""
+    return await asyncio.to_thread(func, *args, **kwargs)
+
+
+async def read_table(
+    title: str,
+    headers: Optional[List[str]] = None,
+    error: str = "",
+) -> TableEntry:
+    """Async version of StorageBackend.read_table."""
+    return await call(get_backend().read_table, title, headers, error)
+
+
+async def read_tables(
+    specs: Dict[str, TableSpec],
+    columns: Optional[Dict[str, List[str]]] = None,
+    where: Optional[Dict[str, List[Condition]]] = None,
+) -> Dict[str, TableEntry]:
+    """Async version of StorageBackend.read_tables."""
+    return await call(get_backend().read_tables, specs, columns, where)
+
+
+def run_sync(awaitable: Awaitable[Any]) -> Any:
+    """
+    Run a coroutine to completion from synchronous code.
+
+    Inside an already running event loop it runs on a helper thread
+    with its own loop, so sync wrappers also work when called from
+    async code.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(awaitable)
+    ctx = contextvars.copy_context()
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(ctx.run, asyncio.run, awaitable).result()
@@ -6,13 +6,19 @@ Authentication and password control.
 Responsible for:
 - Secure password hashing using bcrypt.
 - User signup and login functions connected to Google Sheets.
-- Fetch existing users by email.
+- Fetch existing users by email (via an in-memory email index).
 """
 
+import threading
 import uuid
+from typing import Dict, List, Optional, Tuple
+
 import bcrypt
-from .sheets_gateway import get_client, get_sheet
+from .storage import get_backend
+from .table_cache import TableEntry
+from .unit_of_work import current_unit
 from datetime import datetime
+from ..utilities.constants import ROLE_HEADERS
 from ..utilities.validation import (
     normalize_email,
     require_nonempty,
@@ -32,21 +38,128 @@ def verify_password(password: str, hashed: str) -> bool:
     return bcrypt.checkpw(password.encode("utf-8"), hashed.encode("utf-8"))
 
 
+USERS_SHEET = "users"
+# Read without a header check, like the old get_all_records() calls.
+USERS_SPEC = (None, "")
+ROLE_SHEET = "Role"
+
+# email -> (sheet row number, user record). Built from one read of the
+# users sheet and rebuilt only when that sheet is downloaded again;
+# signup keeps it current in between. The copy read may be stale, so a
+# row number is only a hint: it is checked before it is written to.
+_user_index: Dict[str, Tuple[int, Dict]] = {}
+_user_index_source: Optional[TableEntry] = None
+_user_index_lock = threading.RLock()
+
+
+def _email_of(record: Dict) -> str:
+    return str(record.get("email", "") or "").strip().lower()
+
+
+def _index_users(entry: TableEntry) -> None:
+    """Rebuild the email index from a users table entry."""
+    global _user_index_source
+    index: Dict[str, Tuple[int, Dict]] = {}
+    for row_number, row in enumerate(entry.records, start=2):
+        key = _email_of(row)
+        # Keep the first row for an email, like the old linear scan.
+        if key and key not in index:
+            index[key] = (row_number, row)
+    _user_index.clear()
+    _user_index.update(index)
+    _user_index_source = entry
+
+
+def _find_user(email_norm: str) -> Optional[Tuple[int, Dict]]:
+    """
+    Return (row_number, record) for a normalised email, or None.
+
+    A miss on an index that was not just rebuilt downloads the users
+    sheet once more, in case another session created the account.
+    Hits are remembered for the rest of the current command.
+    """
+    uow = current_unit()
+    if uow is not None and email_norm in uow.users:
+        return uow.users[email_norm]
+    with _user_index_lock:
+        backend = get_backend()
+        entry = backend.read_table(USERS_SHEET)
+        fresh = entry is not _user_index_source
+        if fresh:
+            _index_users(entry)
+        hit = _user_index.get(email_norm)
+        if hit is None and not fresh:
+            backend.invalidate(USERS_SHEET)
+            _index_users(backend.read_table(USERS_SHEET))
+            hit = _user_index.get(email_norm)
+    if hit is not None and uow is not None:
+        uow.users[email_norm] = hit
+    return hit
+
+
+def _reset_user_index(email_norm: str) -> None:
+    """Forget every row number; the next lookup downloads the sheet."""
+    global _user_index_source
+    with _user_index_lock:
+        get_backend().invalidate(USERS_SHEET)
+        _user_index.clear()
+        _user_index_source = None
+    uow = current_unit()
+    if uow is not None:
+        uow.users.pop(email_norm, None)
+
+
+def _locate_user(
+    email_norm: str, headers: List[str]
+) -> Optional[Tuple[int, Dict]]:
+    """
+    Return (row number, stored record) of the account to write to, or
+    None if there is none.
+
+    The row the index gives is read back from the store and must still
+    hold the email; if it does not (a row above it was removed, say),
+    the users sheet is downloaded again and the lookup repeated once.
+
+    Raises:
+        RuntimeError: if the row still does not match after that.
+    """
+    backend = get_backend()
+    for attempt in range(2):
+        if attempt:
+            _reset_user_index(email_norm)
+        hit = _find_user(email_norm)
+        if hit is None:
+            return None
+        row = hit[0]
+        stored = backend.read_rows(USERS_SHEET, [row], headers).get(row)
+        if stored is not None and _email_of(stored) == email_norm:
+            return row, stored
+    raise RuntimeError(
+        "The users sheet changed while saving. Please try again."
+    )
+
+
+def _index_new_user(email_norm: str) -> None:
+    """Add the row signup just appended (and patched into the cache)."""
+    with _user_index_lock:
+        entry = _user_index_source
+        if (
+            entry is None
+            or get_backend().cached_table(USERS_SHEET) is not entry
+        ):
+            # Not cached: the next lookup rebuilds from a fresh read.
+            return
+        row_number = len(entry.records) + 1
+        _user_index.setdefault(email_norm, (row_number, entry.records[-1]))
+
+
 def get_user_by_email(email: str):
     """
     Retrieve a user by email from the 'users' worksheet.
     Ensure email is normalised for case-insensitive match.
     """
-    client = get_client()
-    sheet = get_sheet(client)
-    ws = sheet.worksheet("users")
-
-    email_norm = normalize_email(email)
-    records = ws.get_all_records()
-    for row in records:
-        if row.get("email", "").strip().lower() == email_norm:
-            return row
-    return None
+    hit = _find_user(normalize_email(email))
+    return hit[1] if hit else None
 
 
 def signup(email: str, password: str) -> bool:
@@ -57,13 +170,7 @@ def signup(email: str, password: str) -> bool:
     email = normalize_email(require_nonempty(email, "Email"))
     password = require_nonempty(password, "Password")
 
-    client = get_client()
-    sheet = get_sheet(client)
-    ws = sheet.worksheet("users")
-
-    email = email.strip().lower()
-    existing = get_user_by_email(email)
-    if existing:
+    if _find_user(email):
         print("Email already registered.")
         return False
 
@@ -78,7 +185,11 @@ def signup(email: str, password: str) -> bool:
     user_id = str(uuid.uuid4())
 
     # Write the new user row to the sheet.
-    ws.append_row([user_id, email, hashed_pw, created_at])
+    with _user_index_lock:
+        get_backend().append_rows(
+            USERS_SHEET, [[user_id, email, hashed_pw, created_at]], raw=True
+        )
+        _index_new_user(email)
     print(f" User {email} registered successfully.")
     return True
 
@@ -91,6 +202,8 @@ def login(email: str, password: str) -> bool:
     email = normalize_email(require_nonempty(email, "Email"))
     password = require_nonempty(password, "Password")
 
+    # Check against the sheet, not a snapshot from an earlier session.
+    get_backend().settle(USERS_SHEET)
     user = get_user_by_email(email)
     if not user:
         print("No account found for this email.")
@@ -111,11 +224,7 @@ def list_users(limit: int = 20) -> list[dict]:
     To be included:
     'user_id', 'email', 'password_hash', 'created_at'.
     """
-    client = get_client()
-    sheet = get_sheet(client)
-    ws = sheet.worksheet("users")
-
-    records = ws.get_all_records()
+    records = list(get_backend().read_table(USERS_SHEET).records)
     if limit and limit > 0:
         return records[:limit]
     return records
@@ -130,13 +239,11 @@ def get_role(email: str) -> str:
     """
     try:
         email_norm = normalize_email(email)
-        client = get_client()
-        sheet = get_sheet(client)
         try:
-            ws = sheet.worksheet("Role")
+            records = get_backend().read_table(ROLE_SHEET).records
         except Exception:
             return "user"
-        for row in ws.get_all_records():
+        for row in records:
             if (row.get("email", "") or "").strip().lower() == email_norm:
                 return (row.get("role", "user") or "user").strip().lower()
         return "user"
@@ -155,23 +262,21 @@ def set_role(email: str, role: str) -> None:
     if role_norm not in {"user", "editor"}:
         raise ValueError("Role must be 'user' or 'editor'.")
 
-    # Look up the row for this email.
-    client = get_client()
-    sheet = get_sheet(client)
-    try:
-        ws = sheet.worksheet("Role")
-    except Exception:
-        ws = sheet.add_worksheet(title="Role", rows=1000, cols=2)
-        ws.update("A1:B1", [["email", "role"]])
+    backend = get_backend()
+    backend.ensure_table(
+        ROLE_SHEET,
+        ROLE_HEADERS,
+        "Unexpected Role header row; expected 'email' and 'role'.",
+        create=True,
+    )
 
     # Try to find existing row to update
-    records = ws.get_all_records()
-    for idx, row in enumerate(records, start=2):  # data starts on row 2
-        if (row.get("email", "") or "").strip().lower() == email_norm:
-            ws.update_cell(idx, 2, role_norm)
-            return
+    found = backend.find_row(ROLE_SHEET, {"email": email_norm})
+    if found:
+        backend.update_cells(ROLE_SHEET, [(found[0], 2, role_norm)])
+        return
     # Append new mapping
-    ws.append_row([email_norm, role_norm], value_input_option="USER_ENTERED")
+    backend.append_rows(ROLE_SHEET, [[email_norm, role_norm]])
 
 
 def update_password_hash(email: str, new_hash: str) -> None:
@@ -179,13 +284,11 @@ def update_password_hash(email: str, new_hash: str) -> None:
 
     Looks up the row by email (case-insensitive) and updates the
     password_hash column. Raises a ValueError if the user is not found
-    or the sheet does not include the expected headers.
+    or the sheet does not include the expected headers, and a
+    RuntimeError if the sheet keeps changing under the lookup.
     """
-    client = get_client()
-    sheet = get_sheet(client)
-    ws = sheet.worksheet("users")
-
-    headers = ws.row_values(1)
+    backend = get_backend()
+    headers = backend.read_table(USERS_SHEET).headers
     try:
         col_idx = headers.index("password_hash") + 1  # 1-based index
     except ValueError as exc:
@@ -193,10 +296,10 @@ def update_password_hash(email: str, new_hash: str) -> None:
             "'users' sheet missing 'password_hash' header"
         ) from exc
 
-    target = normalize_email(email)
-    records = ws.get_all_records()
-    for row_idx, row in enumerate(records, start=2):
-        if normalize_email(row.get("email", "")) == target:
-            ws.update_cell(row_idx, col_idx, new_hash)
-            return
-    raise ValueError("No account found for this email.")
+    # The index gives the row, checked against the stored row before
+    # the write; update_cells also patches the cached record.
+    with _user_index_lock:
+        found = _locate_user(normalize_email(email), headers)
+        if found is None:
+            raise ValueError("No account found for this email.")
+        backend.update_cells(USERS_SHEET, [(found[0], col_idx, new_hash)])
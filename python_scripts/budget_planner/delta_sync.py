@@ -0,0 +1,181 @@
+"""
+delta_sync.py
+-------------
+Incremental refresh of append-only worksheets (transactions).
+
+A TailState remembers how many rows of the sheet the cached table
+entry holds. Instead of downloading the whole worksheet again, one
+request fetches:
+- row 1, to see that the header row is unchanged;
+- the key cell of the last known row, to see that no row before it
+  was removed or inserted;
+- everything below the last known row (the new tail), of only the
+  columns the entry holds when it is a projection (see table_key).
+
+If both checks pass, the tail is added to the entry. When the rows
+the entry got from local writes since are the head of that tail (our
+own appends, now saved), the same entry is extended in place, so data
+derived from it is kept and only extended; otherwise a new entry is
+made from the known rows plus the tail. If a check fails the caller
+downloads the whole worksheet again. Edits to existing cells are not
+detected; that is the append-only contract.
+
+The TailState only refers to the entry (weakly) and holds no rows of
+its own, so all its data is counted in the cache budget: once the
+cache evicts the entry, the next refresh is a full download.
+"""
+
+from __future__ import annotations
+
+import threading
+import weakref
+from typing import Any, List, Optional, Tuple
+
+from gspread.utils import absolute_range_name, rowcol_to_a1
+
+from .table_cache import (
+    TableEntry,
+    charge,
+    column_runs,
+    decode_row,
+    estimate_size,
+    join_runs,
+)
+
+
+def _cell(values: List[List[Any]]) -> str:
+    """The single value of a one-cell range ('' when empty)."""
+    return str(values[0][0]) if values and values[0] else ""
+
+
+class TailState:
+    """
+    How many rows of an append-only worksheet an entry holds. headers
+    is row 1 of the sheet; key_col is a sheet column, which a
+    projection entry must hold.
+    """
+
+    def __init__(
+        self,
+        headers: List[str],
+        entry: TableEntry,
+        rows: int,
+        size: int,
+        last_key: str,
+        key_col: int = 1,
+    ):
+        self.headers = list(headers)
+        self._entry = weakref.ref(entry)
+        # Rows of entry.records read from the sheet (the rest are local
+        # writes), and their estimated size.
+        self.rows = rows
+        self.size = size
+        self.last_key = last_key
+        self.key_col = key_col
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_values(
+        cls,
+        values: List[List[str]],
+        entry: TableEntry,
+        key_col: int = 1,
+        headers: Optional[List[str]] = None,
+    ) -> Optional["TailState"]:
+        """
+        Start from a download (values, in the entry's columns) cached as
+        entry; headers is row 1 of the sheet if values is a projection.
+        """
+        if not values or not values[0]:
+            return None
+        index = key_col - 1
+        if entry.columns is not None:
+            if key_col not in entry.columns:
+                return None
+            index = entry.columns.index(key_col)
+        last = values[-1] if len(values) > 1 else []
+        last_key = str(last[index]) if len(last) > index else ""
+        return cls(
+            headers or values[0], entry, len(values) - 1,
+            estimate_size(values), last_key, key_col,
+        )
+
+    @property
+    def entry(self) -> Optional[TableEntry]:
+        """The entry holding the known rows (None once it is gone)."""
+        return self._entry()
+
+    def _runs(self, entry: Optional[TableEntry]) -> List[Tuple[int, int]]:
+        """Column runs of the tail: the entry's columns, else all."""
+        if entry is not None and entry.columns is not None:
+            return column_runs(entry.columns)
+        return [(1, len(self.headers))]
+
+    def ranges(self, title: str) -> List[str]:
+        """
+        The A1 ranges one refresh needs, in order: row 1, the key cell,
+        then the tail of each column run.
+        """
+        last_row = self.rows + 1  # sheet row of the last known record
+        key = rowcol_to_a1(max(last_row, 1), self.key_col)
+        ranges = [
+            absolute_range_name(title, "1:1"),
+            absolute_range_name(title, key),
+        ]
+        for first, last in self._runs(self.entry):
+            start = rowcol_to_a1(last_row + 1, first)
+            end = rowcol_to_a1(1, last)[:-1]
+            ranges.append(absolute_range_name(title, f"{start}:{end}"))
+        return ranges
+
+    def apply(
+        self,
+        header: List[List[str]],
+        key: List[List[str]],
+        *pieces: List[List[str]],
+    ) -> Optional[TableEntry]:
+        """
+        Add the new tail (one piece per column run) if the sheet only
+        grew at the end, and return the entry now holding every row
+        (see the module docstring). Returns None (and changes nothing)
+        if a full download is needed.
+        """
+        first = list(header[0]) if header else []
+        with self._lock:
+            entry = self.entry
+            runs = self._runs(entry)
+            if (
+                entry is None
+                or first != self.headers
+                or len(pieces) != len(runs)
+            ):
+                return None
+            # A refresh that ran meanwhile also moves last_key, so
+            # the same tail is never added twice.
+            if self.rows and _cell(key) != self.last_key:
+                return None
+            tail = join_runs(runs, list(pieces))
+            added = [decode_row(entry.headers, row) for row in tail]
+            local = entry.records[self.rows:]
+            if local == added[:len(local)]:
+                entry.records.extend(added[len(local):])
+                charge(entry, estimate_size(tail[len(local):]))
+            else:
+                entry = TableEntry(
+                    list(entry.headers),
+                    entry.records[:self.rows] + added,
+                    self.size + estimate_size(tail),
+                    columns=entry.columns,
+                )
+                self._entry = weakref.ref(entry)
+            self.rows += len(tail)
+            self.size += estimate_size(tail)
+            if tail:
+                self.last_key = str(tail[-1][self._key_index(entry)])
+            return entry
+
+    def _key_index(self, entry: TableEntry) -> int:
+        """Position of the key column in the entry's rows."""
+        if entry.columns is None:
+            return self.key_col - 1
+        return entry.columns.index(self.key_col)
@@ -0,0 +1,349 @@
+"""
+fake_sheets.py
+--------------
+In-memory stand-in for a gspread Spreadsheet, for benchmarks and
+offline runs.
+
+Only the part of the gspread API this project uses is implemented.
+Cells are stored as text, like the values Sheets returns. Every call
+is counted in FakeSpreadsheet.calls and can be slowed down or limited:
+- latency          seconds added to every API call
+- reads_per_min    read requests allowed per rolling minute (0 = no limit)
+- writes_per_min   write requests allowed per rolling minute (0 = no limit)
+
+Going over a quota raises gspread.exceptions.APIError with code 429,
+the same error the real API gives.
+
+Select it with BP_FAKE_SHEETS=1 (see sheets_gateway.get_sheet); the
+limits then come from BP_FAKE_LATENCY_MS, BP_FAKE_READS_PER_MIN and
+BP_FAKE_WRITES_PER_MIN.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from collections import Counter, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import requests
+from gspread.exceptions import APIError, WorksheetNotFound
+from gspread.utils import (
+    a1_range_to_grid_range,
+    a1_to_rowcol,
+    numericise_all,
+)
+
+_WINDOW = 60.0
+
+
+def _api_error(code: int, status: str, message: str) -> APIError:
+    """Build an APIError shaped like the ones the real API returns."""
+    response = requests.Response()
+    response.status_code = code
+    body = {"error": {"code": code, "message": message, "status": status}}
+    response._content = json.dumps(body).encode("utf-8")
+    return APIError(response)
+
+
+def _as_text(value: Any, option: Optional[str]) -> str:
+    """Store a value the way Sheets would display it again."""
+    if value is None:
+        return ""
+    if option == "USER_ENTERED" and isinstance(value, float):
+        # Sheets shows 7.0 typed into a cell as 7.
+        if value.is_integer():
+            return str(int(value))
+    return str(value)
+
+
+def _split_range(name: str) -> Tuple[str, str]:
+    """Split "'Sheet'!A1:B2" (or a bare sheet name) into its two parts."""
+    if not name.startswith("'"):
+        title, _, a1 = name.partition("!")
+        return title, a1
+    end = 1
+    while True:
+        end = name.index("'", end)
+        if name[end + 1:end + 2] != "'":
+            break
+        end += 2  # '' is an escaped quote inside the name
+    return name[1:end].replace("''", "'"), name[end + 2:]
+
+
+def _start_of(a1: str) -> List[int]:
+    """Return [row, col] of the top-left cell of an A1 range."""
+    cell = a1.split("!")[-1].split(":")[0]
+    return list(a1_to_rowcol(cell))
+
+
+class FakeWorksheet:
+    """One worksheet kept as a list of text rows (row 1 = headers)."""
+
+    def __init__(
+        self, spreadsheet: "FakeSpreadsheet", title: str, sheet_id: int
+    ):
+        self.spreadsheet = spreadsheet
+        self.title = title
+        self.id = sheet_id
+        self._rows: List[List[str]] = []
+
+    def __repr__(self) -> str:
+        return f"<FakeWorksheet {self.title!r} id:{self.id}>"
+
+    # Reads
+
+    def get_all_values(self, **kwargs) -> List[List[str]]:
+        self.spreadsheet._call("read", self.title, "get_all_values")
+        return self._snapshot()
+
+    def get_all_records(self, **kwargs) -> List[Dict]:
+        self.spreadsheet._call("read", self.title, "get_all_records")
+        values = self._snapshot()
+        if not values:
+            return []
+        headers = values[0]
+        width = len(headers)
+        return [
+            dict(zip(headers, numericise_all((r + [""] * width)[:width])))
+            for r in values[1:]
+        ]
+
+    def row_values(self, row: int, **kwargs) -> List[str]:
+        self.spreadsheet._call("read", self.title, "row_values")
+        with self.spreadsheet._lock:
+            if row > len(self._rows):
+                return []
+            return _trim(list(self._rows[row - 1]))
+
+    def col_values(self, col: int, **kwargs) -> List[str]:
+        self.spreadsheet._call("read", self.title, "col_values")
+        with self.spreadsheet._lock:
+            column = [r[col - 1] if len(r) >= col else "" for r in self._rows]
+        return _trim(column)
+
+    # Writes
+
+    def append_row(
+        self, values: List[Any], value_input_option: str = "RAW", **kwargs
+    ) -> None:
+        self.spreadsheet._call("write", self.title, "append_row")
+        self._append([values], value_input_option)
+
+    def append_rows(
+        self,
+        values: List[List[Any]],
+        value_input_option: str = "RAW",
+        **kwargs,
+    ) -> None:
+        self.spreadsheet._call("write", self.title, "append_rows")
+        self._append(values, value_input_option)
+
+    def update_cell(self, row: int, col: int, value: Any) -> None:
+        self.spreadsheet._call("write", self.title, "update_cell")
+        self._write(row, col, [[value]], "USER_ENTERED")
+
+    def update(
+        self,
+        range_name: Any = None,
+        values: Any = None,
+        value_input_option: str = "RAW",
+        **kwargs,
+    ) -> None:
+        self.spreadsheet._call("write", self.title, "update")
+        # gspread accepts update(values, range) as well as (range, values).
+        if isinstance(range_name, list):
+            range_name, values = values, range_name
+        row, col = _start_of(range_name or "A1")
+        self._write(row, col, values or [], value_input_option)
+
+    def batch_update(
+        self, data: List[Dict], value_input_option: str = "RAW", **kwargs
+    ) -> None:
+        self.spreadsheet._call("write", self.title, "batch_update")
+        for item in data:
+            row, col = _start_of(item["range"])
+            self._write(row, col, item["values"], value_input_option)
+
+    def delete_rows(
+        self, start_index: int, end_index: Optional[int] = None
+    ) -> None:
+        self.spreadsheet._call("write", self.title, "delete_rows")
+        with self.spreadsheet._lock:
+            del self._rows[start_index - 1:end_index or start_index]
+
+    # Helpers (no API call)
+
+    def _snapshot(self) -> List[List[str]]:
+        """All rows padded to one width, like get_all_values()."""
+        with self.spreadsheet._lock:
+            rows = [list(r) for r in self._rows]
+        while rows and not any(rows[-1]):
+            rows.pop()
+        width = max((len(_trim(list(r))) for r in rows), default=0)
+        return [(r + [""] * width)[:width] for r in rows]
+
+    def _range_values(self, a1: str) -> List[List[str]]:
+        """Cells of an A1 range (whole sheet if empty), trimmed."""
+        with self.spreadsheet._lock:
+            rows = [list(r) for r in self._rows]
+        if a1:
+            grid = a1_range_to_grid_range(a1)
+            top = grid.get("startRowIndex", 0)
+            bottom = grid.get("endRowIndex", len(rows))
+            left = grid.get("startColumnIndex", 0)
+            right = grid.get("endColumnIndex")
+            rows = [r[left:right] for r in rows[top:bottom]]
+        rows = [_trim(r) for r in rows]
+        while rows and not rows[-1]:
+            rows.pop()
+        return rows
+
+    def _append(self, rows: List[List[Any]], option: str) -> None:
+        with self.spreadsheet._lock:
+            for row in rows:
+                self._rows.append([_as_text(v, option) for v in row])
+
+    def _write(
+        self, row: int, col: int, values: List[List[Any]], option: str
+    ) -> None:
+        with self.spreadsheet._lock:
+            for i, line in enumerate(values):
+                while len(self._rows) < row + i:
+                    self._rows.append([])
+                cells = self._rows[row - 1 + i]
+                for j, value in enumerate(line):
+                    while len(cells) < col + j:
+                        cells.append("")
+                    cells[col - 1 + j] = _as_text(value, option)
+
+
+def _trim(cells: List[str]) -> List[str]:
+    """Drop trailing empty cells, as the API does."""
+    while cells and cells[-1] == "":
+        cells.pop()
+    return cells
+
+
+class FakeSpreadsheet:
+    """In-memory spreadsheet with call counting, latency and quotas."""
+
+    def __init__(
+        self,
+        title: str = "fake",
+        *,
+        latency: float = 0.0,
+        reads_per_min: int = 0,
+        writes_per_min: int = 0,
+    ):
+        self.title = title
+        self.id = "fake-sheet"
+        self.latency = latency
+        self.limits = {"read": reads_per_min, "write": writes_per_min}
+        # (worksheet title or "*", method name) -> number of calls.
+        self.calls: Counter = Counter()
+        # "read" / "write" -> number of calls.
+        self.totals: Counter = Counter()
+        self._recent: Dict[str, Deque[float]] = {
+            "read": deque(),
+            "write": deque(),
+        }
+        self._lock = threading.RLock()
+        self._worksheets: Dict[str, FakeWorksheet] = {}
+        self._next_id = 0
+
+    def seed(self, tables: Dict[str, List[str]]) -> "FakeSpreadsheet":
+        """Create a worksheet with a header row for each title."""
+        for title, headers in tables.items():
+            if title not in self._worksheets:
+                ws = self._new_worksheet(title)
+                ws._append([headers], "RAW")
+        return self
+
+    def total_calls(self, kind: Optional[str] = None) -> int:
+        """Number of API calls made (optionally only 'read'/'write')."""
+        if kind is None:
+            return sum(self.totals.values())
+        return self.totals[kind]
+
+    def reset_stats(self) -> None:
+        """Zero the call counters."""
+        with self._lock:
+            self.calls.clear()
+            self.totals.clear()
+
+    def _call(self, kind: str, title: str, method: str) -> None:
+        """Count one API call, then apply the quota and latency."""
+        with self._lock:
+            limit = self.limits.get(kind) or 0
+            if limit > 0:
+                now = time.monotonic()
+                recent = self._recent[kind]
+                while recent and now - recent[0] >= _WINDOW:
+                    recent.popleft()
+                if len(recent) >= limit:
+                    raise _api_error(
+                        429,
+                        "RESOURCE_EXHAUSTED",
+                        f"Quota exceeded for {kind} requests per minute.",
+                    )
+                recent.append(now)
+            self.calls[(title, method)] += 1
+            self.totals[kind] += 1
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+    def _new_worksheet(self, title: str) -> FakeWorksheet:
+        with self._lock:
+            self._next_id += 1
+            ws = FakeWorksheet(self, title, self._next_id)
+            self._worksheets[title] = ws
+            return ws
+
+    def worksheets(self, **kwargs) -> List[FakeWorksheet]:
+        self._call("read", "*", "worksheets")
+        with self._lock:
+            return list(self._worksheets.values())
+
+    def worksheet(self, title: str) -> FakeWorksheet:
+        self._call("read", "*", "worksheet")
+        with self._lock:
+            ws = self._worksheets.get(title)
+        if ws is None:
+            raise WorksheetNotFound(title)
+        return ws
+
+    def values_batch_get(
+        self, ranges: List[str], params: Optional[Dict] = None
+    ) -> Dict[str, Any]:
+        """One values:batchGet request covering several ranges."""
+        self._call("read", "*", "values_batch_get")
+        value_ranges = []
+        for name in ranges:
+            title, a1 = _split_range(name)
+            with self._lock:
+                ws = self._worksheets.get(title)
+            if ws is None:
+                raise _api_error(
+                    400, "INVALID_ARGUMENT", f"Unable to parse range: {name}"
+                )
+            value_range: Dict[str, Any] = {"range": name}
+            values = ws._range_values(a1)
+            if values:
+                value_range["values"] = values
+            value_ranges.append(value_range)
+        return {"spreadsheetId": self.id, "valueRanges": value_ranges}
+
+    def add_worksheet(
+        self, title: str, rows: int = 1000, cols: int = 26, **kwargs
+    ) -> FakeWorksheet:
+        self._call("write", "*", "add_worksheet")
+        with self._lock:
+            if title in self._worksheets:
+                raise _api_error(
+                    400,
+                    "INVALID_ARGUMENT",
+                    f'A sheet with the name "{title}" already exists.',
+                )
+            return self._new_worksheet(title)
@@ -1,9 +1,14 @@
-from typing import Optional
+import time
+from typing import List, Optional
 
 import typer
 import os
 import re
+from contextlib import contextmanager
 from . import auth
+from .sheets_gateway import command_scope
+from .storage import get_backend
+from .unit_of_work import FlushError
 from python_scripts.services import transactions as tx
 from ..services import reports
 from ..utilities.constants import ALLOWED_CATEGORIES
@@ -118,6 +123,19 @@ def _normalize_date(value: Optional[str]) -> Optional[str]:
     return value
 
 
+def _range_dates(
+    date_from: Optional[str], date_to: Optional[str]
+) -> tuple[Optional[str], Optional[str]]:
+    """Normalise and validate the --from/--to pair (either may be None)."""
+    if date_from:
+        date_from = require_date(_normalize_date(date_from), "From date")
+    if date_to:
+        date_to = require_date(_normalize_date(date_to), "To date")
+    if date_from and date_to and date_from > date_to:
+        raise ValueError("From date must not be after the to date.")
+    return date_from or None, date_to or None
+
+
 def _norm_email(value: str | None) -> str | None:
     """Lower/trim an email for consistent comparison."""
     if value is None:
@@ -164,12 +182,28 @@ def _session_email(
     return None
 
 
+@contextmanager
+def _command_scope():
+    """Run a command as one unit of work and report failed saves."""
+    try:
+        with command_scope():
+            yield
+    except FlushError as exc:
+        # Goal rows queued in this command may not exist.
+        bud.reset_goal_index()
+        typer.secho(f"Saving changes failed: {exc}", fg=typer.colors.RED)
+        raise typer.Exit(code=1)
+
+
 app = typer.Typer(no_args_is_help=True, help="Budget Planner CLI")
 
 
 @app.callback(invoke_without_command=True)
 def _root(ctx: typer.Context) -> None:
     """Run when no subcommand is provided."""
+    # Each command reads every sheet at most once and saves its writes
+    # together when it finishes (the scope closes with the context).
+    ctx.with_resource(_command_scope())
     if ctx.invoked_subcommand is None:
         typer.echo("Budget Planner CLI is ready. Use --help or a subcommand.")
 
@@ -408,12 +442,33 @@ def cli_list_txns(
         "--date",
         help="Filter by date (YYYY-MM-DD).",
     ),
+    date_from: Optional[str] = typer.Option(
+        None,
+        "--from",
+        help="Only rows on or after this date (YYYY-MM-DD).",
+    ),
+    date_to: Optional[str] = typer.Option(
+        None,
+        "--to",
+        help="Only rows on or before this date (YYYY-MM-DD).",
+    ),
     limit: int = typer.Option(
         20,
         "--limit",
         min=1,
         help="Max rows to show (default 20).",
     ),
+    after: Optional[str] = typer.Option(
+        None,
+        "--after",
+        help="Continue after this 'created_at,txn_id' cursor.",
+    ),
+    page_size: Optional[int] = typer.Option(
+        None,
+        "--page-size",
+        min=1,
+        help="Rows per page; prints the cursor for the next page.",
+    ),
 ) -> None:
     """Show recent transactions with optional filters."""
     try:
@@ -433,11 +488,18 @@ def cli_list_txns(
             # Clean up the date before strict checking.
             date = _normalize_date(date)
             date = require_date(date)
+        date_from, date_to = _range_dates(date_from, date_to)
 
+        if after is not None:
+            tx.parse_cursor(after)
         rows = tx.list_transactions(
             email=resolved,
             date=date,
+            date_from=date_from,
+            date_to=date_to,
             limit=limit,
+            after=after,
+            page_size=page_size,
         )
         if not rows:
             typer.echo("No transactions found.")
@@ -450,6 +512,14 @@ def cli_list_txns(
                 f"{r.get('note')}"
             )
             typer.echo(line)
+
+        size = page_size if page_size is not None else limit
+        if (after is not None or page_size is not None) and len(rows) >= size:
+            typer.secho(
+                f"Next page: --after '{tx.cursor_of(rows[-1])}' "
+                f"--page-size {size}",
+                fg=typer.colors.BRIGHT_BLACK,
+            )
     except SystemExit:
         sess = _norm_email(os.environ.get("BP_EMAIL"))
         typer.secho(
@@ -462,12 +532,101 @@ def cli_list_txns(
         raise typer.Exit(code=1)
 
 
+@app.command("import-txns")
+def cli_import_txns(
+    path: Optional[str] = typer.Option(
+        None,
+        "--file",
+        prompt="File to import (CSV or JSONL)",
+        help="CSV or JSONL file with date, category, amount, note.",
+    ),
+    email: Optional[str] = typer.Option(
+        None,
+        "--email",
+        help="Account email to attach the transactions to.",
+    ),
+    fmt: Optional[str] = typer.Option(
+        None,
+        "--format",
+        help="csv or jsonl (default: from the file extension).",
+    ),
+    chunk_size: int = typer.Option(
+        1000,
+        "--chunk-size",
+        min=1,
+        help="Rows written per request (default 1000).",
+    ),
+    after_line: int = typer.Option(
+        0,
+        "--after-line",
+        min=0,
+        help="Leave out rows up to this file line (to resume an import).",
+    ),
+) -> None:
+    """Import many transactions from a CSV or JSONL file."""
+    try:
+        resolved = resolve_email_for_action(email, require_login=True)
+
+        header("Import Transactions")
+        sep(40)
+        last_report = [0.0]
+
+        def report(result: tx.ImportResult) -> None:
+            # Print progress at most once a second.
+            now = time.monotonic()
+            if now - last_report[0] >= 1.0:
+                last_report[0] = now
+                typer.echo(
+                    f"  {result.imported} rows "
+                    f"({result.rows_per_second:.0f} rows/s)"
+                )
+
+        result = tx.import_transactions(
+            email=resolved or "",
+            path=path or "",
+            fmt=fmt,
+            chunk_size=chunk_size,
+            progress=report,
+            after_line=after_line,
+        )
+        typer.secho(
+            f"Imported {result.imported} rows in {result.seconds:.1f}s "
+            f"({result.rows_per_second:.0f} rows/s).",
+            fg=typer.colors.GREEN,
+        )
+        if result.skipped:
+            typer.secho(
+                f"Skipped {result.skipped} invalid rows.",
+                fg=typer.colors.YELLOW,
+            )
+            for line_num, message in result.errors:
+                typer.echo(f"  line {line_num}: {message}")
+
+    except SystemExit:
+        sess = _norm_email(os.environ.get("BP_EMAIL"))
+        typer.secho(
+            f"You are logged in as '{sess}'. Cannot use a different --email.",
+            fg=typer.colors.RED,
+        )
+        raise
+    except tx.ImportFailed as exc:
+        typer.secho(f"Import failed: {exc}", fg=typer.colors.RED)
+        last = exc.result.last_line
+        typer.echo(
+            f"Saved {exc.result.imported} rows, up to line {last}. "
+            f"To go on, run import-txns again with --after-line {last}."
+        )
+        raise typer.Exit(code=1)
+    except Exception as exc:
+        typer.secho(f"Import failed: {exc}", fg=typer.colors.RED)
+        raise typer.Exit(code=1)
+
+
 @app.command("sum-month")
 def cli_sum_month(
     month: Optional[str] = typer.Option(
         None,
         "--month",
-        prompt="Month (YYYY-MM)",
         help="Month to summarise, example, 2025-10.",
     ),
     email: Optional[str] = typer.Option(
@@ -475,24 +634,47 @@ def cli_sum_month(
         "--email",
         help="Option to filter.",
     ),
+    date_from: Optional[str] = typer.Option(
+        None,
+        "--from",
+        help="Only rows on or after this date (YYYY-MM-DD).",
+    ),
+    date_to: Optional[str] = typer.Option(
+        None,
+        "--to",
+        help="Only rows on or before this date (YYYY-MM-DD).",
+    ),
 ) -> None:
     """
-    Print the total amount for the given month.
+    Print the total amount for the given month, or for a date range
+    given with --from/--to.
     Option to filter for a single account email.
     """
     try:
-        # Validate month and enforce session email
-        month = _normalize_month(month)
-        month = require_month(month)
+        date_from, date_to = _range_dates(date_from, date_to)
+        ranged = bool(date_from or date_to)
+        if ranged and month:
+            raise ValueError("Use either --month or --from/--to.")
+        if not ranged:
+            # Validate month (asked for if not given)
+            if not month:
+                month = typer.prompt("Month (YYYY-MM)")
+            month = _normalize_month(month)
+            month = require_month(month)
         resolved = resolve_email_for_action(email, require_login=True)
 
-        header("Monthly Total")
+        header("Monthly Total" if not ranged else "Range Total")
         sep(40)
-        total = reports.monthly_total(month=month, email=resolved)
+        if ranged:
+            label = f"{date_from or ''}..{date_to or ''}"
+            total = reports.range_total(date_from, date_to, email=resolved)
+        else:
+            label = month
+            total = reports.monthly_total(month=month, email=resolved)
         if resolved:
-            typer.echo(f"Total for {month} ({resolved}): {total}")
+            typer.echo(f"Total for {label} ({resolved}): {total}")
         else:
-            typer.echo(f"Total for {month}: {total}")
+            typer.echo(f"Total for {label}: {total}")
     except Exception as exc:
         typer.secho(f"Report failed: {exc}", fg=typer.colors.RED)
         raise typer.Exit(code=1)
@@ -510,6 +692,16 @@ def cli_summary(
         "--date",
         help="Filter by date (YYYY-MM-DD).",
     ),
+    date_from: Optional[str] = typer.Option(
+        None,
+        "--from",
+        help="Only rows on or after this date (YYYY-MM-DD).",
+    ),
+    date_to: Optional[str] = typer.Option(
+        None,
+        "--to",
+        help="Only rows on or before this date (YYYY-MM-DD).",
+    ),
 ) -> None:
     """
     Show total spending grouped by category.
@@ -519,7 +711,10 @@ def cli_summary(
         if date:
             date = _normalize_date(date)
             date = require_date(date)
-        summary = tx.summarize_by_category(email=resolved, date=date)
+        date_from, date_to = _range_dates(date_from, date_to)
+        summary = tx.summarize_by_category(
+            email=resolved, date=date, date_from=date_from, date_to=date_to
+        )
         if not summary:
             typer.echo("No transactions found.")
             raise typer.Exit(code=0)
@@ -595,6 +790,79 @@ def cli_set_goal(
         raise typer.Exit(code=1)
 
 
+@app.command("set-goals")
+def cli_set_goals(
+    pairs: Optional[List[str]] = typer.Argument(
+        None,
+        help="category=amount pairs, e.g. groceries=200 transport=45.",
+    ),
+    email: Optional[str] = typer.Option(
+        None,
+        "--email",
+        help="Account email these goals belong to.",
+    ),
+    month: Optional[str] = typer.Option(
+        None,
+        "--month",
+        prompt="Month (YYYY-MM)",
+        help="Month the goals apply to (e.g., 2025-11).",
+    ),
+    copy_last: bool = typer.Option(
+        False,
+        "--copy-last",
+        help="Start from last month's goals; pairs given override them.",
+    ),
+) -> None:
+    """
+    Set several monthly goals at once, saved together in one write.
+    """
+    try:
+        if month:
+            # Clean up month before strict checking.
+            month = _normalize_month(month)
+            month = require_month(month)
+
+        goals = {}
+        for pair in pairs or []:
+            category, sep_, amount = pair.partition("=")
+            if not sep_ or not category.strip():
+                raise ValueError(
+                    f"'{pair}' is not category=amount (e.g. groceries=200)."
+                )
+            if category.strip() in goals:
+                raise ValueError(f"{category.strip()}: given twice.")
+            goals[category.strip()] = amount.strip()
+        if not goals and not copy_last:
+            raise ValueError("Give category=amount pairs and/or --copy-last.")
+
+        # Editor can pass --email to set goals for another account
+        resolved = resolve_email_for_action(email, require_login=True)
+
+        saved = bud.set_goals(
+            email=resolved or "",
+            month=month,
+            goals=goals,
+            copy_previous=copy_last,
+        )
+        header(f"Goals for {month}")
+        sep(40)
+        for g in saved:
+            typer.echo(
+                f"{g['category']:15} {g['goal']:10.2f}  ({g['action']})"
+            )
+        typer.secho(f"{len(saved)} goal(s) saved.", fg=typer.colors.GREEN)
+    except SystemExit:
+        sess = _norm_email(os.environ.get("BP_EMAIL"))
+        typer.secho(
+            f"You are logged in as '{sess}'. Cannot use a different --email.",
+            fg=typer.colors.RED,
+        )
+        raise
+    except Exception as exc:
+        typer.secho(f"Save failed: {exc}", fg=typer.colors.RED)
+        raise typer.Exit(code=1)
+
+
 @app.command("list-goals")
 def cli_list_goals(
     email: Optional[str] = typer.Option(
@@ -732,9 +1000,172 @@ def cli_budget_status(
         raise typer.Exit(code=1)
 
 
+@app.command("budget-report-all")
+def cli_budget_report_all(
+    month: str = typer.Option(
+        "",
+        "--month",
+        help="Filter by month (YYYY-MM) - optional.",
+    ),
+    csv_path: Optional[str] = typer.Option(
+        None,
+        "--csv",
+        help="Also save the report as this new file in reports/.",
+    ),
+) -> None:
+    """
+    (editor) Compare goals to spend for every account in one report.
+    """
+    require_role("editor")
+    try:
+        if month:
+            month = _normalize_month(month)
+            month = require_month(month)
+        # Check the file name before the report is built.
+        path = bud.report_csv_path(csv_path) if csv_path else None
+
+        rows = bud.goals_vs_spend_all(month=month or None)
+        if not rows:
+            typer.echo("No goals to compare.")
+            return
+
+        header("Budget Report (all accounts)")
+        typer.secho(
+            f"{'email':26}{'month':9}{'category':14}"
+            f"{'goal':>9} {'spent':>9} {'diff':>9}",
+            fg=typer.colors.CYAN,
+            bold=True,
+        )
+        sep(78)
+        last_email = None
+        for r in rows:
+            email = r["email"] or f"({r['user_id']})"
+            diff = float(r["diff"])
+            diff_colored = typer.style(
+                f"{diff:9.2f}",
+                fg=typer.colors.GREEN if diff >= 0 else typer.colors.RED,
+            )
+            # Name each account once, on its first row.
+            shown = email if email != last_email else ""
+            last_email = email
+            typer.echo(
+                f"{shown[:25]:26}{r['month']:9}{r['category']:14}"
+                f"{r['goal']:9.2f} {r['spent']:9.2f} {diff_colored}"
+            )
+        sep(78)
+        accounts = len({r["user_id"] for r in rows})
+        typer.echo(f"{len(rows)} goals across {accounts} accounts.")
+
+        if path:
+            count = bud.write_report_csv(rows, path)
+            typer.secho(
+                f"Wrote {count} rows to {path}.", fg=typer.colors.GREEN
+            )
+    except Exception as exc:
+        typer.secho(f"Report failed: {exc}", fg=typer.colors.RED)
+        raise typer.Exit(code=1)
+
+
+@app.command("trend")
+def cli_trend(
+    months: int = typer.Option(
+        6,
+        "--months",
+        min=1,
+        max=120,
+        help="Months to show, ending with --end (default 6).",
+    ),
+    end: Optional[str] = typer.Option(
+        None,
+        "--end",
+        help="Last month to show (YYYY-MM); default this month.",
+    ),
+    window: int = typer.Option(
+        3,
+        "--window",
+        min=1,
+        max=24,
+        help="Months in the rolling average (default 3).",
+    ),
+    by_category: bool = typer.Option(
+        False,
+        "--by-category",
+        help="Also show each category's total and change.",
+    ),
+    email: Optional[str] = typer.Option(
+        None,
+        "--email",
+        help="Filter to a single account.",
+    ),
+) -> None:
+    """
+    Show spending per month with a rolling average and the change
+    from the month before.
+    """
+    try:
+        if end:
+            end = _normalize_month(end)
+            end = require_month(end)
+        else:
+            end = time.strftime("%Y-%m")
+        resolved = resolve_email_for_action(email, require_login=True)
+
+        series = reports.monthly_series(
+            end, months=months, email=resolved, window=window
+        )
+
+        header("Spending Trend")
+        typer.secho(
+            f"{'month':9}  {'total':>9}  {f'avg({window})':>9}  "
+            f"{'change':>9}",
+            fg=typer.colors.CYAN,
+            bold=True,
+        )
+        sep(44)
+        for r in series:
+            change = float(r["change"])
+            change_text = f"{change:+9.2f}"
+            if r["change_pct"] is not None:
+                change_text += f" ({r['change_pct']:+.1f}%)"
+            # Spending more than the month before shows in red.
+            change_colored = typer.style(
+                change_text,
+                fg=typer.colors.RED if change > 0 else typer.colors.GREEN,
+            )
+            typer.echo(
+                f"{r['month']:9}  {r['total']:9.2f}  "
+                f"{r['rolling_avg']:9.2f}  {change_colored}"
+            )
+            if by_category:
+                deltas = r["category_change"]
+                for cat in sorted(deltas):
+                    amount = r["categories"].get(cat, 0.0)
+                    typer.echo(
+                        f"  {cat:14} {amount:9.2f}  {deltas[cat]:+9.2f}"
+                    )
+    except SystemExit:
+        sess = _norm_email(os.environ.get("BP_EMAIL"))
+        typer.secho(
+            f"You are logged in as '{sess}'. Cannot use a different --email.",
+            fg=typer.colors.RED,
+        )
+        raise
+    except Exception as exc:
+        typer.secho(f"Trend failed: {exc}", fg=typer.colors.RED)
+        raise typer.Exit(code=1)
+
+
 @app.command("logout")
 def cli_logout() -> None:
     """Clear the current session email."""
+    # Save any buffered transactions before the session ends.
+    try:
+        get_backend().flush()
+    except Exception as exc:
+        typer.secho(
+            f"Could not save pending transactions yet: {exc}",
+            fg=typer.colors.RED,
+        )
     # Forget the saved user so next action requires login again.
     if os.environ.pop("BP_EMAIL", None):
         typer.secho("Logged out.", fg=typer.colors.GREEN)
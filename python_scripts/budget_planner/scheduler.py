@@ -0,0 +1,277 @@
+"""
+scheduler.py
+------------
+Quota-aware scheduling for Google Sheets API calls.
+
+Every call made through sheets_gateway goes through one shared
+ApiScheduler, which:
+- takes a token from a read or write bucket first, waiting when the
+  per-minute budget is used up;
+- retries 429 (quota) and 5xx errors with jittered exponential backoff;
+- after a 429, pauses every caller in the process, not just the one
+  that hit it, so they do not all keep hammering the API.
+
+Appends are only retried after a 429: the API rejected those outright,
+whereas after a 5xx the rows may already have been written.
+
+Tuning (read from the environment):
+- BP_READS_PER_MIN   read requests per minute (default 60)
+- BP_WRITES_PER_MIN  write requests per minute (default 60)
+- BP_API_RETRIES     retries per call before giving up (default 5)
+"""
+
+from __future__ import annotations
+
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from gspread.exceptions import APIError
+
+READ = "read"
+WRITE = "write"
+
+# Worksheet methods by kind; anything else is not an API call.
+READ_METHODS = frozenset({
+    "get",
+    "get_all_values",
+    "get_all_records",
+    "get_values",
+    "batch_get",
+    "row_values",
+    "col_values",
+    "acell",
+    "cell",
+})
+WRITE_METHODS = frozenset({
+    "update",
+    "update_cell",
+    "update_cells",
+    "batch_update",
+    "append_row",
+    "append_rows",
+    "insert_row",
+    "insert_rows",
+    "delete_rows",
+    "clear",
+    "batch_clear",
+})
+# Not safe to repeat after a 5xx: the rows may have been written.
+NON_IDEMPOTENT = frozenset({
+    "append_row",
+    "append_rows",
+    "insert_row",
+    "insert_rows",
+    "delete_rows",
+})
+
+
+def _status(exc: BaseException) -> Optional[int]:
+    """Return the HTTP status of an API error, if it has one."""
+    if isinstance(exc, APIError):
+        code = getattr(exc, "code", None)
+        if isinstance(code, int) and code > 0:
+            return code
+        response = getattr(exc, "response", None)
+        return getattr(response, "status_code", None)
+    return None
+
+
+class TokenBucket:
+    """
+    Refills rate_per_min tokens per minute, holding at most capacity.
+    A rate of 0 (or less) means unlimited.
+    """
+
+    def __init__(self, rate_per_min: float, capacity: Optional[float] = None):
+        self.rate = max(0.0, float(rate_per_min)) / 60.0
+        self.capacity = float(
+            capacity if capacity is not None else rate_per_min
+        )
+        self._tokens = self.capacity
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.rate <= 0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._stamp) * self.rate
+        )
+        self._stamp = now
+
+    def try_take(self) -> float:
+        """Take a token if one is free; else return seconds to wait."""
+        if self.unlimited:
+            return 0.0
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return 0.0
+            return (1.0 - self._tokens) / self.rate
+
+    def take(self, sleep: Callable[[float], None] = time.sleep) -> None:
+        """Take a token, sleeping until one is available."""
+        while True:
+            wait = self.try_take()
+            if wait <= 0:
+                return
+            sleep(wait)
+
+    def drain(self) -> None:
+        """Drop every token (the API said the quota is used up)."""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self._tokens, 0.0)
+
+    def available(self) -> float:
+        """Tokens free right now (inf when unlimited)."""
+        if self.unlimited:
+            return float("inf")
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+
+class ApiScheduler:
+    """Shared rate limiting and retry policy for API calls."""
+
+    def __init__(
+        self,
+        *,
+        reads_per_min: float = 60,
+        writes_per_min: float = 60,
+        max_retries: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 32.0,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.buckets: Dict[str, TokenBucket] = {
+            READ: TokenBucket(reads_per_min),
+            WRITE: TokenBucket(writes_per_min),
+        }
+        self.max_retries = max(0, int(max_retries))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        # Monotonic time before which nobody should call the API.
+        self._paused_until = 0.0
+        self.retries = 0
+        self.throttled = 0
+
+    def backoff(self, attempt: int) -> float:
+        """Jittered delay for retry number attempt (0-based)."""
+        cap = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return random.uniform(cap / 2, cap)
+
+    def _wait_for_pause(self) -> None:
+        while True:
+            with self._lock:
+                wait = self._paused_until - time.monotonic()
+            if wait <= 0:
+                return
+            self._sleep(wait)
+
+    def _pause(self, seconds: float) -> None:
+        with self._lock:
+            self._paused_until = max(
+                self._paused_until, time.monotonic() + seconds
+            )
+
+    def call(
+        self,
+        kind: str,
+        func: Callable[..., Any],
+        *args: Any,
+        idempotent: bool = True,
+        **kwargs: Any,
+    ) -> Any:
+        """
+        Run func(*args, **kwargs) as one API request of this kind.
+
+        Raises the last APIError once retries are used up, or straight
+        away for errors that are not worth retrying.
+        """
+        bucket = self.buckets[kind]
+        attempt = 0
+        while True:
+            self._wait_for_pause()
+            bucket.take(self._sleep)
+            try:
+                return func(*args, **kwargs)
+            except APIError as exc:
+                status = _status(exc)
+                quota = status == 429
+                server = status is not None and status >= 500
+                if not (quota or (server and idempotent)):
+                    raise
+                if attempt >= self.max_retries:
+                    raise
+                delay = self.backoff(attempt)
+                attempt += 1
+                with self._lock:
+                    self.retries += 1
+                    self.throttled += int(quota)
+                if quota:
+                    # Everyone waits, and the bucket starts empty again.
+                    bucket.drain()
+                    self._pause(delay)
+                else:
+                    self._sleep(delay)
+
+    def headroom(self) -> Dict[str, Any]:
+        """Requests that can be made right now, plus retry counters."""
+        with self._lock:
+            paused = max(0.0, self._paused_until - time.monotonic())
+            retries, throttled = self.retries, self.throttled
+        return {
+            READ: self.buckets[READ].available(),
+            WRITE: self.buckets[WRITE].available(),
+            "paused_for": paused,
+            "retries": retries,
+            "throttled": throttled,
+        }
+
+
+class ScheduledWorksheet:
+    """
+    Worksheet handle whose API calls go through an ApiScheduler.
+    Attributes and non-API methods are passed through unchanged.
+    """
+
+    def __init__(self, ws, scheduler: ApiScheduler):
+        self._ws = ws
+        self._scheduler = scheduler
+
+    @property
+    def unwrapped(self):
+        return self._ws
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._ws, name)
+        if name in READ_METHODS:
+            kind = READ
+        elif name in WRITE_METHODS:
+            kind = WRITE
+        else:
+            return attr
+
+        def scheduled(*args, **kwargs):
+            return self._scheduler.call(
+                kind,
+                attr,
+                *args,
+                idempotent=name not in NON_IDEMPOTENT,
+                **kwargs,
+            )
+
+        return scheduled
+
+    def __repr__(self) -> str:
+        return f"<Scheduled {self._ws!r}>"
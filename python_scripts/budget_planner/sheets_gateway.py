@@ -3,17 +3,92 @@ sheets_gateway.py
 -----------------
 1. build Google credentials, 2. create a gspread client,
 and 3. open the targeted spreadsheet by ID.
+
+The client and spreadsheet are created once per process and shared by
+every service module. Call reset_client() after rotating credentials.
+Worksheet handles are resolved from one metadata fetch and cached by
+title (see get_worksheet). Header checks read only row 1 and are
+remembered per worksheet (see ensure_headers / read_records).
+
+read_tables() downloads several worksheets with one values:batchGet
+request. Decoded tables are kept in a read-through TableCache. Writes should go
+through append_row / append_rows / update_cell here so cached tables are
+patched instead of going stale. Tuning (read from the environment):
+- BP_CACHE_TTL     seconds a cached table stays fresh (default 30, 0=off)
+- BP_CACHE_MAX_MB  memory budget for cached tables and the data derived
+                   from them (default 48); every terminal session is
+                   its own process with its own cache
+
+Every API call goes through one ApiScheduler (see scheduler.py), which
+keeps within the per-minute quotas and retries 429/5xx errors.
+
+Inside command_scope() each worksheet is read at most once and writes
+are queued, then saved together when the scope closes (see
+unit_of_work.py).
+
+Transactions are appended through a write-behind buffer instead (see
+buffered_append and write_buffer.py), tuned by:
+- BP_TXN_BUFFER_ROWS     rows that trigger a flush (default 25, 1=off)
+- BP_TXN_BUFFER_SECONDS  max seconds a row waits (default 15)
+
+Append-only worksheets (APPEND_ONLY_SHEETS) are refreshed by reading
+only the rows added since the last download (see delta_sync.py):
+- BP_DELTA_SYNC  1 to refresh by tail reads (default), 0 to always
+                 download the whole worksheet
+
+Downloaded tables are also saved to disk (see snapshot_store.py), and
+warm_start() loads them when a session starts, so the first reads are
+served locally while a background refresh checks them against the
+sheet. Writes, and settle(), wait for that refresh to finish. The
+worksheets in NO_SNAPSHOT_SHEETS (users, with its password hashes) are
+never saved, and a file left for one by an older version is removed.
+- BP_SNAPSHOTS     1 to keep snapshots (default), 0 to turn them off
+- BP_SNAPSHOT_DIR  directory for the snapshot files (.bp_snapshots)
+
+With BP_FAKE_SHEETS=1 an in-memory FakeSpreadsheet is used instead of
+Google Sheets (no credentials needed; see fake_sheets.py), and
+use_sheet() installs any spreadsheet object directly.
 """
 
 from __future__ import annotations
 
+import atexit
 import json
 import os
-from typing import List, Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager, nullcontext
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
 
 import gspread
 from dotenv import load_dotenv
 from google.oauth2.service_account import Credentials
+from gspread.utils import absolute_range_name, rowcol_to_a1
+
+from .delta_sync import TailState
+from .fake_sheets import FakeSpreadsheet
+from .scheduler import READ, WRITE, ApiScheduler, ScheduledWorksheet
+from .snapshot_store import SnapshotStore
+from .table_cache import (
+    TableCache,
+    TableEntry,
+    TableSpec,
+    column_runs,
+    decode_row,
+    estimate_size,
+    join_runs,
+    key_title,
+    patch_append,
+    patch_update,
+    table_key,
+)
+from .unit_of_work import FlushError, UnitOfWork, current_unit, unit_scope
+from .write_buffer import WriteBuffer
+from ..utilities.constants import (
+    APPEND_ONLY_SHEETS,
+    NO_SNAPSHOT_SHEETS,
+    SHEET_HEADERS,
+)
 
 
 DEFAULT_SCOPES: List[str] = [
@@ -21,6 +96,25 @@ DEFAULT_SCOPES: List[str] = [
     "https://www.googleapis.com/auth/drive.file",
 ]
 
+# Shared handles, created lazily and guarded by _lock.
+_lock = threading.RLock()
+_client: Optional[gspread.Client] = None
+_sheet: Optional[gspread.Spreadsheet] = None
+_worksheets: Dict[str, gspread.Worksheet] = {}
+# Titles whose header row has already matched the expected headers.
+_validated: Set[str] = set()
+_cache: Optional[TableCache] = None
+_scheduler: Optional[ApiScheduler] = None
+_buffers: Dict[str, WriteBuffer] = {}
+# Rows of each append-only worksheet held by its cached entry.
+_tails: Dict[str, TailState] = {}
+# Snapshots: off once use_sheet() installs a spreadsheet object; saved
+# one after another on a single background thread.
+_snapshots_allowed = True
+_snapshot_writer: Optional[ThreadPoolExecutor] = None
+# Titles served from a snapshot whose background refresh is running.
+_refreshing: Dict[str, threading.Event] = {}
+
 
 def _scopes_from_env() -> List[str]:
     """
@@ -61,25 +155,904 @@ def _credentials_from_env(scopes: Optional[List[str]] = None) -> Credentials:
 
 def get_client() -> gspread.Client:
     """
-    Return an authorized gspread client
+    Return the shared authorized gspread client (created on first use).
     """
-    # Load .env, build credentials, and return a client we can use
-    # everywhere else in the app.
-    load_dotenv()
-    creds = _credentials_from_env()
-    return gspread.authorize(creds)
+    global _client
+    with _lock:
+        if _client is None:
+            # Load .env, build credentials and authorize only once per
+            # process; every module reuses this client afterwards.
+            load_dotenv()
+            creds = _credentials_from_env()
+            _client = gspread.authorize(creds)
+        return _client
+
+
+def _open_sheet(client: gspread.Client) -> gspread.Spreadsheet:
+    """Open the spreadsheet named by SHEET_ID with the given client."""
+    sheet_id = os.getenv("SHEET_ID")
+    if not sheet_id:
+        raise RuntimeError("SHEET_ID is missing. Add it to your .env file.")
+    return get_scheduler().call(READ, client.open_by_key, sheet_id)
 
 
 def get_sheet(client: Optional[gspread.Client] = None) -> gspread.Spreadsheet:
     """
     Open and return the spreadsheet specified using SHEET_ID.
+
+    Without a client (or with the shared one) the spreadsheet handle is
+    opened once and reused. A different client always opens a new handle.
+    """
+    global _sheet
+    if client is not None and client is not _client:
+        return _open_sheet(client)
+    with _lock:
+        if _sheet is None:
+            load_dotenv()
+            if _env_number("BP_FAKE_SHEETS", 0):
+                _sheet = _fake_sheet_from_env()
+            else:
+                _sheet = _open_sheet(get_client())
+        return _sheet
+
+
+def _fake_sheet_from_env() -> FakeSpreadsheet:
+    """Build an empty fake spreadsheet with the usual worksheets."""
+    sheet = FakeSpreadsheet(
+        latency=_env_number("BP_FAKE_LATENCY_MS", 0) / 1000.0,
+        reads_per_min=int(_env_number("BP_FAKE_READS_PER_MIN", 0)),
+        writes_per_min=int(_env_number("BP_FAKE_WRITES_PER_MIN", 0)),
+    )
+    return sheet.seed(SHEET_HEADERS)
+
+
+def use_sheet(sheet) -> None:
+    """
+    Use this spreadsheet object (for example a FakeSpreadsheet) for all
+    later calls, dropping every handle and cached table of the old one.
+    """
+    global _sheet, _snapshots_allowed
+    reset_client()
+    with _lock:
+        _buffers.clear()
+        _snapshots_allowed = False
+        _sheet = sheet
+
+
+def reset_client() -> None:
+    """
+    Drop the shared client and spreadsheet so the next call re-authorizes.
+    Use this after rotating credentials or changing SHEET_ID. (A fake
+    spreadsheet from BP_FAKE_SHEETS starts again empty.)
+    """
+    global _client, _sheet
+    with _lock:
+        _client = None
+        _sheet = None
+        _worksheets.clear()
+        _validated.clear()
+        _tails.clear()
+        if _cache is not None:
+            _cache.clear()
+
+
+def _env_number(name: str, default: float) -> float:
+    """Read a numeric setting from the environment, or use default."""
+    raw = (os.getenv(name) or "").strip()
+    try:
+        return float(raw) if raw else default
+    except ValueError:
+        return default
+
+
+def get_cache() -> TableCache:
+    """Return the shared table cache, configured from the environment."""
+    global _cache
+    with _lock:
+        if _cache is None:
+            load_dotenv()
+            _cache = TableCache(
+                ttl=_env_number("BP_CACHE_TTL", 30.0),
+                max_bytes=int(
+                    _env_number("BP_CACHE_MAX_MB", 48) * (1 << 20)
+                ),
+            )
+        return _cache
+
+
+def get_scheduler() -> ApiScheduler:
+    """Return the process-wide API scheduler, configured from the env."""
+    global _scheduler
+    with _lock:
+        if _scheduler is None:
+            load_dotenv()
+            _scheduler = ApiScheduler(
+                reads_per_min=_env_number("BP_READS_PER_MIN", 60),
+                writes_per_min=_env_number("BP_WRITES_PER_MIN", 60),
+                max_retries=int(_env_number("BP_API_RETRIES", 5)),
+            )
+        return _scheduler
+
+
+def quota_headroom() -> Dict[str, Any]:
+    """
+    Return how many read and write requests can be sent right now, how
+    long callers are paused after a 429, and the retry counters.
+    """
+    return get_scheduler().headroom()
+
+
+def get_snapshots() -> Optional[SnapshotStore]:
+    """
+    Return the snapshot store for SHEET_ID, or None when snapshots are
+    off (BP_SNAPSHOTS=0, caching off, or a fake or installed sheet).
     """
-    # If no client is given, create one.
-    client = client or get_client()
     sheet_id = os.getenv("SHEET_ID")
     if not sheet_id:
-        raise RuntimeError("SHEET_ID is missing. Add it to your .env file.")
-    return client.open_by_key(sheet_id)
+        load_dotenv()
+        sheet_id = os.getenv("SHEET_ID")
+    if (
+        not sheet_id
+        or not _snapshots_allowed
+        or not _env_number("BP_SNAPSHOTS", 1)
+        or _env_number("BP_FAKE_SHEETS", 0)
+        or not get_cache().enabled
+    ):
+        return None
+    directory = os.getenv("BP_SNAPSHOT_DIR") or ".bp_snapshots"
+    return SnapshotStore(directory, sheet_id)
+
+
+def _write_snapshot(method: str, title: str, *args: Any) -> None:
+    """
+    Run a SnapshotStore method on the background writer thread. Any
+    write to a NO_SNAPSHOT_SHEETS title discards its file instead.
+    """
+    global _snapshot_writer
+    store = get_snapshots()
+    if store is None:
+        return
+    if title in NO_SNAPSHOT_SHEETS:
+        method, args = "discard", ()
+    with _lock:
+        if _snapshot_writer is None:
+            _snapshot_writer = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="bp-snapshot"
+            )
+        writer = _snapshot_writer
+
+    def write() -> None:
+        try:
+            getattr(store, method)(title, *args)
+        except OSError:
+            pass  # a snapshot is only a head start; the sheet is kept
+
+    writer.submit(write)
+
+
+def warm_start(titles: Optional[List[str]] = None) -> List[str]:
+    """
+    Put the saved snapshots of titles (default: every known worksheet)
+    into the cache and refresh them from the sheet in the background.
+    Returns the titles loaded; NO_SNAPSHOT_SHEETS are never loaded.
+    """
+    store = get_snapshots()
+    if store is None:
+        return []
+    loaded: List[str] = []
+    for title in titles or list(SHEET_HEADERS):
+        if title in NO_SNAPSHOT_SHEETS:
+            store.discard(title)
+            continue
+        if title in _refreshing or get_cache().peek(title) is not None:
+            continue
+        values = store.load(title)
+        if values is None:
+            continue
+        records = records_from_values(values)
+        entry = get_cache().put(
+            title, values[0], records, estimate_size(values)
+        )
+        if _delta_sync(title):
+            tail = TailState.from_values(values, entry)
+            if tail is not None:
+                _tails[title] = tail
+        _refreshing[title] = threading.Event()
+        loaded.append(title)
+    if loaded:
+        threading.Thread(
+            target=_refresh_snapshots,
+            args=(loaded,),
+            name="bp-refresh",
+            daemon=True,
+        ).start()
+    return loaded
+
+
+def _refresh_snapshots(titles: List[str]) -> None:
+    """Download tables loaded from snapshots again (one batchGet)."""
+    try:
+        # No header specs: a background thread must not write headers.
+        _download(titles, {title: (None, "") for title in titles}, {})
+    except Exception:
+        # Serve nothing unchecked; the next read downloads and reports.
+        for title in titles:
+            get_cache().invalidate(title)
+    finally:
+        for title in titles:
+            _refreshing.pop(title).set()
+
+
+def settle(title: str) -> None:
+    """Wait until a snapshot of title has been checked against the sheet."""
+    event = _refreshing.get(title)
+    if event is not None:
+        event.wait()
+
+
+def _refresh_worksheets() -> None:
+    """Reload every worksheet handle from a single metadata fetch."""
+    scheduler = get_scheduler()
+    handles = scheduler.call(READ, get_sheet().worksheets)
+    _worksheets.clear()
+    _worksheets.update(
+        {ws.title: ScheduledWorksheet(ws, scheduler) for ws in handles}
+    )
+
+
+def get_worksheet(title: str) -> gspread.Worksheet:
+    """
+    Return the worksheet with this exact title from the registry.
+
+    On a miss the registry is refreshed once (the sheet may have been
+    added elsewhere). Raises gspread.WorksheetNotFound if still missing.
+    """
+    with _lock:
+        ws = _worksheets.get(title)
+        if ws is None:
+            _refresh_worksheets()
+            ws = _worksheets.get(title)
+        if ws is None:
+            raise gspread.WorksheetNotFound(title)
+        return ws
+
+
+def add_worksheet(title: str, rows: int, cols: int) -> gspread.Worksheet:
+    """Create a worksheet and register its handle."""
+    with _lock:
+        scheduler = get_scheduler()
+        ws = scheduler.call(
+            WRITE,
+            get_sheet().add_worksheet,
+            title=title,
+            rows=rows,
+            cols=cols,
+            idempotent=False,
+        )
+        ws = ScheduledWorksheet(ws, scheduler)
+        _worksheets[title] = ws
+        get_cache().invalidate(title)
+        return ws
+
+
+def _check_headers(
+    ws: gspread.Worksheet, first: List[str], headers: List[str], error: str
+) -> None:
+    """Write headers to an empty sheet, or raise if row 1 differs."""
+    if not first:
+        ws.append_row(headers)
+        get_cache().invalidate(ws.title)
+    elif first != headers:
+        raise RuntimeError(error)
+    with _lock:
+        _validated.add(ws.title)
+
+
+def ensure_headers(
+    ws: gspread.Worksheet, headers: List[str], error: str
+) -> None:
+    """
+    Make sure row 1 of ws matches headers, reading only the header row.
+
+    An empty sheet gets the headers written. A mismatch raises
+    RuntimeError(error). A successful check is remembered for the
+    process lifetime, so later calls make no request at all.
+    """
+    if ws.title in _validated:
+        return
+    _check_headers(ws, ws.row_values(1), headers, error)
+
+
+def records_from_values(values: List[List[str]]) -> List[Dict]:
+    """
+    Turn a values matrix (header row first) into records, the same way
+    Worksheet.get_all_records() does (numbers are numericised).
+    """
+    if not values or not values[0]:
+        return []
+    keys = values[0]
+    return [decode_row(keys, row) for row in values[1:]]
+
+
+def read_table(
+    ws: gspread.Worksheet,
+    headers: Optional[List[str]] = None,
+    error: str = "",
+) -> TableEntry:
+    """
+    Return the cached table for ws, downloading it once on a miss.
+
+    If headers are given, the header check uses row 1 of that same
+    download, so callers that need the full table do not pay for a
+    separate header read. The same entry object is returned until the
+    table is downloaded again, so callers may key derived data on it.
+    Inside a command scope the first copy read is reused until the
+    command ends, whatever the cache TTL.
+    """
+    uow = current_unit()
+    if uow is not None and ws.title in uow.tables:
+        return uow.tables[ws.title]
+
+    entry = get_cache().get(ws.title)
+    if entry is None and ws.title in _tails:
+        return read_tables({ws.title: (headers, error)})[ws.title]
+    if entry is None:
+        buf = _buffers.get(ws.title)
+        # Hold the buffer still so no row is both unsent and downloaded.
+        with buf.lock if buf is not None else nullcontext():
+            entry = _store_table(
+                ws, ws.get_all_values(), headers, error, buf
+            )
+    if uow is not None:
+        uow.tables[ws.title] = entry
+    return entry
+
+
+def _store_table(
+    ws: gspread.Worksheet,
+    values: List[List[str]],
+    headers: Optional[List[str]],
+    error: str,
+    buf: Optional[WriteBuffer],
+) -> TableEntry:
+    """
+    Check and cache a freshly downloaded values matrix of ws. The
+    caller holds buf.lock while downloading and storing.
+    """
+    if headers is not None:
+        _check_headers(ws, values[0] if values else [], headers, error)
+        values = values or [list(headers)]
+    records = records_from_values(values)
+    _write_snapshot("save", ws.title, values)
+    entry = get_cache().put(
+        ws.title,
+        values[0] if values else [],
+        records,
+        estimate_size(values),
+    )
+    if _delta_sync(ws.title):
+        tail = TailState.from_values(values, entry)
+        if tail is not None:
+            _tails[ws.title] = tail
+    if buf is not None:
+        _overlay_pending(ws.title, entry, buf)
+    return entry
+
+
+def _delta_sync(title: str) -> bool:
+    """Whether title may be refreshed by reading only its new rows."""
+    return title in APPEND_ONLY_SHEETS and bool(
+        _env_number("BP_DELTA_SYNC", 1)
+    )
+
+
+def _store_tail(
+    ws: gspread.Worksheet,
+    key: str,
+    pieces: List[List[List[str]]],
+    buf: Optional[WriteBuffer],
+) -> Optional[TableEntry]:
+    """
+    Add a downloaded tail (see TailState.ranges) to the table cached
+    under key (ws's whole table or a projection), in place when
+    possible, and cache the result. Returns None if the sheet changed
+    in some other way and must be downloaded again.
+    """
+    tail = _tails.get(key)
+    known = tail.rows if tail is not None else 0
+    entry = tail.apply(*pieces) if tail is not None else None
+    if entry is None:
+        _tails.pop(key, None)
+        return None
+    if pieces[2] and key == ws.title:
+        _write_snapshot("extend", ws.title, known, pieces[2])
+    get_cache().store(key, entry)
+    if buf is not None:
+        _overlay_pending(key, entry, buf)
+    return entry
+
+
+def _drop_tails(title: str) -> None:
+    """Forget the tail states of title and its projections."""
+    for key in [k for k in _tails if key_title(k) == title]:
+        del _tails[key]
+
+
+def _batch_get(
+    plans: List[Tuple[str, str, List[str]]],
+) -> List[Tuple[str, str, List[List[List[str]]]]]:
+    """
+    Fetch the ranges of several (title, how, ranges) plans with one
+    values:batchGet request; returns (title, how, values per range).
+    """
+    ranges = [name for _, _, names in plans for name in names]
+    response = get_scheduler().call(
+        READ, get_sheet().values_batch_get, ranges
+    )
+    results = [r.get("values", []) for r in response.get("valueRanges", [])]
+    out = []
+    for title, how, names in plans:
+        out.append((title, how, results[:len(names)]))
+        del results[:len(names)]
+    return out
+
+
+def _column_letter(col: int) -> str:
+    return rowcol_to_a1(1, col)[:-1]
+
+
+def _projection_ranges(title: str, columns: List[int]) -> List[str]:
+    """A1 ranges for row 1 plus the data rows of the given columns."""
+    ranges = [absolute_range_name(title, "1:1")]
+    for first, last in column_runs(columns):
+        span = f"{_column_letter(first)}2:{_column_letter(last)}"
+        ranges.append(absolute_range_name(title, span))
+    return ranges
+
+
+def _store_projection(
+    ws: gspread.Worksheet,
+    names: List[str],
+    columns: List[int],
+    header: List[str],
+    pieces: List[List[List[str]]],
+    buf: Optional[WriteBuffer],
+) -> TableEntry:
+    """
+    Join the column runs of one download and cache the projection;
+    header is row 1 of the sheet, read with it.
+    """
+    key = table_key(ws.title, names)
+    values = [list(names)] + join_runs(column_runs(columns), pieces)
+    entry = get_cache().put(
+        key,
+        names,
+        records_from_values(values),
+        estimate_size(values),
+        columns=columns,
+    )
+    if _delta_sync(ws.title):
+        tail = TailState.from_values(values, entry, headers=header)
+        if tail is not None:
+            _tails[key] = tail
+    if buf is not None:
+        _overlay_pending(key, entry, buf)
+    return entry
+
+
+def _held(key: str) -> Optional[TableEntry]:
+    """The command's copy of key, else a live cached one."""
+    uow = current_unit()
+    entry = uow.tables.get(key) if uow is not None else None
+    return entry if entry is not None else get_cache().get(key)
+
+
+def read_tables(
+    specs: Dict[str, TableSpec],
+    columns: Optional[Dict[str, List[str]]] = None,
+) -> Dict[str, TableEntry]:
+    """
+    Return the tables for several worksheets (title -> TableSpec).
+
+    Tables already held by the command scope or the cache are reused;
+    all the others are downloaded together in one values:batchGet
+    request instead of one request per worksheet.
+
+    columns may name, per title, the only columns the caller needs;
+    those worksheets then come back as projections (see TableEntry)
+    and only those columns are downloaded. This needs the expected
+    headers in the spec; otherwise the whole worksheet is read. A
+    projection of an append-only worksheet also holds its key column,
+    so it can be refreshed by reading only the new rows of its columns
+    (see delta_sync.py). When the full table is in memory anyway (or
+    only it can be refreshed that way), that full table is returned
+    instead; its records hold every column.
+    """
+    columns = columns or {}
+    uow = current_unit()
+    found: Dict[str, TableEntry] = {}
+    keys: Dict[str, str] = {}
+    # title -> (header names, 1-based columns) of wanted projections
+    wanted: Dict[str, Tuple[List[str], List[int]]] = {}
+    for title, (headers, _) in specs.items():
+        names = columns.get(title)
+        buf = _buffers.get(title)
+        if (
+            names
+            and headers is not None
+            and set(names) <= set(headers)
+            and not (buf is not None and buf.uncertain)
+        ):
+            if _delta_sync(title):
+                names = list(names) + [headers[0]]
+            # Sheet order, so each entry's columns are ascending.
+            names = [h for h in headers if h in names]
+            wanted[title] = (names, [headers.index(n) + 1 for n in names])
+            keys[title] = table_key(title, names)
+        else:
+            keys[title] = title
+
+        entry = _held(keys[title])
+        if entry is None and title in wanted:
+            # A full copy in memory beats downloading the columns.
+            entry = _held(title)
+        if entry is not None:
+            found[title] = entry
+
+    missing = [title for title in specs if title not in found]
+    tails = [title for title in missing if title in _tails]
+    if len(missing) == 1 and not tails and missing[0] not in wanted:
+        title = missing[0]
+        found[title] = read_table(get_worksheet(title), *specs[title])
+    elif missing:
+        found.update(_download(missing, specs, wanted))
+    if uow is not None:
+        for title, entry in found.items():
+            key = keys[title] if entry.columns is not None else title
+            uow.tables[key] = entry
+    return {title: found[title] for title in specs}
+
+
+def _download(
+    missing: List[str],
+    specs: Dict[str, TableSpec],
+    wanted: Dict[str, Tuple[List[str], List[int]]],
+) -> Dict[str, TableEntry]:
+    """Fetch the missing tables of read_tables with one batchGet."""
+    handles = {title: get_worksheet(title) for title in missing}
+    bufs = {t: _buffers[t] for t in missing if t in _buffers}
+    plans: List[Tuple[str, str, List[str]]] = []
+    # title -> cache key of the table refreshed by a tail read
+    tail_keys: Dict[str, str] = {}
+    for title in missing:
+        headers = specs[title][0]
+        keys = [title]
+        if title in wanted:
+            keys.insert(0, table_key(title, wanted[title][0]))
+        for key in keys:
+            tail = _tails.get(key)
+            if tail is None or tail.entry is None:
+                # Its table was evicted: nothing to add a tail to.
+                _tails.pop(key, None)
+            elif headers in (None, tail.headers):
+                tail_keys[title] = key
+                plans.append((title, "tail", tail.ranges(title)))
+                break
+        else:
+            plans.append(_plan(title, wanted))
+
+    found: Dict[str, TableEntry] = {}
+    with ExitStack() as stack:
+        # Sorted, so two threads never take the same locks in turn.
+        for title in sorted(bufs):
+            stack.enter_context(bufs[title].lock)
+        stale: List[str] = []
+        for title, how, pieces in _batch_get(plans):
+            ws, buf = handles[title], bufs.get(title)
+            if how == "tail":
+                entry = _store_tail(ws, tail_keys[title], pieces, buf)
+                if entry is None:
+                    stale.append(title)
+                    continue
+                found[title] = entry
+            else:
+                found[title] = _store_download(
+                    ws, how, pieces, specs[title], wanted, buf
+                )
+        if stale:
+            # The sheet changed other than by appends: read it again.
+            plans = [_plan(title, wanted) for title in stale]
+            for title, how, pieces in _batch_get(plans):
+                found[title] = _store_download(
+                    handles[title], how, pieces, specs[title], wanted,
+                    bufs.get(title),
+                )
+    return found
+
+
+def _plan(
+    title: str, wanted: Dict[str, Tuple[List[str], List[int]]]
+) -> Tuple[str, str, List[str]]:
+    """The (title, how, ranges) of downloading title's wanted columns."""
+    if title in wanted:
+        cols = wanted[title][1]
+        return (title, "columns", _projection_ranges(title, cols))
+    return (title, "full", [absolute_range_name(title)])
+
+
+def _store_download(
+    ws: gspread.Worksheet,
+    how: str,
+    pieces: List[List[List[str]]],
+    spec: TableSpec,
+    wanted: Dict[str, Tuple[List[str], List[int]]],
+    buf: Optional[WriteBuffer],
+) -> TableEntry:
+    """Check and cache a "columns" or "full" download (see _plan)."""
+    headers, error = spec
+    if how == "columns":
+        names, cols = wanted[ws.title]
+        first = pieces[0][0] if pieces[0] else []
+        _check_headers(ws, first, headers, error)
+        return _store_projection(ws, names, cols, first, pieces[1:], buf)
+    return _store_table(ws, pieces[0], headers, error, buf)
+
+
+def read_records(
+    ws: gspread.Worksheet,
+    headers: Optional[List[str]] = None,
+    error: str = "",
+) -> List[Dict]:
+    """
+    Return the rows of ws as records (see read_table).
+
+    The returned list is a copy; the record dicts are shared with the
+    cache and must not be edited.
+    """
+    return list(read_table(ws, headers, error).records)
+
+
+def read_rows(
+    ws: gspread.Worksheet, rows: List[int], headers: List[str]
+) -> Dict[int, Dict]:
+    """
+    Read some rows (1-based sheet numbers) straight from the sheet, in
+    one values:batchGet request and bypassing the cache. Returns row
+    number -> record; rows that are empty or past the end are left out.
+    """
+    rows = sorted(set(rows))
+    if not rows:
+        return {}
+    names = [absolute_range_name(ws.title, f"{r}:{r}") for r in rows]
+    ((_, _, pieces),) = _batch_get([(ws.title, "rows", names)])
+    found: Dict[int, Dict] = {}
+    for row, values in zip(rows, pieces):
+        if values and any(str(v).strip() for v in values[0]):
+            found[row] = records_from_values([list(headers), values[0]])[0]
+    return found
+
+
+def cached_table(title: str) -> Optional[TableEntry]:
+    """Return the in-memory table for title without downloading."""
+    uow = current_unit()
+    if uow is not None and title in uow.tables:
+        return uow.tables[title]
+    return get_cache().get(title)
+
+
+def invalidate_table(title: str) -> None:
+    """
+    Forget the cached copies of a worksheet (and its projections) so the
+    next read refetches.
+    """
+    get_cache().invalidate(title)
+    _drop_tails(title)
+    uow = current_unit()
+    if uow is not None:
+        for key in [k for k in uow.tables if key_title(k) == title]:
+            del uow.tables[key]
+
+
+def _scope_entries(title: str) -> List[TableEntry]:
+    """The command's copies of title that are not cached entries."""
+    uow = current_unit()
+    if uow is None:
+        return []
+    cache = get_cache()
+    return [
+        entry
+        for key, entry in uow.tables.items()
+        if key_title(key) == title and entry is not cache.peek(key)
+    ]
+
+
+def append_row(ws: gspread.Worksheet, row: List[Any], **kwargs) -> None:
+    """Append one row to ws and patch it into the in-memory tables."""
+    append_rows(ws, [row], **kwargs)
+
+
+def append_rows(
+    ws: gspread.Worksheet, rows: List[List[Any]], **kwargs
+) -> None:
+    """
+    Append several rows to ws in one request and patch the in-memory
+    tables. Inside a command scope the request is queued instead.
+    """
+    if not rows:
+        return
+    settle(ws.title)
+    uow = current_unit()
+    if uow is not None:
+        for row in rows:
+            uow.queue_append(ws, row, kwargs)
+    elif len(rows) == 1:
+        ws.append_row(rows[0], **kwargs)
+    else:
+        ws.append_rows(rows, **kwargs)
+    _patch_appended(ws.title, rows)
+
+
+def append_rows_now(
+    ws: gspread.Worksheet, rows: List[List[Any]], **kwargs
+) -> None:
+    """
+    Append rows in one request right away, even inside a command scope,
+    and drop the cached table instead of patching it. Meant for bulk
+    loads, where keeping every row in memory is not wanted.
+    """
+    if not rows:
+        return
+    settle(ws.title)
+    ws.append_rows(rows, **kwargs)
+    invalidate_table(ws.title)
+
+
+def _patch_appended(title: str, rows: List[List[Any]]) -> None:
+    """Add appended rows to the cached tables and the command's copies."""
+    scoped = _scope_entries(title)
+    get_cache().append(title, rows)
+    for entry in scoped:
+        if entry.headers:
+            patch_append(entry, rows)
+
+
+def update_cell(ws: gspread.Worksheet, row: int, col: int, value) -> None:
+    """
+    Update one cell (1-based) in ws and patch the in-memory tables.
+    Inside a command scope the update is queued instead.
+    """
+    settle(ws.title)
+    uow = current_unit()
+    if uow is not None:
+        uow.queue_update(ws, row, col, value)
+    else:
+        ws.update_cell(row, col, value)
+    # The rows known to the tail states are no longer what is stored.
+    if ws.title in _tails:
+        _write_snapshot("discard", ws.title)
+    _drop_tails(ws.title)
+    scoped = _scope_entries(ws.title)
+    get_cache().update(ws.title, row, col, value)
+    for entry in scoped:
+        patch_update(entry, row, col, value)
+
+
+def get_buffer(ws: gspread.Worksheet) -> WriteBuffer:
+    """Return the write-behind buffer for ws, creating it on first use."""
+    with _lock:
+        buf = _buffers.get(ws.title)
+        if buf is None:
+            load_dotenv()
+            buf = WriteBuffer(
+                ws,
+                max_rows=int(_env_number("BP_TXN_BUFFER_ROWS", 25)),
+                max_age=_env_number("BP_TXN_BUFFER_SECONDS", 15.0),
+            )
+            _buffers[ws.title] = buf
+        # Keep the handle current after reset_client().
+        buf.ws = ws
+        return buf
+
+
+def buffered_append(ws: gspread.Worksheet, row: List[Any]) -> None:
+    """
+    Add a row to ws's write-behind buffer and patch the in-memory tables,
+    so reads see it at once. A full buffer is flushed straight away; if
+    that fails the rows stay buffered and are retried on the next flush.
+    """
+    settle(ws.title)
+    buf = get_buffer(ws)
+    with buf.lock:
+        buf.add(row)
+        _patch_appended(ws.title, [row])
+    if buf.is_due():
+        try:
+            buf.flush()
+        except Exception as exc:
+            print(f"Rows for '{ws.title}' not saved yet (will retry): {exc}")
+
+
+def _overlay_pending(key: str, entry: TableEntry, buf: WriteBuffer) -> None:
+    """Add still-buffered rows to a freshly downloaded table."""
+    rows = buf.pending()
+    if rows and buf.uncertain and entry.headers and entry.columns is None:
+        # A failed flush may have saved some rows; skip those.
+        key = entry.headers[buf.key_col - 1]
+        saved = {str(r.get(key, "")) for r in entry.records}
+        rows = [r for r in rows if str(r[buf.key_col - 1]) not in saved]
+    if not rows or not entry.headers:
+        return
+    cache = get_cache()
+    if cache.peek(key) is entry:
+        cache.append_to(key, rows)
+    else:
+        patch_append(entry, rows)
+
+
+def flush_buffers() -> int:
+    """
+    Save every buffered row now. Returns the number of rows sent.
+    All buffers are tried; the first failure is raised afterwards.
+    """
+    sent = 0
+    failure: Optional[Exception] = None
+    for buf in list(_buffers.values()):
+        try:
+            sent += buf.flush()
+        except Exception as exc:
+            failure = failure or exc
+    if failure is not None:
+        raise failure
+    return sent
+
+
+def flush_due_buffers() -> None:
+    """Flush buffers whose size or age threshold is reached."""
+    for buf in list(_buffers.values()):
+        if buf.is_due():
+            try:
+                buf.flush()
+            except Exception:
+                pass  # kept buffered; retried on the next flush
+
+
+@atexit.register
+def _flush_at_exit() -> None:
+    """Last chance to save buffered rows when the process ends."""
+    try:
+        flush_buffers()
+    except Exception as exc:
+        print(f"Could not save buffered rows: {exc}")
+
+
+@contextmanager
+def command_scope() -> Iterator[UnitOfWork]:
+    """
+    Run the body as one unit of work: each sheet is read at most once
+    and queued writes are saved when the body ends. Nested scopes join
+    the outer one, which does the saving.
+
+    Raises:
+        FlushError: if queued writes could not be saved. The affected
+            tables are dropped from the cache so they are read again.
+    """
+    uow = current_unit()
+    if uow is not None:
+        yield uow
+        return
+    try:
+        with unit_scope() as uow:
+            yield uow
+    finally:
+        # Writes made before an error were accepted, so save them anyway.
+        try:
+            uow.flush()
+        except FlushError as exc:
+            for title in exc.titles:
+                invalidate_table(title)
+            raise
+        finally:
+            flush_due_buffers()
 
 
 def verify_connection() -> None:
@@ -88,8 +1061,7 @@ def verify_connection() -> None:
     """
     try:
         # Simple smoke test to confirm the environment is set correctly.
-        client = get_client()
-        sheet = get_sheet(client)
+        sheet = get_sheet()
         print(f"Connected successfully to: {sheet.title}")
     except Exception as exc:
         print(f"Connection failed: {exc}")
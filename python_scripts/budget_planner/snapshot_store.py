@@ -0,0 +1,224 @@
+"""
+snapshot_store.py
+-----------------
+Worksheet snapshots kept on disk between sessions.
+
+Each worksheet is saved as one file in a compact binary format, made
+of a file header and one or more blocks of rows:
+
+    header   b"BPSNAP2\\0", then little-endian uint32 version, columns,
+             title length and 0, and a float64 save time (32 bytes)
+    title    UTF-8, padded with zeros to a multiple of 4 bytes
+    blocks   each: uint32 first row, rows and text length (12 bytes),
+             rows * columns + 1 uint32 offsets, then every cell as
+             UTF-8, row by row
+
+In a block, cell i is text[offsets[i]:offsets[i + 1]]. Rows are padded
+or cut to the width of the header row, the first row of the first
+block. save() writes a file with one block under a temporary name and
+renames it, so a reader never sees half a file. extend() appends a
+block for rows added to the sheet, in place; a reader keeps the blocks
+that continue the rows before them and stops at the first that does
+not (one cut short, or the same rows added twice). Files are readable
+by the owner only; the gateway never saves the users sheet.
+
+load() reads the whole file with plain file I/O and decodes every
+cell: a snapshot is always loaded whole into the cache.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import struct
+import sys
+import tempfile
+import time
+from array import array
+from itertools import accumulate
+from typing import Any, BinaryIO, List, Optional, Tuple
+
+MAGIC = b"BPSNAP2\0"
+VERSION = 2
+_HEADER = struct.Struct("<8sIIIId")
+_BLOCK = struct.Struct("<III")
+
+
+def _pad4(n: int) -> int:
+    return (n + 3) & ~3
+
+
+def encode_block(start: int, width: int, rows: List[List[Any]]) -> bytes:
+    """Encode rows (the first being row start, 0-based) as one block."""
+    cells: List[bytes] = []
+    for row in rows:
+        texts = ["" if v is None else str(v) for v in row[:width]]
+        texts += [""] * (width - len(texts))
+        cells.extend(t.encode("utf-8") for t in texts)
+    offsets = array("I", [0])
+    offsets.extend(accumulate(len(c) for c in cells))
+    if sys.byteorder == "big":
+        offsets.byteswap()
+    text = b"".join(cells)
+    return b"".join(
+        [_BLOCK.pack(start, len(rows), len(text)), offsets.tobytes(), text]
+    )
+
+
+def encode_snapshot(title: str, values: List[List[Any]]) -> bytes:
+    """Encode a values matrix (header row first) as a snapshot file."""
+    width = len(values[0]) if values else 0
+    name = title.encode("utf-8")
+    head = _HEADER.pack(MAGIC, VERSION, width, len(name), 0, time.time())
+    padding = b"\0" * (_pad4(len(name)) - len(name))
+    return b"".join([head, name, padding, encode_block(0, width, values)])
+
+
+def _read_header(data: bytes, title: str) -> Optional[Tuple[int, int]]:
+    """(columns, offset of the first block), or None if not title's."""
+    if len(data) < _HEADER.size:
+        return None
+    magic, version, width, name_len, _, _ = _HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        return None
+    start = _HEADER.size
+    if data[start:start + name_len] != title.encode("utf-8"):
+        return None
+    return width, start + _pad4(name_len)
+
+
+def _block_size(width: int, rows: int, text_len: int) -> int:
+    return _BLOCK.size + 4 * (rows * width + 1) + text_len
+
+
+def decode_snapshot(data: bytes, title: str) -> Optional[List[List[str]]]:
+    """
+    Decode a snapshot of title back into its values. Returns None if
+    it is not a valid snapshot of that worksheet.
+    """
+    found = _read_header(data, title)
+    if found is None:
+        return None
+    width, pos = found
+    values: List[List[str]] = []
+    while pos + _BLOCK.size <= len(data):
+        start, rows, text_len = _BLOCK.unpack_from(data, pos)
+        end = pos + _block_size(width, rows, text_len)
+        if start != len(values) or end > len(data):
+            break
+        count = rows * width
+        offsets = array("I")
+        offsets.frombytes(data[pos + _BLOCK.size:end - text_len])
+        if sys.byteorder == "big":
+            offsets.byteswap()
+        text = data[end - text_len:end]
+        if offsets[-1] != text_len:
+            break
+        cells = [
+            text[offsets[i]:offsets[i + 1]].decode("utf-8")
+            for i in range(count)
+        ]
+        values.extend(cells[i:i + width] for i in range(0, count, width))
+        pos = end
+    return values or None
+
+
+def _scan(fh: BinaryIO, title: str) -> Optional[Tuple[int, int, int]]:
+    """
+    (columns, rows, end of the last good block) of an open snapshot,
+    reading only the block headers; None if it is not title's.
+    """
+    head = fh.read(_HEADER.size + _pad4(len(title.encode("utf-8"))))
+    found = _read_header(head, title)
+    if found is None:
+        return None
+    width, pos = found
+    size = os.fstat(fh.fileno()).st_size
+    rows = 0
+    while pos + _BLOCK.size <= size:
+        fh.seek(pos)
+        start, count, text_len = _BLOCK.unpack(fh.read(_BLOCK.size))
+        end = pos + _block_size(width, count, text_len)
+        if start != rows or end > size:
+            break
+        rows += count
+        pos = end
+    return width, rows, pos
+
+
+class SnapshotStore:
+    """
+    Snapshot files of one spreadsheet in a directory. namespace (the
+    spreadsheet ID) keeps the files of different spreadsheets apart.
+    """
+
+    def __init__(self, directory: str, namespace: str):
+        self.directory = directory
+        self.namespace = namespace
+
+    def path(self, title: str) -> str:
+        digest = hashlib.sha1(
+            f"{self.namespace}\0{title}".encode("utf-8")
+        ).hexdigest()
+        return os.path.join(self.directory, digest[:20] + ".snap")
+
+    def load(self, title: str) -> Optional[List[List[str]]]:
+        """Return the saved values of title, or None if there are none."""
+        try:
+            with open(self.path(title), "rb") as fh:
+                return decode_snapshot(fh.read(), title)
+        except (OSError, ValueError, UnicodeDecodeError):
+            return None
+
+    def save(self, title: str, values: List[List[Any]]) -> None:
+        """Replace the snapshot of title with values."""
+        if not values or not values[0]:
+            self.discard(title)
+            return
+        data = encode_snapshot(title, values)
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(data)
+            os.replace(tmp, self.path(title))
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+
+    def extend(
+        self, title: str, known: int, rows: List[List[Any]]
+    ) -> None:
+        """
+        Add rows appended to the sheet after its first known rows (the
+        header row not counted) as a new block at the end of the file.
+        A snapshot of another length is out of step with the sheet and
+        is removed instead.
+        """
+        if not rows:
+            return
+        try:
+            fh = open(self.path(title), "r+b")
+        except OSError:
+            return
+        with fh:
+            found = _scan(fh, title)
+            if found is None or found[1] != known + 1:
+                fh.close()
+                self.discard(title)
+                return
+            width, count, end = found
+            # Anything after the last good block is a cut-short write.
+            fh.seek(end)
+            fh.write(encode_block(count, width, rows))
+            fh.truncate()
+
+    def discard(self, title: str) -> None:
+        """Remove the snapshot of title, if any."""
+        try:
+            os.unlink(self.path(title))
+        except OSError:
+            pass
@@ -0,0 +1,682 @@
+"""
+storage.py
+----------
+Storage backends used by the service modules.
+
+Services talk to a StorageBackend instead of gspread directly:
+- read_table    decoded rows of a table (cached, see TableEntry)
+- read_tables   several tables at once (one request on Sheets),
+                optionally only some columns and some rows (where)
+- ensure_table  check (or create) a table and its header row
+- append_rows   add rows at the end of a table
+- update_cells  change cells addressed by 1-based (row, col)
+- find_row      first row matching some column values (trimmed text,
+                compared case-insensitively), as stored right now
+- read_rows     some rows by number, straight from the store
+
+Two backends exist:
+- SheetsBackend  Google Sheets through sheets_gateway (the default)
+- SqliteBackend  a local SQLite file; find_row is an indexed lookup,
+                 and read_tables selects only the columns and rows
+                 asked for, through indexes (SQLITE_INDEXES)
+
+Pick one with BP_STORAGE=sheets|sqlite; BP_SQLITE_PATH sets the file
+(default budget_planner.db).
+
+Row numbers follow the sheet layout everywhere: row 1 is the header
+and the first record is row 2. Tables are append-only, so in SQLite
+row n is the row whose explicit INTEGER PRIMARY KEY (_row) is n - 1;
+unlike a plain rowid, VACUUM never renumbers it.
+
+The services filter and aggregate in memory, through the views kept
+with each loaded table. Where a backend has filters_rows set (SQLite),
+they look the user up first and pass their user, date and goal
+filters to read_tables, so only the matching rows are read; Sheets
+ignores the filters and returns whole tables, and the services'
+own filtering gives the same answers either way.
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Protocol, Tuple
+
+import gspread
+from dotenv import load_dotenv
+
+from . import sheets_gateway as gw
+from .table_cache import (
+    TableEntry,
+    TableSpec,
+    decode_row,
+    estimate_size,
+    key_title,
+    patch_append,
+    patch_update,
+    table_key,
+)
+from ..utilities.constants import SHEET_HEADERS
+
+Update = Tuple[int, int, Any]
+# One read_tables filter: (column, op, value), op being "=" (equal) or
+# "^" (starts with); text is trimmed and compared case-insensitively.
+Condition = Tuple[str, str, Any]
+
+
+class StorageBackend(Protocol):
+    """Operations the services need from a store."""
+
+    name: str
+    # True if read_tables applies where in the store itself, so it pays
+    # to look ids up first and read only the rows they select.
+    filters_rows: bool
+
+    def read_table(
+        self,
+        title: str,
+        headers: Optional[List[str]] = None,
+        error: str = "",
+    ) -> TableEntry:
+        """Return the table; the same entry until its data is reloaded."""
+        ...
+
+    def read_tables(
+        self,
+        specs: Dict[str, TableSpec],
+        columns: Optional[Dict[str, List[str]]] = None,
+        where: Optional[Dict[str, List[Condition]]] = None,
+    ) -> Dict[str, TableEntry]:
+        """
+        Return several tables (title -> (headers, error)) at once.
+        columns: per title, the only columns the caller needs; a backend
+        may then return just those (records may also hold more).
+        where: per title, conditions every row the caller needs meets;
+        a backend may then return just those rows (records may also
+        hold others, and are not numbered like sheet rows).
+        """
+        ...
+
+    def ensure_table(
+        self,
+        title: str,
+        headers: List[str],
+        error: str = "",
+        *,
+        create: bool = False,
+    ) -> None:
+        """Check the header row (raise RuntimeError(error) on mismatch)."""
+        ...
+
+    def append_rows(
+        self,
+        title: str,
+        rows: List[List[Any]],
+        *,
+        buffered: bool = False,
+        bulk: bool = False,
+        raw: bool = False,
+    ) -> None:
+        """Append rows (buffered = write-behind, bulk = large import)."""
+        ...
+
+    def update_cells(self, title: str, updates: List[Update]) -> None:
+        """Write each (row, col, value); row/col are 1-based."""
+        ...
+
+    def find_row(
+        self, title: str, match: Dict[str, Any]
+    ) -> Optional[Tuple[int, Dict]]:
+        """
+        Return (row number, record) of the first case-insensitive match,
+        checked against the store itself so the row can be written to.
+        Raises RuntimeError if the store keeps changing under the check.
+        """
+        ...
+
+    def read_rows(
+        self, title: str, rows: List[int], headers: List[str]
+    ) -> Dict[int, Dict]:
+        """
+        Read rows by number from the store itself, not a cached copy;
+        returns row number -> record for the rows that exist.
+        """
+        ...
+
+    def cached_table(self, title: str) -> Optional[TableEntry]:
+        """Return the in-memory table for title without loading it."""
+        ...
+
+    def invalidate(self, title: str) -> None:
+        """Make the next read_table load title again."""
+        ...
+
+    def flush(self) -> None:
+        """Save any buffered writes."""
+        ...
+
+    def warm_start(self) -> None:
+        """Load local copies of the tables so first reads are fast."""
+        ...
+
+    def settle(self, title: str) -> None:
+        """Wait until the copy of title in use is known to be current."""
+        ...
+
+
+def _same(cell: Any, value: Any) -> bool:
+    """Case-insensitive comparison of trimmed cell text."""
+    return str(cell).strip().lower() == str(value).strip().lower()
+
+
+def _matches(record: Dict, match: Dict[str, Any]) -> bool:
+    """Whether record holds every value of match (see _same)."""
+    return all(_same(record.get(k, ""), v) for k, v in match.items())
+
+
+def _meets(record: Dict, conditions: List[Condition]) -> bool:
+    """Whether record meets every condition, as the SQL filter does."""
+    for name, op, value in conditions:
+        cell = str(record.get(name, "")).strip().lower()
+        text = str(value).strip().lower()
+        if not (cell == text if op == "=" else cell.startswith(text)):
+            return False
+    return True
+
+
+class SheetsBackend:
+    """Google Sheets storage (cache, command scope and write buffer)."""
+
+    name = "sheets"
+    # One request reads every table; filtering would cost another.
+    filters_rows = False
+
+    def read_table(self, title, headers=None, error=""):
+        return gw.read_table(gw.get_worksheet(title), headers, error)
+
+    def read_tables(self, specs, columns=None, where=None):
+        return gw.read_tables(specs, columns)
+
+    def ensure_table(self, title, headers, error="", *, create=False):
+        try:
+            ws = gw.get_worksheet(title)
+        except gspread.WorksheetNotFound:
+            if not create:
+                raise
+            ws = gw.add_worksheet(title, rows=1000, cols=len(headers))
+        gw.ensure_headers(ws, headers, error)
+
+    def append_rows(
+        self, title, rows, *, buffered=False, bulk=False, raw=False
+    ):
+        ws = gw.get_worksheet(title)
+        option = "RAW" if raw else "USER_ENTERED"
+        if bulk:
+            gw.append_rows_now(ws, rows, value_input_option=option)
+        elif buffered:
+            for row in rows:
+                gw.buffered_append(ws, row)
+        else:
+            gw.append_rows(ws, rows, value_input_option=option)
+
+    def update_cells(self, title, updates):
+        ws = gw.get_worksheet(title)
+        # Sent as one batch_update when the (joined) scope ends.
+        with gw.command_scope():
+            for row, col, value in updates:
+                gw.update_cell(ws, row, col, value)
+
+    def find_row(self, title, match):
+        # The row found may be written to, so no unchecked snapshot, and
+        # the cached copy may be stale: the row is read back and must
+        # still match. A miss or a mismatch downloads the table again.
+        gw.settle(title)
+        found = None
+        for attempt in range(2):
+            if attempt:
+                self.invalidate(title)
+            entry = self.read_table(title)
+            found = next(
+                (
+                    (row_number, record)
+                    for row_number, record in enumerate(
+                        entry.records, start=2
+                    )
+                    if _matches(record, match)
+                ),
+                None,
+            )
+            if found is None:
+                continue
+            stored = self.read_rows(title, [found[0]], entry.headers)
+            if _matches(stored.get(found[0], {}), match):
+                return found
+        if found is None:
+            return None
+        raise RuntimeError(
+            f"The {title} sheet changed while saving. Please try again."
+        )
+
+    def read_rows(self, title, rows, headers):
+        return gw.read_rows(gw.get_worksheet(title), rows, headers)
+
+    def cached_table(self, title):
+        return gw.cached_table(title)
+
+    def invalidate(self, title):
+        gw.invalidate_table(title)
+
+    def flush(self):
+        gw.flush_buffers()
+
+    def warm_start(self):
+        gw.warm_start()
+
+    def settle(self, title):
+        gw.settle(title)
+
+
+# Columns looked up by find_row and read_tables filters, per table;
+# each tuple becomes one index on the trimmed, case-insensitive text
+# (see _trimmed).
+SQLITE_INDEXES: Dict[str, List[Tuple[str, ...]]] = {
+    "users": [("email",)],
+    "Role": [("email",)],
+    "transactions": [("user_id",), ("date",)],
+    "budget": [("user_id", "month", "category_norm"), ("month",)],
+}
+# The explicit row key of every SQLite table (see the module docstring).
+_ROW = "_row"
+# Filtered copies (see read_tables' where) kept per table.
+_FILTERED_MAX = 32
+
+
+def _quote(name: str) -> str:
+    """Quote an SQL identifier."""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _trimmed(name: str) -> str:
+    """A column's text as find_row compares it (and its indexes hold)."""
+    return f"TRIM({_quote(name)}) COLLATE NOCASE"
+
+
+def _where_sql(conditions: List[Condition]) -> Tuple[str, List[str]]:
+    """SQL (for the indexes on _trimmed text) and values of conditions."""
+    terms: List[str] = []
+    values: List[str] = []
+    for name, op, value in conditions:
+        text = str(value).strip()
+        if op == "=":
+            terms.append(f"{_trimmed(name)} = ?")
+            values.append(text)
+        elif op == "^":
+            # A range, so the index is used: no text sorts after
+            # text + U+10FFFF and still starts with text.
+            terms.append(f"{_trimmed(name)} >= ? AND {_trimmed(name)} < ?")
+            values.extend([text, text + "\U0010ffff"])
+        else:
+            raise ValueError(f"Unknown filter operator '{op}'.")
+    return " AND ".join(terms) or "1", values
+
+
+class SqliteBackend:
+    """
+    Local SQLite storage. One table per worksheet title, columns named
+    after the header row, compared case-insensitively (NOCASE).
+
+    Loaded tables (and the column projections read_tables asks for,
+    see table_key) are kept until another connection commits (checked
+    with PRAGMA data_version); this process's own writes patch them.
+    So are the last _FILTERED_MAX filtered reads of each table, keyed
+    by columns and conditions. Records are decoded like
+    get_all_records(), numbers included.
+    """
+
+    name = "sqlite"
+    filters_rows = True
+
+    def __init__(
+        self, path: str, schemas: Optional[Dict[str, List[str]]] = None
+    ):
+        self.path = path
+        self.schemas = schemas if schemas is not None else SHEET_HEADERS
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._lock = threading.RLock()
+        self._columns: Dict[str, List[str]] = {}
+        self._entries: Dict[str, Tuple[int, TableEntry]] = {}
+        # title -> (columns, conditions) -> (data_version, entry), the
+        # most recently used last.
+        self._filtered: Dict[
+            str, Dict[Tuple[Tuple[str, ...], Tuple[Condition, ...]],
+                      Tuple[int, TableEntry]]
+        ] = {}
+
+    def _data_version(self) -> int:
+        return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _table(
+        self,
+        title: str,
+        headers: Optional[List[str]] = None,
+        error: str = "",
+    ) -> List[str]:
+        """Create the table (and its indexes) if needed; return columns."""
+        cols = self._columns.get(title)
+        if cols is None:
+            info = self._conn.execute(
+                f"PRAGMA table_info({_quote(title)})"
+            ).fetchall()
+            cols = [c[1] for c in info if c[1] != _ROW]
+            if not cols:
+                cols = list(headers or self.schemas.get(title) or [])
+                if not cols:
+                    raise RuntimeError(f"No schema known for '{title}'.")
+                self._create(title, cols)
+            elif len(cols) == len(info):
+                self._add_row_key(title, cols)
+            self._index(title, cols)
+            self._columns[title] = cols
+        if headers is not None and list(headers) != cols:
+            raise RuntimeError(error or f"Unexpected columns in '{title}'.")
+        return cols
+
+    def _create(self, title: str, cols: List[str]) -> None:
+        with self._conn:
+            self._create_table(title, cols)
+
+    def _create_table(self, title: str, cols: List[str]) -> None:
+        defs = ", ".join(
+            [f"{_quote(_ROW)} INTEGER PRIMARY KEY"]
+            + [f"{_quote(c)} COLLATE NOCASE" for c in cols]
+        )
+        self._conn.execute(f"CREATE TABLE {_quote(title)} ({defs})")
+
+    def _add_row_key(self, title: str, cols: List[str]) -> None:
+        """
+        Copy a table made before _row into one with it, each row keeping
+        its rowid (and so its row number) as _row.
+        """
+        old = _quote(f"{title}_before_row_key")
+        names = ", ".join(_quote(c) for c in cols)
+        with self._conn:
+            self._conn.execute(f"ALTER TABLE {_quote(title)} RENAME TO {old}")
+            self._create_table(title, cols)
+            self._conn.execute(
+                f"INSERT INTO {_quote(title)} ({_quote(_ROW)}, {names}) "
+                f"SELECT rowid, {names} FROM {old} ORDER BY rowid"
+            )
+            # Its indexes go with it; _index makes them again.
+            self._conn.execute(f"DROP TABLE {old}")
+
+    def _index(self, title: str, cols: List[str]) -> None:
+        """Create the indexes of title that do not exist yet."""
+        with self._conn:
+            for idx_cols in SQLITE_INDEXES.get(title, []):
+                if not set(idx_cols) <= set(cols):
+                    continue
+                name = _quote(f"ixt_{title}_{'_'.join(idx_cols)}")
+                on = ", ".join(_trimmed(c) for c in idx_cols)
+                self._conn.execute(
+                    f"CREATE INDEX IF NOT EXISTS {name} "
+                    f"ON {_quote(title)} ({on})"
+                )
+
+    def _load(
+        self, title: str, cols: List[str], names: Optional[List[str]] = None
+    ) -> TableEntry:
+        """
+        Return title's table, or only its columns names (in table
+        order), loading it unless the copy held is current.
+        """
+        key = table_key(title, names)
+        version = self._data_version()
+        held = self._entries.get(key)
+        if held is not None and held[0] == version:
+            return held[1]
+        names = names or cols
+        select = ", ".join(_quote(c) for c in names)
+        rows = self._conn.execute(
+            f"SELECT {select} FROM {_quote(title)} ORDER BY {_quote(_ROW)}"
+        ).fetchall()
+        # Decode like get_all_records() so both backends agree.
+        records = [decode_row(names, list(r)) for r in rows]
+        entry = TableEntry(
+            list(names),
+            records,
+            estimate_size(rows),
+            columns=None if key == title else [
+                cols.index(n) + 1 for n in names
+            ],
+        )
+        self._entries[key] = (version, entry)
+        return entry
+
+    def _select(
+        self,
+        title: str,
+        cols: List[str],
+        names: List[str],
+        conditions: List[Condition],
+    ) -> TableEntry:
+        """
+        Return the rows of title that meet conditions, in its columns
+        names (all if empty), read through its indexes unless the copy
+        held is current.
+        """
+        names = names or cols
+        key = (tuple(names), tuple(conditions))
+        version = self._data_version()
+        held = self._filtered.setdefault(title, {})
+        hit = held.pop(key, None)
+        if hit is None or hit[0] != version:
+            where, values = _where_sql(conditions)
+            select = ", ".join(_quote(c) for c in names)
+            rows = self._conn.execute(
+                f"SELECT {select} FROM {_quote(title)} WHERE {where} "
+                f"ORDER BY {_quote(_ROW)}",
+                values,
+            ).fetchall()
+            hit = (version, TableEntry(
+                list(names),
+                [decode_row(names, list(r)) for r in rows],
+                estimate_size(rows),
+                columns=None if names == cols else [
+                    cols.index(n) + 1 for n in names
+                ],
+            ))
+        held[key] = hit
+        while len(held) > _FILTERED_MAX:
+            del held[next(iter(held))]
+        return hit[1]
+
+    def _held(self, title: str) -> List[Tuple[str, TableEntry]]:
+        """(key, entry) of every current copy of title (projections too)."""
+        version = self._data_version()
+        return [
+            (key, held[1])
+            for key, held in self._entries.items()
+            if key_title(key) == title and held[0] == version
+        ]
+
+    def read_table(self, title, headers=None, error=""):
+        with self._lock:
+            return self._load(title, self._table(title, headers, error))
+
+    def read_tables(self, specs, columns=None, where=None):
+        columns = columns or {}
+        where = where or {}
+        found = {}
+        with self._lock:
+            for title, (headers, error) in specs.items():
+                cols = self._table(title, headers, error)
+                names = [c for c in cols if c in columns.get(title, [])]
+                if where.get(title) and self.cached_table(title) is None:
+                    found[title] = self._select(
+                        title, cols, names, where[title]
+                    )
+                    continue
+                if (
+                    not names
+                    or len(names) == len(cols)
+                    or self.cached_table(title) is not None
+                ):
+                    # The whole table is wanted, or loaded anyway.
+                    names = None
+                found[title] = self._load(title, cols, names)
+        return found
+
+    def ensure_table(self, title, headers, error="", *, create=False):
+        with self._lock:
+            self._table(title, headers, error)
+
+    def append_rows(
+        self, title, rows, *, buffered=False, bulk=False, raw=False
+    ):
+        if not rows:
+            return
+        with self._lock:
+            cols = self._table(title)
+            width = len(cols)
+            values = [(list(r) + [""] * width)[:width] for r in rows]
+            names = ", ".join(_quote(c) for c in cols)
+            marks = ", ".join("?" * width)
+            with self._conn:
+                self._conn.executemany(
+                    f"INSERT INTO {_quote(title)} ({names}) "
+                    f"VALUES ({marks})",
+                    values,
+                )
+            if bulk:
+                self.invalidate(title)
+                return
+            for _, held in self._held(title):
+                patch_append(held, values)
+            version = self._data_version()
+            for (_, conditions), (at, held) in self._filtered.get(
+                title, {}
+            ).items():
+                if at != version:
+                    continue
+                patch_append(held, [
+                    v for v in values
+                    if _meets(decode_row(cols, v), list(conditions))
+                ])
+
+    def update_cells(self, title, updates):
+        if not updates:
+            return
+        with self._lock:
+            cols = self._table(title)
+            with self._conn:
+                for row, col, value in updates:
+                    self._conn.execute(
+                        f"UPDATE {_quote(title)} SET {_quote(cols[col - 1])}"
+                        f" = ? WHERE {_quote(_ROW)} = ?",
+                        (value, row - 1),
+                    )
+            # Filtered copies are not numbered like the table.
+            self._filtered.pop(title, None)
+            for key, held in self._held(title):
+                if not all(
+                    patch_update(held, row, col, value)
+                    for row, col, value in updates
+                ):
+                    self._entries.pop(key, None)
+
+    def find_row(self, title, match):
+        with self._lock:
+            cols = self._table(title)
+            where = " AND ".join(f"{_trimmed(k)} = ?" for k in match)
+            select = ", ".join(_quote(c) for c in cols)
+            found = self._conn.execute(
+                f"SELECT {_quote(_ROW)}, {select} FROM {_quote(title)} "
+                f"WHERE {where} ORDER BY {_quote(_ROW)} LIMIT 1",
+                [str(v).strip() for v in match.values()],
+            ).fetchone()
+            if found is None:
+                return None
+            row_number = found[0] + 1
+            held = self.cached_table(title)
+            index = row_number - 2
+            if (
+                held is not None
+                and 0 <= index < len(held.records)
+                and _matches(held.records[index], match)
+            ):
+                # Hand back the shared record so later patches show up.
+                return row_number, held.records[index]
+            return row_number, decode_row(cols, list(found[1:]))
+
+    def read_rows(self, title, rows, headers):
+        rows = sorted(set(rows))
+        if not rows:
+            return {}
+        with self._lock:
+            cols = self._table(title)
+            select = ", ".join(_quote(c) for c in cols)
+            marks = ", ".join("?" * len(rows))
+            found = self._conn.execute(
+                f"SELECT {_quote(_ROW)}, {select} FROM {_quote(title)} "
+                f"WHERE {_quote(_ROW)} IN ({marks})",
+                [r - 1 for r in rows],
+            ).fetchall()
+            return {
+                r[0] + 1: decode_row(cols, list(r[1:])) for r in found
+            }
+
+    def cached_table(self, title):
+        with self._lock:
+            held = self._entries.get(title)
+            if held is None or held[0] != self._data_version():
+                return None
+            return held[1]
+
+    def invalidate(self, title):
+        with self._lock:
+            for key in [k for k in self._entries if key_title(k) == title]:
+                del self._entries[key]
+            self._filtered.pop(title, None)
+
+    def flush(self):
+        # Every write is committed straight away.
+        pass
+
+    def warm_start(self):
+        # The file is local already.
+        pass
+
+    def settle(self, title):
+        pass
+
+
+_backend: Optional[StorageBackend] = None
+_backend_lock = threading.Lock()
+
+
+def get_backend() -> StorageBackend:
+    """Return the process-wide backend chosen by BP_STORAGE."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            load_dotenv()
+            kind = (os.getenv("BP_STORAGE") or "sheets").strip().lower()
+            if kind == "sheets":
+                _backend = SheetsBackend()
+            elif kind == "sqlite":
+                path = os.getenv("BP_SQLITE_PATH") or "budget_planner.db"
+                _backend = SqliteBackend(path)
+            else:
+                raise RuntimeError(
+                    f"Unknown BP_STORAGE '{kind}'. Use 'sheets' or 'sqlite'."
+                )
+        return _backend
+
+
+def set_backend(backend: Optional[StorageBackend]) -> None:
+    """Use this backend from now on (None: choose again from BP_STORAGE)."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
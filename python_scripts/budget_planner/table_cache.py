@@ -0,0 +1,295 @@
+"""
+table_cache.py
+--------------
+Read-through cache for decoded worksheet tables.
+
+Each entry holds the header row and the records of one worksheet.
+Entries expire after a TTL, and when the estimated memory of all
+entries goes over a budget the least recently used ones are evicted.
+Expired entries stay stored (within the budget) until then, so an
+append-only table can be refreshed by adding its new rows to the same
+entry (see delta_sync.py).
+Writes made through sheets_gateway patch the cached rows in place, so
+a fresh append or cell update is visible without downloading again.
+
+An entry may hold only some columns of a worksheet (a projection, see
+table_key); writes to that worksheet patch its projections as well.
+Data derived from an entry (the services' NumPy views, for example) is
+counted as part of it through charge().
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from gspread.utils import numericise_all
+
+# How a caller wants a table read: (expected headers or None, message
+# for the RuntimeError raised when row 1 does not match them).
+TableSpec = Tuple[Optional[List[str]], str]
+
+# Separates the title from the column list in a projection's key.
+_KEY_SEP = "\x00"
+
+# Rough per-cell and per-row overhead of a decoded record, in bytes.
+_CELL_OVERHEAD = 64
+_ROW_OVERHEAD = 240
+
+
+def estimate_size(values: List[List[Any]]) -> int:
+    """Return a rough size in bytes of a values matrix once decoded."""
+    total = 0
+    for row in values:
+        total += _ROW_OVERHEAD
+        for cell in row:
+            total += _CELL_OVERHEAD + len(str(cell))
+    return total
+
+
+def table_key(title: str, columns: Optional[List[str]] = None) -> str:
+    """Cache key of a whole worksheet, or of some of its columns."""
+    if not columns:
+        return title
+    return title + _KEY_SEP + ",".join(columns)
+
+
+def key_title(key: str) -> str:
+    """Return the worksheet title a cache key belongs to."""
+    return key.partition(_KEY_SEP)[0]
+
+
+def decode_row(headers: List[str], row: List[Any]) -> Dict:
+    """Decode one written row into a record, like get_all_records()."""
+    width = len(headers)
+    cells = ["" if v is None else str(v) for v in row]
+    cells = (cells + [""] * width)[:width]
+    return dict(zip(headers, numericise_all(cells)))
+
+
+@dataclass
+class TableEntry:
+    """
+    One cached worksheet: header row, records and bookkeeping. For a
+    projection, columns holds the 1-based sheet column of each header.
+    """
+    headers: List[str]
+    records: List[Dict]
+    size: int
+    loaded_at: float = field(default_factory=time.monotonic)
+    columns: Optional[List[int]] = None
+
+
+def project_row(entry: TableEntry, row: List[Any]) -> List[Any]:
+    """Cut a full sheet row down to the columns entry holds."""
+    if entry.columns is None:
+        return row
+    return [row[c - 1] if c <= len(row) else "" for c in entry.columns]
+
+
+def column_runs(columns: List[int]) -> List[Tuple[int, int]]:
+    """Group sorted column numbers into (first, last) contiguous runs."""
+    runs: List[List[int]] = []
+    for col in columns:
+        if runs and col == runs[-1][1] + 1:
+            runs[-1][1] = col
+        else:
+            runs.append([col, col])
+    return [(first, last) for first, last in runs]
+
+
+def join_runs(
+    runs: List[Tuple[int, int]], pieces: List[List[List[Any]]]
+) -> List[List[Any]]:
+    """
+    Join the values of column runs read side by side (one piece per
+    run, rows in step) into rows of all their columns.
+    """
+    height = max((len(p) for p in pieces), default=0)
+    rows: List[List[Any]] = []
+    for i in range(height):
+        row: List[Any] = []
+        for (first, last), piece in zip(runs, pieces):
+            width = last - first + 1
+            cells = piece[i] if i < len(piece) else []
+            row.extend((list(cells) + [""] * width)[:width])
+        rows.append(row)
+    return rows
+
+
+def patch_append(entry: TableEntry, rows: List[List[Any]]) -> int:
+    """Append written (full) rows to entry; return the bytes added."""
+    rows = [project_row(entry, row) for row in rows]
+    for row in rows:
+        entry.records.append(decode_row(entry.headers, row))
+    added = estimate_size(rows)
+    entry.size += added
+    return added
+
+
+def patch_update(entry: TableEntry, row: int, col: int, value: Any) -> bool:
+    """
+    Apply one written cell (1-based sheet row/col) to entry.
+    Returns False if the cell is outside the table held in entry.
+    """
+    index = row - 2  # row 1 is the header row
+    if entry.columns is not None:
+        if col not in entry.columns:
+            return 0 <= index < len(entry.records)
+        col = entry.columns.index(col) + 1
+    if not (0 <= index < len(entry.records)) or col > len(entry.headers):
+        return False
+    key = entry.headers[col - 1]
+    entry.records[index][key] = decode_row([key], [value])[key]
+    return True
+
+
+class TableCache:
+    """
+    LRU cache of worksheet tables keyed by table_key().
+
+    get/peek/put/append_to take a key; append/update/invalidate take a
+    worksheet title and apply to the whole table and its projections.
+    A ttl of 0 (or less) disables caching entirely.
+    """
+
+    def __init__(self, ttl: float = 30.0, max_bytes: int = 48 << 20):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, TableEntry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.RLock()
+        _caches.add(self)
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_bytes > 0
+
+    def get(self, key: str) -> Optional[TableEntry]:
+        """Return a live entry for key (marking it recently used)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() - entry.loaded_at > self.ttl:
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def peek(self, key: str) -> Optional[TableEntry]:
+        """Return the stored entry for key, ignoring expiry and LRU."""
+        with self._lock:
+            return self._entries.get(key)
+
+    def put(
+        self,
+        key: str,
+        headers: List[str],
+        records: List[Dict],
+        size: int,
+        columns: Optional[List[int]] = None,
+    ) -> TableEntry:
+        """
+        Store a freshly downloaded table, evicting old entries if needed.
+        Returns the new entry (also when it was too big to keep).
+        """
+        entry = TableEntry(list(headers), records, size, columns=columns)
+        return self.store(key, entry)
+
+    def store(self, key: str, entry: TableEntry) -> TableEntry:
+        """
+        Store entry under key as freshly loaded (it may be stored there
+        already, refreshed in place). Returns entry.
+        """
+        entry.loaded_at = time.monotonic()
+        with self._lock:
+            self._drop(key)
+            if not self.enabled or entry.size > self.max_bytes:
+                return entry
+            self._entries[key] = entry
+            self._bytes += entry.size
+            self._evict()
+        return entry
+
+    def _evict(self) -> None:
+        """Drop least recently used entries until within budget."""
+        while self._bytes > self.max_bytes and self._entries:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+
+    def _charge(self, entry: TableEntry, added: int) -> bool:
+        """Grow a stored entry's size; False if entry is not stored."""
+        with self._lock:
+            for stored in self._entries.values():
+                if stored is entry:
+                    entry.size += added
+                    self._bytes += added
+                    self._evict()
+                    return True
+            return False
+
+    def _keys(self, title: str) -> List[str]:
+        return [k for k in self._entries if key_title(k) == title]
+
+    def append(self, title: str, rows: List[List[Any]]) -> None:
+        """Patch rows just appended to the sheet into the cached tables."""
+        with self._lock:
+            for key in self._keys(title):
+                self.append_to(key, rows)
+
+    def append_to(self, key: str, rows: List[List[Any]]) -> None:
+        """Patch appended rows into the one entry stored under key."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            if not entry.headers:
+                self._drop(key)
+                return
+            added = patch_append(entry, rows)
+            self._bytes += added
+
+    def update(self, title: str, row: int, col: int, value: Any) -> None:
+        """Patch one updated cell (1-based sheet row/col) into the tables."""
+        with self._lock:
+            for key in self._keys(title):
+                entry = self._entries[key]
+                if not patch_update(entry, row, col, value):
+                    self._drop(key)
+
+    def invalidate(self, title: str) -> None:
+        """Forget the cached table for title and its projections."""
+        with self._lock:
+            for key in self._keys(title):
+                self._drop(key)
+
+    def clear(self) -> None:
+        """Forget every cached table."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+
+# Every cache, so that charge() can find the one holding an entry.
+_caches: "weakref.WeakSet[TableCache]" = weakref.WeakSet()
+
+
+def charge(entry: TableEntry, added: int) -> None:
+    """
+    Count added bytes (negative to release) of data derived from entry
+    as part of its size. If a cache holds the entry, its budget counts
+    them too, and least recently used tables are evicted if needed.
+    """
+    for cache in list(_caches):
+        if cache._charge(entry, added):
+            return
+    entry.size += added
@@ -0,0 +1,130 @@
+"""
+unit_of_work.py
+---------------
+Per-command scope for sheet access.
+
+While a UnitOfWork is active (see sheets_gateway.command_scope):
+- each worksheet is read at most once, and later reads reuse that copy;
+- user lookups by email are remembered;
+- writes are queued and sent together when the command finishes
+  (appends as one append_rows call, cell updates as one batch_update
+  per worksheet).
+"""
+
+from __future__ import annotations
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from gspread.utils import rowcol_to_a1
+
+from .table_cache import TableEntry
+
+
+class FlushError(RuntimeError):
+    """Raised when queued writes could not be saved to the sheet."""
+
+    def __init__(self, titles: List[str], cause: Exception):
+        super().__init__(f"could not save to {', '.join(titles)}: {cause}")
+        self.titles = titles
+
+
+@dataclass
+class PendingWrites:
+    """Writes queued for one worksheet."""
+    ws: Any
+    appends: List[Tuple[List[Any], Dict[str, Any]]] = field(
+        default_factory=list
+    )
+    updates: List[Tuple[int, int, Any]] = field(default_factory=list)
+
+
+@dataclass
+class UnitOfWork:
+    """Reads, user lookups and queued writes for one command."""
+    tables: Dict[str, TableEntry] = field(default_factory=dict)
+    users: Dict[str, Tuple[int, Dict]] = field(default_factory=dict)
+    pending: Dict[str, PendingWrites] = field(default_factory=dict)
+
+    def queue_append(self, ws, row: List[Any], kwargs: Dict) -> None:
+        """Queue one row to append to ws."""
+        self._pending_for(ws).appends.append((list(row), dict(kwargs)))
+
+    def queue_update(self, ws, row: int, col: int, value: Any) -> None:
+        """Queue one cell (1-based row/col) to update in ws."""
+        self._pending_for(ws).updates.append((row, col, value))
+
+    def _pending_for(self, ws) -> PendingWrites:
+        if ws.title not in self.pending:
+            self.pending[ws.title] = PendingWrites(ws)
+        return self.pending[ws.title]
+
+    def flush(self) -> None:
+        """
+        Send all queued writes. Appends go first so that updates may
+        target rows appended in the same command.
+
+        Raises:
+            FlushError: naming the worksheets whose writes failed.
+        """
+        failed: List[str] = []
+        cause: Optional[Exception] = None
+        pending, self.pending = self.pending, {}
+        for title, writes in pending.items():
+            try:
+                _flush_appends(writes)
+                _flush_updates(writes)
+            except Exception as exc:
+                failed.append(title)
+                cause = cause or exc
+        if failed:
+            raise FlushError(failed, cause)
+
+
+def _flush_appends(writes: PendingWrites) -> None:
+    """Append queued rows, one request per run of identical options."""
+    batch: List[List[Any]] = []
+    options: Optional[Dict[str, Any]] = None
+    for row, kwargs in writes.appends:
+        if batch and kwargs != options:
+            writes.ws.append_rows(batch, **options)
+            batch = []
+        batch.append(row)
+        options = kwargs
+    if batch:
+        writes.ws.append_rows(batch, **options)
+
+
+def _flush_updates(writes: PendingWrites) -> None:
+    """Send queued cell updates as a single batch_update."""
+    if not writes.updates:
+        return
+    data = [
+        {"range": rowcol_to_a1(row, col), "values": [[value]]}
+        for row, col, value in writes.updates
+    ]
+    # Same input option update_cell uses.
+    writes.ws.batch_update(data, value_input_option="USER_ENTERED")
+
+
+_current: ContextVar[Optional[UnitOfWork]] = ContextVar(
+    "bp_unit_of_work", default=None
+)
+
+
+def current_unit() -> Optional[UnitOfWork]:
+    """Return the active UnitOfWork, if a command scope is open."""
+    return _current.get()
+
+
+@contextmanager
+def unit_scope() -> Iterator[UnitOfWork]:
+    """Make a new UnitOfWork current for the body (does not flush)."""
+    uow = UnitOfWork()
+    token = _current.set(uow)
+    try:
+        yield uow
+    finally:
+        _current.reset(token)
@@ -0,0 +1,123 @@
+"""
+write_buffer.py
+---------------
+Write-behind buffer for append-only worksheets (transactions).
+
+Rows are kept in memory and sent with a single append_rows call when:
+- the buffer holds max_rows rows,
+- the oldest row has waited max_age seconds (a background timer),
+- or flush() is called (logout, REPL exit, process exit).
+
+Every row carries a unique key (txn_id in column 1). If a flush fails,
+the rows stay buffered. Before the next attempt the key column is read
+and rows the sheet already has are skipped, so a retry after a request
+that actually reached the sheet never duplicates rows.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, List, Optional, Set
+
+
+class WriteBuffer:
+    """Buffered appends for one worksheet."""
+
+    def __init__(
+        self,
+        ws,
+        *,
+        max_rows: int = 25,
+        max_age: float = 15.0,
+        key_col: int = 1,
+        value_input_option: str = "USER_ENTERED",
+    ):
+        self.ws = ws
+        self.max_rows = max(1, int(max_rows))
+        self.max_age = max_age
+        self.key_col = key_col
+        self.value_input_option = value_input_option
+        self.lock = threading.RLock()
+        self._rows: List[List[Any]] = []
+        self._first_at: Optional[float] = None
+        # True after a failed flush: the sheet may hold some of our rows.
+        self.uncertain = False
+        self._timer: Optional[threading.Timer] = None
+
+    def pending(self) -> List[List[Any]]:
+        """Return a copy of the rows not yet saved."""
+        with self.lock:
+            return [list(r) for r in self._rows]
+
+    def add(self, row: List[Any]) -> None:
+        """Buffer one row (call flush() when is_due() says so)."""
+        with self.lock:
+            self._rows.append(list(row))
+            if self._first_at is None:
+                self._first_at = time.monotonic()
+                self._start_timer(self.max_age)
+
+    def is_due(self) -> bool:
+        """True if the buffer is full or its oldest row is too old."""
+        with self.lock:
+            if not self._rows:
+                return False
+            age = time.monotonic() - (self._first_at or 0.0)
+            return len(self._rows) >= self.max_rows or age >= self.max_age
+
+    def flush(self) -> int:
+        """
+        Save every buffered row with one append_rows call.
+        Returns the number of rows sent. Failed rows stay buffered.
+        """
+        with self.lock:
+            if not self._rows:
+                return 0
+            batch = list(self._rows)
+            to_send = batch
+            try:
+                if self.uncertain:
+                    saved = self._saved_keys()
+                    to_send = [
+                        r
+                        for r in batch
+                        if str(r[self.key_col - 1]) not in saved
+                    ]
+                if to_send:
+                    self.ws.append_rows(
+                        to_send, value_input_option=self.value_input_option
+                    )
+            except Exception:
+                self.uncertain = True
+                self._start_timer(self.max_age)
+                raise
+            self.uncertain = False
+            self._rows = self._rows[len(batch):]
+            self._first_at = time.monotonic() if self._rows else None
+            self._cancel_timer()
+            return len(to_send)
+
+    def _saved_keys(self) -> Set[str]:
+        """Read the key column so a retry can skip rows already saved."""
+        return {str(v) for v in self.ws.col_values(self.key_col)}
+
+    def _start_timer(self, delay: float) -> None:
+        self._cancel_timer()
+        if delay <= 0:
+            return
+        self._timer = threading.Timer(delay, self._on_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _cancel_timer(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _on_timer(self) -> None:
+        """Background flush; on failure the rows wait for the next try."""
+        try:
+            self.flush()
+        except Exception:
+            pass
@@ -10,111 +10,317 @@ Columns:
 
 from __future__ import annotations
 
+import csv
+import os
+import re
+import threading
 import uuid
-from typing import List, Dict
+from typing import Any, List, Dict, Optional, Tuple
 
-from ..utilities.constants import ALLOWED_CATEGORIES
-from collections import defaultdict
-from ..budget_planner.sheets_gateway import get_client, get_sheet
+from ..utilities.constants import ALLOWED_CATEGORIES, BUDGET_HEADERS
+from ..budget_planner.storage import Condition, get_backend
+from ..budget_planner import async_gateway as ag
 from ..budget_planner import auth
+from ..budget_planner.table_cache import TableEntry
+from ..budget_planner.unit_of_work import FlushError
 from . import transactions as tx
+from . import txn_columns
+from ..utilities.dates import previous_month
 from ..utilities.validation import require_month
 
 BUDGET_SHEET = "budget"
-BUDGET_HEADERS: List[str] = [
-    "budget_id",
-    "user_id",
-    "month",
-    "category_norm",
-    "monthly_goal",
-]
+_HEADER_ERROR = "Unexpected budget header row. Align with BUDGET_HEADERS."
+BUDGET_SPEC = (BUDGET_HEADERS, _HEADER_ERROR)
+# Sheet column of monthly_goal.
+_GOAL_COL = BUDGET_HEADERS.index("monthly_goal") + 1
 
+GoalKey = Tuple[str, str, str]
+# (user_id, month, category_norm) -> (sheet row number, goal record).
+# Built from a read of the budget sheet (cached while fresh). A cached
+# copy may be stale, and rows this session appended are patched into
+# it at a guessed position, so a row number found here is only a hint:
+# the row is read back and checked before it is written to.
+_goal_index: Dict[GoalKey, Tuple[int, Dict]] = {}
+_goal_index_source: Optional[TableEntry] = None
+_goal_index_rows = 0
+_goal_index_lock = threading.RLock()
 
-def _ensure_budget_sheet(ws) -> None:
-    """Create headers if sheet is empty; guard if mismatch."""
-    # Make sure the sheet uses the expected header row.
-    values = ws.get_all_values()
-    if not values:
-        ws.append_row(BUDGET_HEADERS)
-        return
-    if values[0] != BUDGET_HEADERS:
-        raise RuntimeError(
-            "Unexpected budget header row. Align with BUDGET_HEADERS."
-        )
 
+def _goal_key(user_id, month, category) -> GoalKey:
+    """Index key; matched case-insensitively like find_row."""
+    return (
+        str(user_id).strip().lower(),
+        str(month).strip().lower(),
+        str(category).strip().lower(),
+    )
 
-def set_goal(
-    *, email: str, month: str, category: str, amount: float
-) -> str:
+
+def _record_key(record: Dict) -> GoalKey:
+    return _goal_key(
+        record.get("user_id", ""),
+        record.get("month", ""),
+        record.get("category_norm", ""),
+    )
+
+
+def _index_goals(entry: TableEntry) -> None:
+    """Rebuild the goal index from a budget table entry."""
+    global _goal_index_source, _goal_index_rows
+    index: Dict[GoalKey, Tuple[int, Dict]] = {}
+    for row_number, row in enumerate(entry.records, start=2):
+        # Keep the first row for a key, like find_row.
+        index.setdefault(_record_key(row), (row_number, row))
+    _goal_index.clear()
+    _goal_index.update(index)
+    _goal_index_source = entry
+    _goal_index_rows = len(entry.records)
+
+
+def reset_goal_index() -> None:
+    """Forget every row number (after a failed save, for one)."""
+    global _goal_index_source, _goal_index_rows
+    with _goal_index_lock:
+        _goal_index.clear()
+        _goal_index_source = None
+        _goal_index_rows = 0
+
+
+def _refresh_goal_index() -> None:
+    """Read the budget table (cached while fresh); reindex if it changed."""
+    entry = get_backend().read_table(
+        BUDGET_SHEET, BUDGET_HEADERS, _HEADER_ERROR
+    )
+    grown = len(entry.records) != _goal_index_rows
+    if entry is not _goal_index_source or grown:
+        _index_goals(entry)
+
+
+def _locate_goals(
+    keys: List[GoalKey],
+) -> Dict[GoalKey, Tuple[int, Dict]]:
     """
-    update a goal for (user_id, month and category_norm).
-    Returns the budget_id.
+    Return key -> (row number, stored record) for the keys that have a
+    goal.
+
+    Index hits need no table read, but every row found is read back
+    from the store (one request for all) and must still hold its key.
+    If one does not, the budget table is downloaded again and the
+    lookup repeated once.
+
+    Raises:
+        RuntimeError: if the rows still do not match after that.
     """
+    backend = get_backend()
+    for attempt in range(2):
+        with _goal_index_lock:
+            if attempt:
+                backend.invalidate(BUDGET_SHEET)
+                reset_goal_index()
+            if attempt or any(key not in _goal_index for key in keys):
+                _refresh_goal_index()
+            found = {k: _goal_index[k] for k in keys if k in _goal_index}
+        if not found:
+            return found
+        stored = backend.read_rows(
+            BUDGET_SHEET, [row for row, _ in found.values()], BUDGET_HEADERS
+        )
+        if all(
+            row in stored and _record_key(stored[row]) == key
+            for key, (row, _) in found.items()
+        ):
+            return {key: (row, stored[row]) for key, (row, _) in found.items()}
+    raise RuntimeError(
+        "The budget sheet changed while saving. Please try again."
+    )
+
+
+def _write_goals(new_rows: List[List[Any]], updates: List) -> None:
+    """Append new goal rows and update changed ones."""
+    backend = get_backend()
+    try:
+        if new_rows:
+            backend.append_rows(BUDGET_SHEET, new_rows)
+        if updates:
+            backend.update_cells(BUDGET_SHEET, updates)
+    except FlushError:
+        # Queued writes may be lost: no row number can be trusted.
+        reset_goal_index()
+        raise
+
+
+def _clean_category(category) -> str:
+    """Return category_norm or raise ValueError."""
     # Keep categories consistent (lowercase) and only allow known ones.
-    cat_norm = (category or "").strip().lower()
+    cat_norm = str(category or "").strip().lower()
     if cat_norm not in ALLOWED_CATEGORIES:
         allowed = ", ".join(ALLOWED_CATEGORIES)
         raise ValueError(f"Invalid category '{category}'. Allowed: {allowed}")
+    return cat_norm
 
-    month = require_month(month)
 
+def _clean_goal(amount) -> float:
+    """Return the goal amount as a positive float or raise ValueError."""
     try:
         goal = float(amount)
     except Exception as exc:
         raise ValueError("Amount must be numeric.") from exc
     if goal <= 0.0:
         raise ValueError("Amount must be greater than zero.")
+    return goal
+
 
+def _user_id_for(email: str) -> str:
+    """Look up a user_id by email or raise RuntimeError."""
     user = auth.get_user_by_email(email)
     if not user:
         raise RuntimeError("No account found for that email.")
-    user_id = str(user.get("user_id"))
+    return str(user.get("user_id"))
 
-    client = get_client()
-    sheet = get_sheet(client)
-    ws = sheet.worksheet(BUDGET_SHEET)
-    _ensure_budget_sheet(ws)
 
-    # If a matching row already exists, update it; else append a new row.
-    rows = ws.get_all_records()
+def set_goal(
+    *, email: str, month: str, category: str, amount: float
+) -> str:
+    """
+    update a goal for (user_id, month and category_norm).
+    Returns the budget_id.
+    """
+    # Validate everything before any read.
+    cat_norm = _clean_category(category)
+    month = require_month(month)
+    goal = _clean_goal(amount)
 
-    for idx, row in enumerate(rows, start=2):
-        if (
-            str(row.get("user_id")) == user_id
-            and str(row.get("month")) == month
-            and str(row.get("category_norm")) == cat_norm
-        ):
+    user_id = _user_id_for(email)
+
+    backend = get_backend()
+    backend.ensure_table(BUDGET_SHEET, BUDGET_HEADERS, _HEADER_ERROR)
 
-            ws.update_cell(idx, 5, goal)
+    # If a matching row already exists, update it; else append a new row.
+    key = _goal_key(user_id, month, cat_norm)
+    with _goal_index_lock:
+        backend.settle(BUDGET_SHEET)
+        found = _locate_goals([key]).get(key)
+        if found:
+            idx, row = found
+            _write_goals([], [(idx, _GOAL_COL, goal)])
             return str(row.get("budget_id")) or "updated"
 
-    budget_id = str(uuid.uuid4())
-    ws.append_row(
-        [budget_id, user_id, month, cat_norm, goal],
-        value_input_option="USER_ENTERED",
-    )
+        budget_id = str(uuid.uuid4())
+        _write_goals([[budget_id, user_id, month, cat_norm, goal]], [])
     return budget_id
 
 
-def list_goals(
-    *, email: str | None = None, month: str | None = None
+def _previous_goals(user_id: str, month: str) -> Dict[str, float]:
+    """category_norm -> goal of a user's goals in the month before."""
+    rows = get_backend().read_table(
+        BUDGET_SHEET, BUDGET_HEADERS, _HEADER_ERROR
+    ).records
+    goals: Dict[str, float] = {}
+    for r in _filter_goals(list(rows), user_id, previous_month(month)):
+        cat = str(r.get("category_norm", "")).strip().lower()
+        try:
+            goals.setdefault(cat, float(r.get("monthly_goal", 0)))
+        except (TypeError, ValueError):
+            continue
+    return goals
+
+
+def set_goals(
+    *,
+    email: str,
+    month: str,
+    goals: Optional[Dict[str, Any]] = None,
+    copy_previous: bool = False,
 ) -> List[Dict]:
     """
-    Return goals. Optional filters:
-    - email
-    - month
+    Set several goals of one month at once.
+
+    goals maps category -> amount. With copy_previous, the goals of the
+    month before are copied first and goals then overrides them. All
+    amounts are validated before anything is written; new goals go out
+    in one append_rows and changed ones in one batch_update, after the
+    rows to change were read back and checked.
+
+    Returns one {"category", "goal", "budget_id", "action"} per goal,
+    action being "added" or "updated".
+
+    Raises:
+        ValueError: listing every invalid category or amount, or if
+            there is nothing to set.
+        RuntimeError: if the user cannot be found.
     """
-    client = get_client()
-    sheet = get_sheet(client)
-    ws = sheet.worksheet(BUDGET_SHEET)
-    _ensure_budget_sheet(ws)
-    rows = ws.get_all_records()
+    month = require_month(month)
+    wanted: Dict[str, float] = {}
+    errors: List[str] = []
+    given: Dict[str, float] = {}
+    for category, amount in (goals or {}).items():
+        try:
+            cat_norm = _clean_category(category)
+            goal = _clean_goal(amount)
+        except ValueError as exc:
+            errors.append(f"{category}: {exc}")
+            continue
+        if cat_norm in given:
+            errors.append(f"{category}: given twice.")
+            continue
+        given[cat_norm] = goal
+    if errors:
+        raise ValueError("; ".join(errors))
 
-    if email:
-        user = auth.get_user_by_email(email)
-        if not user:
-            return []
-        user_id = str(user.get("user_id"))
+    user_id = _user_id_for(email)
+    backend = get_backend()
+    backend.ensure_table(BUDGET_SHEET, BUDGET_HEADERS, _HEADER_ERROR)
+    backend.settle(BUDGET_SHEET)
+    if copy_previous:
+        wanted = _previous_goals(user_id, month)
+        if not wanted and not given:
+            last = previous_month(month)
+            raise ValueError(f"No goals found for {last} to copy.")
+    wanted.update(given)
+    if not wanted:
+        raise ValueError("No goals given.")
+
+    result: List[Dict] = []
+    updates = []
+    new_rows: List[List[Any]] = []
+    with _goal_index_lock:
+        keys = {cat: _goal_key(user_id, month, cat) for cat in wanted}
+        located = _locate_goals(list(keys.values()))
+        for cat, goal in wanted.items():
+            found = located.get(keys[cat])
+            if found:
+                idx, row = found
+                updates.append((idx, _GOAL_COL, goal))
+                budget_id, action = str(row.get("budget_id")), "updated"
+            else:
+                budget_id, action = str(uuid.uuid4()), "added"
+                new_rows.append([budget_id, user_id, month, cat, goal])
+            result.append({
+                "category": cat,
+                "goal": goal,
+                "budget_id": budget_id,
+                "action": action,
+            })
+        _write_goals(new_rows, updates)
+    return result
+
+
+def _goal_conditions(
+    user_id: str | None, month: str | None
+) -> List[Condition]:
+    """read_tables conditions for the goals of a user and/or month."""
+    conditions: List[Condition] = []
+    if user_id is not None:
+        conditions.append(("user_id", "=", user_id))
+    if month:
+        conditions.append(("month", "=", month))
+    return conditions
+
+
+def _filter_goals(
+    rows: List[Dict], user_id: str | None, month: str | None
+) -> List[Dict]:
+    """Keep the goals of one user and/or month."""
+    if user_id is not None:
         rows = [r for r in rows if str(r.get("user_id")) == user_id]
 
     if month:
@@ -123,43 +329,231 @@ def list_goals(
     return rows
 
 
-def goals_vs_spend(
+async def list_goals_async(
+    *, email: str | None = None, month: str | None = None
+) -> List[Dict]:
+    """
+    Async list_goals: users and budget are read in one request (on a
+    backend that filters rows, the user is looked up first and only
+    the matching goals are read).
+    """
+    specs = {BUDGET_SHEET: BUDGET_SPEC}
+    where = None
+    user = None
+    if get_backend().filters_rows:
+        if email:
+            user = await ag.call(auth.get_user_by_email, email)
+            if not user:
+                return []
+        user_id = str(user.get("user_id")) if user else None
+        where = {BUDGET_SHEET: _goal_conditions(user_id, month)}
+    elif email:
+        specs[auth.USERS_SHEET] = auth.USERS_SPEC
+    tables = await ag.read_tables(specs, None, where)
+    rows = list(tables[BUDGET_SHEET].records)
+    if not email:
+        return _filter_goals(rows, None, month)
+    if user is None:
+        # The lookup is answered from the users table just read.
+        user = await ag.call(auth.get_user_by_email, email)
+        if not user:
+            return []
+    return _filter_goals(rows, str(user.get("user_id")), month)
+
+
+def list_goals(
+    *, email: str | None = None, month: str | None = None
+) -> List[Dict]:
+    """
+    Return goals. Optional filters:
+    - email
+    - month
+    """
+    return ag.run_sync(list_goals_async(email=email, month=month))
+
+
+async def goals_vs_spend_async(
     *, email: str, month: str | None
 ) -> List[Dict]:
     """
-    Compare goals with actual spend for a user and month.
+    Async goals_vs_spend: users, budget and transactions are read in
+    one request.
     """
     if month:
         month = require_month(month)
 
-    # Get this user's goals (optionally for a specific month).
-    goals = list_goals(email=email, month=month)
+    specs = {
+        auth.USERS_SHEET: auth.USERS_SPEC,
+        BUDGET_SHEET: BUDGET_SPEC,
+        tx.TRANSACTIONS_SHEET: tx.TRANSACTIONS_SPEC,
+    }
+    # Spend needs four columns, not the note text.
+    columns = {tx.TRANSACTIONS_SHEET: tx.SPEND_COLUMNS}
+    if get_backend().filters_rows:
+        # Look the user up first; only their goals and spend are read.
+        user_id = await ag.call(_user_id_for, email)
+        del specs[auth.USERS_SHEET]
+        tables = await ag.read_tables(specs, columns, {
+            BUDGET_SHEET: _goal_conditions(user_id, month),
+            tx.TRANSACTIONS_SHEET: tx.txn_conditions(user_id, month=month),
+        })
+    else:
+        tables = await ag.read_tables(specs, columns)
+        # The lookup is answered from the users table just read.
+        user_id = await ag.call(_user_id_for, email)
+    budget_rows = tables[BUDGET_SHEET].records
+    txns = tables[tx.TRANSACTIONS_SHEET]
 
-    # Gather this user's spend by category to compare with goals.
-    rows = tx.list_transactions(email=email)
-    spent_by_cat = defaultdict(float)
-    for r in rows:
-        date_s = str(r.get("date", "")).strip()
-        if month and not date_s.startswith(month):
-            continue
-        cat = str(
-            r.get("category")
-            or r.get("category_norm")
-            or ""
-        ).strip().lower()
-        try:
-            amt = float(r.get("amount", 0) or 0)
-        except Exception:
-            continue
-        spent_by_cat[cat] += amt
+    # This user's goals (optionally for a specific month).
+    goals = _filter_goals(budget_rows, user_id, month)
+
+    # Spend per (user, month, category) to compare with goals.
+    rollup = txn_columns.rollup_for(txns)
 
     rows: List[Dict] = []
     for g in goals:
         cat = str(g.get("category_norm", "")).strip().lower()
         goal = float(g.get("monthly_goal", 0))
-        spent = float(spent_by_cat.get(cat, 0.0))
+        spent = rollup.spent(cat, user_id=user_id, month=month)
         diff = goal - spent
         rows.append(
             {"category": cat, "goal": goal, "spent": spent, "diff": diff}
         )
     return rows
+
+
+def goals_vs_spend(
+    *, email: str, month: str | None
+) -> List[Dict]:
+    """
+    Compare goals with actual spend for a user and month.
+    """
+    return ag.run_sync(goals_vs_spend_async(email=email, month=month))
+
+
+# Columns of the all-users report, in CSV order.
+REPORT_FIELDS = [
+    "email", "user_id", "month", "category", "goal", "spent", "diff",
+]
+
+
+async def goals_vs_spend_all_async(
+    *, month: str | None = None
+) -> List[Dict]:
+    """
+    Async goals_vs_spend_all: the three sheets are read in one request
+    and each is then gone over once.
+    """
+    if month:
+        month = require_month(month)
+
+    where = None
+    if month and get_backend().filters_rows:
+        where = {
+            BUDGET_SHEET: _goal_conditions(None, month),
+            tx.TRANSACTIONS_SHEET: tx.txn_conditions(month=month),
+        }
+    tables = await ag.read_tables(
+        {
+            auth.USERS_SHEET: auth.USERS_SPEC,
+            BUDGET_SHEET: BUDGET_SPEC,
+            tx.TRANSACTIONS_SHEET: tx.TRANSACTIONS_SPEC,
+        },
+        {tx.TRANSACTIONS_SHEET: tx.SPEND_COLUMNS},
+        where,
+    )
+    emails: Dict[str, str] = {}
+    for u in tables[auth.USERS_SHEET].records:
+        emails.setdefault(
+            str(u.get("user_id", "")).strip(),
+            str(u.get("email", "")).strip().lower(),
+        )
+
+    # Goals grouped by user, in sheet order within each user.
+    goals: Dict[str, List[Dict]] = {}
+    for g in _filter_goals(tables[BUDGET_SHEET].records, None, month):
+        goals.setdefault(str(g.get("user_id", "")).strip(), []).append(g)
+
+    # One pass over the transactions; each goal is then one lookup.
+    rollup = txn_columns.rollup_for(tables[tx.TRANSACTIONS_SHEET])
+
+    rows: List[Dict] = []
+    # Accounts by email; goals of unknown user_ids come last.
+    order = sorted(goals, key=lambda u: (u not in emails, emails.get(u), u))
+    for user_id in order:
+        for g in goals[user_id]:
+            cat = str(g.get("category_norm", "")).strip().lower()
+            try:
+                goal = float(g.get("monthly_goal", 0))
+            except (TypeError, ValueError):
+                continue
+            spent = rollup.spent(cat, user_id=user_id, month=month)
+            rows.append({
+                "email": emails.get(user_id, ""),
+                "user_id": user_id,
+                "month": str(g.get("month", "")),
+                "category": cat,
+                "goal": goal,
+                "spent": spent,
+                "diff": goal - spent,
+            })
+    return rows
+
+
+def goals_vs_spend_all(*, month: str | None = None) -> List[Dict]:
+    """
+    Compare goals with actual spend for every user (editor report).
+
+    Returns one row per goal, keyed as REPORT_FIELDS, ordered by email
+    (email is "" for goals of an unknown user_id). Without a month,
+    every goal is compared with all spend in its category, as
+    goals_vs_spend does.
+    """
+    return ag.run_sync(goals_vs_spend_all_async(month=month))
+
+
+# Report files: a plain name ending in .csv, no directories.
+_REPORT_NAME_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]*\.csv$")
+
+
+def report_csv_path(name: str) -> str:
+    """
+    Return where a report named name is written: inside the reports
+    directory (BP_REPORTS_DIR, default "reports"), created if needed.
+
+    Raises:
+        ValueError: if name is not a plain file name ending in .csv.
+    """
+    name = (name or "").strip()
+    if not _REPORT_NAME_RE.match(name):
+        raise ValueError(
+            "Report name must be a file name ending in .csv, such as "
+            "budget-2025-10.csv (no folders)."
+        )
+    directory = os.getenv("BP_REPORTS_DIR") or "reports"
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    return os.path.join(directory, name)
+
+
+def write_report_csv(rows: List[Dict], path: str) -> int:
+    """
+    Write goals_vs_spend_all rows to a new CSV file; return the count.
+
+    Raises:
+        ValueError: if the file already exists (it is never replaced).
+    """
+    try:
+        fh = open(path, "x", newline="", encoding="utf-8")
+    except FileExistsError as exc:
+        raise ValueError(f"{path} already exists.") from exc
+    with fh:
+        writer = csv.DictWriter(fh, fieldnames=REPORT_FIELDS)
+        writer.writeheader()
+        for r in rows:
+            writer.writerow({
+                **r,
+                "goal": f"{r['goal']:.2f}",
+                "spent": f"{r['spent']:.2f}",
+                "diff": f"{r['diff']:.2f}",
+            })
+    return len(rows)
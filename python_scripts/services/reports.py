@@ -6,37 +6,55 @@ Report helpers for transactions.
 
 from __future__ import annotations
 
-from typing import Optional, List
-from datetime import datetime
+from typing import Dict, List, Optional, Tuple
 
-from ..budget_planner.sheets_gateway import get_client, get_sheet
+from ..budget_planner import async_gateway as ag
 from ..budget_planner import auth
+from ..budget_planner.storage import get_backend
+from ..budget_planner.table_cache import TableEntry
+from . import transactions as tx
+from . import txn_columns
+from ..utilities.constants import TRANSACTIONS_HEADERS
+from ..utilities.dates import shift_month
+from ..utilities.validation import require_month
 
 TRANSACTIONS_SHEET = "transactions"
-TRANSACTIONS_HEADERS: List[str] = [
-    "txn_id",
-    "user_id",
-    "date",
-    "category",
-    "amount",
-    "note",
-    "created_at",
-]
-
-
-def _ensure_txn_sheet(ws) -> None:
+
+
+_HEADER_ERROR = (
+    "Unexpected transactions header row; align with TRANSACTIONS_HEADERS."
+)
+_TOTAL_COLUMNS = ["user_id", "date", "amount"]
+_SERIES_COLUMNS = ["user_id", "date", "category", "amount"]
+
+
+async def _read_txns_async(
+    email: Optional[str],
+    columns: List[str] = _TOTAL_COLUMNS,
+    month: Optional[str] = None,
+) -> Tuple[TableEntry, Optional[str]]:
     """
-    Ensure the 'transactions' worksheet exists and headers match.
+    Return (transactions table, user_id for email or None); with an
+    email, the users table comes from the same request. A backend that
+    filters rows reads only those of the user (and month), after
+    looking the user up.
     """
-    values = ws.get_all_values()
-    if not values:
-        ws.append_row(TRANSACTIONS_HEADERS)
-        return
-    if values[0] != TRANSACTIONS_HEADERS:
-        raise RuntimeError(
-            "Unexpected transactions header row; align with "
-            "TRANSACTIONS_HEADERS."
-        )
+    specs = {TRANSACTIONS_SHEET: (TRANSACTIONS_HEADERS, _HEADER_ERROR)}
+    # Only the columns the report needs are downloaded.
+    columns_of = {TRANSACTIONS_SHEET: columns}
+    if get_backend().filters_rows:
+        want_user = await ag.call(_resolve_user_id, email)
+        where = {
+            TRANSACTIONS_SHEET: tx.txn_conditions(want_user, month=month)
+        }
+        tables = await ag.read_tables(specs, columns_of, where)
+        return tables[TRANSACTIONS_SHEET], want_user
+    if email:
+        specs[auth.USERS_SHEET] = auth.USERS_SPEC
+    tables = await ag.read_tables(specs, columns_of)
+    # The lookup is answered from the users table just read.
+    want_user = await ag.call(_resolve_user_id, email)
+    return tables[TRANSACTIONS_SHEET], want_user
 
 
 def _resolve_user_id(email: Optional[str]) -> Optional[str]:
@@ -51,40 +69,114 @@ def _resolve_user_id(email: Optional[str]) -> Optional[str]:
     return str(user.get("user_id"))
 
 
+async def monthly_total_async(
+    month: str, email: Optional[str] = None
+) -> float:
+    """
+    Async monthly_total: users and transactions are read in one request.
+    """
+    # Validate input format early
+    month = require_month(month)
+
+    entry, want_user = await _read_txns_async(email, month=month)
+    rollup = txn_columns.rollup_for(entry)
+    return round(rollup.total(user_id=want_user, month=month), 2)
+
+
 def monthly_total(month: str, email: Optional[str] = None) -> float:
     """
     Sum 'amount' for rows whose date starts with YYYY-MM.
     Optionally restrict to a specific email.
     """
-    try:
-        # Validate input format early
-        datetime.strptime(month, "%Y-%m")
-    except ValueError as exc:
-        raise ValueError("month must be 'YYYY-MM'.") from exc
-
-    client = get_client()
-    sheet = get_sheet(client)
-    ws = sheet.worksheet(TRANSACTIONS_SHEET)
-    _ensure_txn_sheet(ws)
-
-    want_user = _resolve_user_id(email)
-    total = 0.0
-
-    for row in ws.get_all_records():
-        date_s = str(row.get("date", "")).strip()
-        if not date_s.startswith(month):
-            continue
-
-        if want_user is not None:
-            uid = str(row.get("user_id", "")).strip()
-            if uid != want_user:
-                continue
-
-        try:
-            amt = float(row.get("amount", 0))
-        except Exception:
-            continue
-
-        total += amt
-
-    return round(total, 2)
+    return ag.run_sync(monthly_total_async(month, email))
+
+
+async def range_total_async(
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    email: Optional[str] = None,
+) -> float:
+    """Async range_total: users and transactions in one request."""
+    start, end = txn_columns.date_range(date_from, date_to)
+    if not (start or end):
+        raise ValueError("Give a from date, a to date or both.")
+    entry, want_user = await _read_txns_async(email)
+    daily = txn_columns.daily_for(entry)
+    return round(daily.total(user_id=want_user, start=start, end=end), 2)
+
+
+def range_total(
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    email: Optional[str] = None,
+) -> float:
+    """
+    Sum 'amount' for rows dated date_from..date_to (inclusive, either
+    end may be open). Optionally restrict to a specific email.
+    """
+    return ag.run_sync(range_total_async(date_from, date_to, email))
+
+
+async def monthly_series_async(
+    end_month: str,
+    months: int = 6,
+    email: Optional[str] = None,
+    window: int = 3,
+) -> List[Dict]:
+    """
+    Async monthly_series: one read, then one pass over the rows (the
+    spend rollup); each month is a lookup per category after that.
+    """
+    end_month = require_month(end_month)
+    if months < 1:
+        raise ValueError("months must be at least 1.")
+    if window < 1:
+        raise ValueError("window must be at least 1.")
+
+    entry, want_user = await _read_txns_async(email, _SERIES_COLUMNS)
+    rollup = txn_columns.rollup_for(entry)
+
+    # The months before the span feed its first averages and changes.
+    lead = max(window - 1, 1)
+    first = shift_month(end_month, -(months - 1))
+    span = [shift_month(first, i - lead) for i in range(lead + months)]
+    cats = [rollup.by_category(user_id=want_user, month=m) for m in span]
+    totals = [round(sum(c.values()), 2) for c in cats]
+
+    series: List[Dict] = []
+    for i in range(lead, len(span)):
+        prev, prev_cats = totals[i - 1], cats[i - 1]
+        change = round(totals[i] - prev, 2)
+        series.append({
+            "month": span[i],
+            "total": totals[i],
+            "categories": {k: round(v, 2) for k, v in cats[i].items()},
+            "rolling_avg": round(
+                sum(totals[i - window + 1:i + 1]) / window, 2
+            ),
+            "change": change,
+            "change_pct": round(change / prev * 100, 1) if prev else None,
+            "category_change": {
+                k: round(cats[i].get(k, 0.0) - prev_cats.get(k, 0.0), 2)
+                for k in {**prev_cats, **cats[i]}
+            },
+        })
+    return series
+
+
+def monthly_series(
+    end_month: str,
+    months: int = 6,
+    email: Optional[str] = None,
+    window: int = 3,
+) -> List[Dict]:
+    """
+    Spend of each of the months months ending with end_month
+    (YYYY-MM), oldest first. Optionally restrict to a specific email.
+
+    Each entry has month, total, categories (category -> total),
+    rolling_avg (mean total of the window months ending there), change
+    and change_pct (against the month before; change_pct is None when
+    that month had no spend) and category_change (category -> change).
+    """
+    return ag.run_sync(monthly_series_async(end_month, months, email, window))
@@ -10,42 +10,88 @@ Columns:
 
 from __future__ import annotations
 
-from typing import List
+import csv
+import heapq
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 import uuid
 from datetime import datetime
 
-from ..budget_planner.sheets_gateway import get_client, get_sheet
+from ..budget_planner.storage import Condition, get_backend
 
+from ..budget_planner import async_gateway as ag
 from ..budget_planner import auth
-from ..utilities.constants import ALLOWED_CATEGORIES
+from ..budget_planner.table_cache import TableEntry
+from . import txn_columns
+from ..utilities.constants import ALLOWED_CATEGORIES, TRANSACTIONS_HEADERS
+from ..utilities.validation import require_date
 
 TRANSACTIONS_SHEET = "transactions"
-TRANSACTIONS_HEADERS: List[str] = [
-    "txn_id",
-    "user_id",
-    "date",
-    "category",
-    "amount",
-    "note",
-    "created_at",
-]
+_HEADER_ERROR = (
+    "Unexpected transactions header row. "
+    "Align with TRANSACTIONS_HEADERS."
+)
+TRANSACTIONS_SPEC = (TRANSACTIONS_HEADERS, _HEADER_ERROR)
+# All that spend totals need; note text is most of a row's payload.
+SPEND_COLUMNS = ["user_id", "date", "category", "amount"]
 
 
-def _ensure_txn_sheet(ws) -> None:
+def _ensure_txn_sheet() -> None:
     """
     Ensures the transactions sheet exists with the expected headers.
     If empty, write headers. If mismatched, raise for safety.
     """
-    # Read the first rows to check headers.
-    values = ws.get_all_values()
-    if not values:
-        ws.append_row(TRANSACTIONS_HEADERS)
-        return
-    if values[0] != TRANSACTIONS_HEADERS:
-        raise RuntimeError(
-            "Unexpected transactions header row. "
-            "Align with TRANSACTIONS_HEADERS."
-        )
+    # Only row 1 is read, and only once per process.
+    get_backend().ensure_table(
+        TRANSACTIONS_SHEET, TRANSACTIONS_HEADERS, _HEADER_ERROR
+    )
+
+
+def txn_conditions(
+    user_id: Optional[str] = None,
+    *,
+    date: Optional[str] = None,
+    month: Optional[str] = None,
+) -> List[Condition]:
+    """read_tables conditions for the rows of a user, date and/or month."""
+    conditions: List[Condition] = []
+    if user_id is not None:
+        conditions.append(("user_id", "=", user_id))
+    if date:
+        conditions.append(("date", "=", date))
+    if month:
+        conditions.append(("date", "^", month))
+    return conditions
+
+
+async def _read_txn_table_async(
+    email: str | None = None,
+    columns: Optional[List[str]] = None,
+    date: str | None = None,
+) -> Tuple[TableEntry, Optional[str]]:
+    """
+    Return (transactions table, user_id for email or None). With an
+    email the users and transactions sheets come from one request.
+    With columns, records may hold only those columns. A backend that
+    filters rows reads only those of the user (and exact date), after
+    looking the user up; records may hold others elsewhere.
+    """
+    specs = {TRANSACTIONS_SHEET: TRANSACTIONS_SPEC}
+    projection = {TRANSACTIONS_SHEET: columns} if columns else None
+    if get_backend().filters_rows:
+        user_id = await ag.call(_resolve_user_id, email) if email else None
+        where = {TRANSACTIONS_SHEET: txn_conditions(user_id, date=date)}
+        tables = await ag.read_tables(specs, projection, where)
+        return tables[TRANSACTIONS_SHEET], user_id
+    if email:
+        specs[auth.USERS_SHEET] = auth.USERS_SPEC
+    tables = await ag.read_tables(specs, projection)
+    # The lookup is answered from the users table just read.
+    user_id = await ag.call(_resolve_user_id, email) if email else None
+    return tables[TRANSACTIONS_SHEET], user_id
 
 
 def _resolve_user_id(email: str) -> str:
@@ -60,6 +106,28 @@ def _resolve_user_id(email: str) -> str:
     return str(user.get("user_id"))
 
 
+def _clean_amount(amount) -> float:
+    """Return amount as a non-zero float or raise ValueError."""
+    try:
+        amount = float(amount)
+    except Exception as exc:
+        raise ValueError("Amount must be a number.") from exc
+
+    if amount == 0.0:
+        raise ValueError("Amount cannot be zero.")
+    return amount
+
+
+def _clean_category(category) -> str:
+    """Return the normalised category or raise ValueError."""
+    # Keep categories consistent (lowercase) and only allow known ones.
+    category_norm = (category or "").strip().lower()
+    if category_norm not in ALLOWED_CATEGORIES:
+        allowed = ", ".join(ALLOWED_CATEGORIES)
+        raise ValueError(f"Invalid category '{category}'. Allowed: {allowed}")
+    return category_norm
+
+
 def add_transaction(
     *,
     email: str,
@@ -85,78 +153,183 @@ def add_transaction(
         RuntimeError: if the user cannot be found or if sheet is misconfigured.
         ValueError:   if amount is invalid.
     """
-    try:
-        amount = float(amount)
-    except Exception as exc:
-        raise ValueError("Amount must be a number.") from exc
-
-    if amount == 0.0:
-        raise ValueError("Amount cannot be zero.")
-
-    # Keep categories consistent (lowercase) and only allow known ones.
-    category_norm = (category or "").strip().lower()
-    if category_norm not in ALLOWED_CATEGORIES:
-        allowed = ", ".join(ALLOWED_CATEGORIES)
-        raise ValueError(f"Invalid category '{category}'. Allowed: {allowed}")
+    amount = _clean_amount(amount)
+    category_norm = _clean_category(category)
 
     user_id = _resolve_user_id(email)
-    client = get_client()
-    sheet = get_sheet(client)
-    ws = sheet.worksheet(TRANSACTIONS_SHEET)
-
-    _ensure_txn_sheet(ws)
+    _ensure_txn_sheet()
 
     # Create a unique id and timestamp for the row.
     txn_id = str(uuid.uuid4())
     created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     row = [txn_id, user_id, date, category_norm, amount, note, created_at]
 
-    ws.append_row(row, value_input_option="USER_ENTERED")
+    # Buffered: saved with other rows in one append_rows call later.
+    backend = get_backend()
+    backend.append_rows(TRANSACTIONS_SHEET, [row], buffered=True)
+    # The row was patched into the cached table; count it in the views
+    # already built now rather than on the next report.
+    cached = backend.cached_table(TRANSACTIONS_SHEET)
+    if cached is not None:
+        txn_columns.catch_up(cached)
     return txn_id
 
 
-def list_transactions(
+def _match_txns(
+    rows: list[dict], user_id: str | None, date: str | None
+) -> list[dict]:
+    """Keep the rows of one user and/or one exact date."""
+    if user_id is not None:
+        rows = [r for r in rows if str(r.get("user_id")) == user_id]
+
+    if date:
+        rows = [r for r in rows if str(r.get("date")) == date]
+
+    return rows
+
+
+def _date_bounds(
+    date: str | None, date_from: str | None, date_to: str | None
+) -> Tuple[Optional[str], Optional[str]]:
+    """Validated (from, to) range; an exact date is not mixed with one."""
+    if date and (date_from or date_to):
+        raise ValueError("Use either an exact date or a from/to range.")
+    return txn_columns.date_range(date_from, date_to)
+
+
+def parse_cursor(text: str) -> txn_columns.Cursor:
+    """Parse a 'created_at,txn_id' cursor (as printed by cursor_of)."""
+    created_at, comma, txn_id = (text or "").strip().rpartition(",")
+    if not comma or not created_at.strip() or not txn_id.strip():
+        raise ValueError(
+            "Cursor must be 'created_at,txn_id' "
+            "(e.g. '2025-10-30 12:00:00,<txn_id>')."
+        )
+    return created_at.strip(), txn_id.strip()
+
+
+def cursor_of(row: dict) -> str:
+    """The cursor that continues a listing after row."""
+    created_at, txn_id = txn_columns.recency_key(row)
+    return f"{created_at},{txn_id}"
+
+
+async def list_transactions_async(
     *,
     email: str | None = None,
     date: str | None = None,
     limit: int = 20,
+    after: str | None = None,
+    page_size: int | None = None,
+    date_from: str | None = None,
+    date_to: str | None = None,
 ) -> list[dict]:
     """
-    Return recent transactions with optional filters:
-    - email: only this user's transactions
-    - date : exact YYYY-MM-DD match
-    - limit: max number of rows (default 20)
+    Async list_transactions: users and transactions are read in one
+    request.
     """
-    client = get_client()
-    sheet = get_sheet(client)
-    ws = sheet.worksheet(TRANSACTIONS_SHEET)
+    start, end = _date_bounds(date, date_from, date_to)
+    paging = after is not None or page_size is not None
+    cursor = parse_cursor(after) if after is not None else None
+    if paging:
+        limit = page_size if page_size is not None else limit
+    limit = max(0, int(limit))
+    entry, user_id = await _read_txn_table_async(email, date=date)
+
+    if start or end:
+        positions = txn_columns.dates_for(entry).positions(
+            user_id=user_id, start=start, end=end
+        )
+        rows = [entry.records[i] for i in positions]
+        if cursor is not None:
+            key = txn_columns.recency_key
+            rows = [r for r in rows if key(r) < cursor]
+        return heapq.nlargest(limit, rows, key=txn_columns.recency_key)
+
+    if paging:
+        index = txn_columns.recency_for(entry)
+        return index.page(
+            user_id=user_id, after=cursor, size=limit, date=date
+        )
 
-    _ensure_txn_sheet(ws)
-    rows = ws.get_all_records()
+    rows = _match_txns(entry.records, user_id, date)
 
-    if email:
-        user_id = _resolve_user_id(email)
-        rows = [r for r in rows if str(r.get("user_id")) == user_id]
+    if rows and "created_at" in rows[0]:
+        # Top-k: O(n log k) instead of sorting every matching row.
+        return heapq.nlargest(limit, rows, key=txn_columns.recency_key)
+    return rows[:limit]
 
-    if date:
-        rows = [r for r in rows if str(r.get("date")) == date]
 
-    if rows and "created_at" in rows[0]:
-        rows.sort(
-            key=lambda r: (
-               r.get("created_at", ""),
-               r.get("date", ""),
-            ),
-            reverse=True,
+def list_transactions(
+    *,
+    email: str | None = None,
+    date: str | None = None,
+    limit: int = 20,
+    after: str | None = None,
+    page_size: int | None = None,
+    date_from: str | None = None,
+    date_to: str | None = None,
+) -> list[dict]:
+    """
+    Return recent transactions, newest first, with optional filters:
+    - email: only this user's transactions
+    - date : exact YYYY-MM-DD match
+    - date_from / date_to: inclusive YYYY-MM-DD range (either may be
+      left open), found through a sorted date index
+    - limit: max number of rows (default 20)
+
+    Paging: after (a 'created_at,txn_id' cursor, see cursor_of) starts
+    below that row, and page_size rows are returned. Pages come from a
+    sorted index kept with the cached table, so each one costs
+    O(log n + page).
+    """
+    return ag.run_sync(
+        list_transactions_async(
+            email=email,
+            date=date,
+            limit=limit,
+            after=after,
+            page_size=page_size,
+            date_from=date_from,
+            date_to=date_to,
         )
+    )
 
-    return rows[: max(0, int(limit))]
+
+async def summarize_by_category_async(
+    *,
+    email: str | None = None,
+    date: str | None = None,
+    date_from: str | None = None,
+    date_to: str | None = None,
+) -> dict[str, float]:
+    """Async summarize_by_category (reads only the spend columns)."""
+    start, end = _date_bounds(date, date_from, date_to)
+    entry, user_id = await _read_txn_table_async(
+        email, SPEND_COLUMNS, date=date
+    )
+    if start or end:
+        daily = txn_columns.daily_for(entry)
+        totals = daily.by_category(user_id=user_id, start=start, end=end)
+    elif date:
+        cols = txn_columns.columns_for(entry)
+        totals = cols.by_category(cols.select(user_id=user_id, date=date))
+    else:
+        rollup = txn_columns.rollup_for(entry)
+        totals = rollup.by_category(user_id=user_id)
+    summary: dict[str, float] = {}
+    for cat, amt in totals.items():
+        cat = cat or "uncategorized"
+        summary[cat] = summary.get(cat, 0.0) + amt
+    return summary
 
 
 def summarize_by_category(
     *,
     email: str | None = None,
     date: str | None = None,
+    date_from: str | None = None,
+    date_to: str | None = None,
 ) -> dict[str, float]:
     """
     Total transactions categororized.
@@ -164,25 +337,169 @@ def summarize_by_category(
     Optional filters:
       - email: only this user's transactions
       - date : YYYY-MM-DD
+      - date_from / date_to: inclusive YYYY-MM-DD range
 
     Returns:
         category: total_amount:
     """
-    rows = list_transactions(email=email, date=date, limit=9999)
-    summary: dict[str, float] = {}
+    return ag.run_sync(
+        summarize_by_category_async(
+            email=email, date=date, date_from=date_from, date_to=date_to
+        )
+    )
 
-    for row in rows:
-        cat = (
-            row.get("category")
-            or row.get("category_norm")
-            or "uncategorized"
-        ).strip().lower()
 
-        try:
-            amt = float(row.get("amount", 0) or 0)
-        except ValueError:
-            amt = 0.0
+@dataclass
+class ImportResult:
+    """Progress and outcome of import_transactions."""
+    imported: int = 0
+    skipped: int = 0
+    seconds: float = 0.0
+    # File line of the last row saved (0 before the first batch).
+    last_line: int = 0
+    # First few problems as (line number, message).
+    errors: List[Tuple[int, str]] = field(default_factory=list)
 
-        summary[cat] = summary.get(cat, 0.0) + amt
+    @property
+    def rows_per_second(self) -> float:
+        return self.imported / self.seconds if self.seconds > 0 else 0.0
 
-    return summary
+
+_MAX_REPORTED_ERRORS = 10
+
+
+class ImportFailed(RuntimeError):
+    """
+    A batch of import_transactions could not be saved. result tells
+    how far the import got: the valid rows up to file line
+    result.last_line are saved and none after it, so the import can go
+    on with after_line set to it.
+    """
+
+    def __init__(self, message: str, result: ImportResult):
+        super().__init__(message)
+        self.result = result
+
+
+def _read_import_rows(path: str, fmt: str) -> Iterator[Tuple[int, Dict]]:
+    """Yield (line number, raw row) from a CSV or JSONL file, one at a time."""
+    if fmt == "csv":
+        # utf-8-sig drops the BOM that many bank exports start with.
+        with open(path, newline="", encoding="utf-8-sig") as fh:
+            reader = csv.DictReader(fh)
+            for row in reader:
+                yield reader.line_num, row
+        return
+    with open(path, encoding="utf-8") as fh:
+        for line_num, line in enumerate(fh, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as exc:
+                yield line_num, {"_error": f"Invalid JSON: {exc.msg}"}
+                continue
+            if not isinstance(row, dict):
+                row = {"_error": "Each line must be a JSON object."}
+            yield line_num, row
+
+
+def _import_row(user_id: str, raw: Dict) -> List:
+    """Validate one imported row and build the sheet row for it."""
+    if "_error" in raw:
+        raise ValueError(raw["_error"])
+    date = require_date(str(raw.get("date") or ""))
+    category_norm = _clean_category(raw.get("category"))
+    amount = _clean_amount(raw.get("amount"))
+    note = str(raw.get("note") or "").strip()
+    created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    txn_id = str(uuid.uuid4())
+    return [txn_id, user_id, date, category_norm, amount, note, created_at]
+
+
+def import_transactions(
+    *,
+    email: str,
+    path: str,
+    fmt: Optional[str] = None,
+    chunk_size: int = 1000,
+    progress: Optional[Callable[[ImportResult], None]] = None,
+    after_line: int = 0,
+) -> ImportResult:
+    """
+    Stream transactions from a CSV or JSONL file into the sheet.
+
+    Each row needs 'date' (YYYY-MM-DD), 'category' and 'amount'; 'note'
+    is optional. Rows are validated like add_transaction and written in
+    append_rows batches of chunk_size, so memory stays bounded however
+    large the file is. Invalid rows are skipped and counted.
+
+    Parameters:
+        fmt:        'csv' or 'jsonl'; guessed from the extension if
+                    omitted.
+        progress:   called with the running ImportResult after each
+                    batch.
+        after_line: rows on this file line and before it are left out
+                    (to go on after an import that failed part way).
+
+    Raises:
+        ImportFailed: if a batch could not be saved; the rows of the
+            batches before it are saved.
+    """
+    if not os.path.isfile(path):
+        raise ValueError(f"File not found: {path}")
+    if not fmt:
+        ext = os.path.splitext(path)[1].lower()
+        fmt = "jsonl" if ext in {".jsonl", ".ndjson"} else "csv"
+    fmt = fmt.strip().lower()
+    if fmt not in {"csv", "jsonl"}:
+        raise ValueError("Format must be 'csv' or 'jsonl'.")
+    chunk_size = max(1, int(chunk_size))
+    after_line = max(0, int(after_line))
+
+    user_id = _resolve_user_id(email)
+    _ensure_txn_sheet()
+    backend = get_backend()
+    # Save anything still buffered first so rows stay in entry order.
+    backend.flush()
+
+    result = ImportResult()
+    started = time.monotonic()
+    chunk: List[List] = []
+    chunk_end = [0]  # file line of the last row in chunk
+
+    def write_chunk() -> None:
+        try:
+            backend.append_rows(TRANSACTIONS_SHEET, chunk, bulk=True)
+        except Exception as exc:
+            result.seconds = time.monotonic() - started
+            raise ImportFailed(
+                f"{exc} ({result.imported} rows saved, through line "
+                f"{result.last_line})",
+                result,
+            ) from exc
+        result.imported += len(chunk)
+        result.last_line = chunk_end[0]
+        result.seconds = time.monotonic() - started
+        chunk.clear()
+        if progress:
+            progress(result)
+
+    for line_num, raw in _read_import_rows(path, fmt):
+        if line_num <= after_line:
+            continue
+        chunk_end[0] = line_num
+        try:
+            chunk.append(_import_row(user_id, raw))
+        except ValueError as exc:
+            result.skipped += 1
+            if len(result.errors) < _MAX_REPORTED_ERRORS:
+                result.errors.append((line_num, str(exc)))
+            continue
+        if len(chunk) >= chunk_size:
+            write_chunk()
+    if chunk:
+        write_chunk()
+
+    result.seconds = time.monotonic() - started
+    return result
@@ -0,0 +1,821 @@
+"""
+txn_columns.py
+--------------
+Columnar (NumPy) view of the transactions table for aggregations.
+
+TxnColumns holds one array per column, built once from a table entry:
+  user      int32 code into .users      (user_id text)
+  date      int32 code into .dates      (date text)
+  category  int32 code into .categories (lowercased category)
+  amount    int64 amount in cents
+and per distinct date its month key (yyyymm, -1 if not a date). Spend
+totals are then a boolean mask plus np.bincount, instead of string
+work per row. Text cells are compared trimmed.
+
+SpendRollup keeps spend (cents and row count) per (user_id, month,
+category), plus the same sums over all users and/or all months, so
+goal comparisons and totals are a dict lookup per category. It is
+built from the columns in one pass, then each appended row updates
+four cells (O(1) per row).
+
+RecencyIndex keeps each user's rows sorted by (created_at, txn_id), so
+a page of the history after a cursor is a binary search and a slice.
+
+DateIndex keeps each user's row positions sorted by date, so the rows
+of a date range are found by binary search: O(log n + k).
+
+DailySpend keeps, per user and for all users, the spend of each
+(category, day) that has any, sorted, with a running sum. The spend of
+a from/to date range is then two binary searches per category; memory
+grows with the cells that hold spend, not with the days spanned. Only
+rows with a YYYY-MM-DD date in 1900..2199 count; month totals come
+from SpendRollup, which also counts rows whose date merely starts with
+the month.
+
+All five are kept per table entry, and their memory is charged to it
+(see table_cache.charge), so the cache budget covers them. Rows
+appended to that entry (patched writes, or a tail refresh that extends
+it in place, see delta_sync.py) are taken in on the next call; the
+sheet is append-only, so rows already counted never change.
+"""
+
+from __future__ import annotations
+
+import calendar
+import datetime
+import threading
+import weakref
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..budget_planner.table_cache import TableEntry, charge
+from ..utilities.validation import (
+    is_valid_date,
+    is_valid_month,
+    require_date,
+)
+
+
+def month_key(text: str) -> int:
+    """yyyymm for text starting 'YYYY-MM', else -1."""
+    year, month = text[:4], text[5:7]
+    if text[4:5] != "-" or not (year.isdigit() and month.isdigit()):
+        return -1
+    if len(year) != 4 or len(month) != 2:
+        return -1
+    return int(year) * 100 + int(month)
+
+
+# Month key looked up for a query month that is not YYYY-MM: no row has
+# it, so such a month matches nothing (not the rows without a date).
+_NO_MONTH = -2
+
+
+def _query_month(month: str) -> int:
+    """month_key of a month asked for (_NO_MONTH if it is not one)."""
+    text = month.strip()
+    return month_key(text) if is_valid_month(text) else _NO_MONTH
+
+
+def day_number(text: str) -> int:
+    """
+    Day ordinal for text starting 'YYYY-MM-DD', else -1. Days past the
+    end of the month (2025-02-30) count as its last day.
+    """
+    year, month, day = text[:4], text[5:7], text[8:10]
+    if text[4:5] != "-" or text[7:8] != "-":
+        return -1
+    if not (len(year) == 4 and year.isdigit() and len(month) == 2
+            and month.isdigit() and len(day) == 2 and day.isdigit()):
+        return -1
+    y, m, d = int(year), int(month), int(day)
+    if not (1 <= y and 1 <= m <= 12 and d >= 1):
+        return -1
+    d = min(d, calendar.monthrange(y, m)[1])
+    return datetime.date(y, m, d).toordinal()
+
+
+def _cents(value: Any) -> int:
+    """Amount cell in cents; unreadable amounts count as 0."""
+    try:
+        return int(round(float(value or 0) * 100))
+    except (TypeError, ValueError, OverflowError):
+        return 0
+
+
+def _user_text(record: Dict) -> str:
+    return str(record.get("user_id", "")).strip()
+
+
+def _date_text(record: Dict) -> str:
+    return str(record.get("date", "")).strip()
+
+
+def _category_text(record: Dict) -> str:
+    return str(
+        record.get("category") or record.get("category_norm") or ""
+    ).strip().lower()
+
+
+def _codes(values: List[str], table: Dict[str, int]) -> np.ndarray:
+    """Code each value, adding new ones to table."""
+    return np.fromiter(
+        (table.setdefault(v, len(table)) for v in values),
+        dtype=np.int32,
+        count=len(values),
+    )
+
+
+class TxnColumns:
+    """Transactions as NumPy columns (see the module docstring)."""
+
+    def __init__(self):
+        self.rows = 0
+        self.users: Dict[str, int] = {}
+        self.dates: Dict[str, int] = {}
+        self.categories: Dict[str, int] = {}
+        self.user = np.zeros(0, dtype=np.int32)
+        self.date = np.zeros(0, dtype=np.int32)
+        self.category = np.zeros(0, dtype=np.int32)
+        self.amount = np.zeros(0, dtype=np.int64)
+        self.date_month = np.zeros(0, dtype=np.int32)
+
+    @property
+    def nbytes(self) -> int:
+        """Rough memory held, in bytes."""
+        arrays = (self.user, self.date, self.category, self.amount,
+                  self.date_month)
+        names = len(self.users) + len(self.dates) + len(self.categories)
+        return sum(a.nbytes for a in arrays) + 120 * names
+
+    def extend(self, records: List[Dict]) -> None:
+        """Convert more records and add them at the end."""
+        if not records:
+            return
+        users = [_user_text(r) for r in records]
+        dates = [_date_text(r) for r in records]
+        cats = [_category_text(r) for r in records]
+        known_dates = len(self.dates)
+        self.user = np.concatenate([self.user, _codes(users, self.users)])
+        self.date = np.concatenate([self.date, _codes(dates, self.dates)])
+        self.category = np.concatenate(
+            [self.category, _codes(cats, self.categories)]
+        )
+        cents = np.fromiter(
+            (_cents(r.get("amount")) for r in records),
+            dtype=np.int64,
+            count=len(records),
+        )
+        self.amount = np.concatenate([self.amount, cents])
+        new_dates = list(self.dates)[known_dates:]
+        self.date_month = np.concatenate([
+            self.date_month,
+            np.array([month_key(d) for d in new_dates], dtype=np.int32),
+        ])
+        self.rows += len(records)
+
+    def select(
+        self,
+        *,
+        user_id: Optional[str] = None,
+        date: Optional[str] = None,
+        month: Optional[str] = None,
+    ) -> np.ndarray:
+        """Boolean mask of rows for a user, an exact date and/or a month."""
+        mask = np.ones(self.rows, dtype=bool)
+        if user_id is not None:
+            code = self.users.get(str(user_id).strip(), -1)
+            mask &= self.user == code
+        if date:
+            code = self.dates.get(date.strip(), -1)
+            mask &= self.date == code
+        if month:
+            key = _query_month(month)
+            mask &= self.date_month[self.date] == key
+        return mask
+
+    def total(self, mask: np.ndarray) -> float:
+        """Sum of the selected amounts (mask, or an array of positions)."""
+        return int(self.amount[mask].sum()) / 100
+
+    def by_category(self, mask: np.ndarray) -> Dict[str, float]:
+        """
+        Selected amounts (mask, or an array of positions) summed per
+        category; only categories seen are included.
+        """
+        size = len(self.categories)
+        cats = self.category[mask]
+        counts = np.bincount(cats, minlength=size)
+        sums = np.bincount(cats, weights=self.amount[mask], minlength=size)
+        return {
+            name: float(sums[code]) / 100
+            for name, code in self.categories.items()
+            if counts[code]
+        }
+
+
+# (user_id or None, month key or None, category) -> [cents, rows];
+# None stands for "all users" / "all months".
+RollupKey = Tuple[Optional[str], Optional[int], str]
+
+
+class SpendRollup:
+    """Spend per (user, month, category) (see the module docstring)."""
+
+    def __init__(self):
+        self.rows = 0
+        self.cells: Dict[RollupKey, List[int]] = {}
+        # Categories seen, in first-seen order.
+        self.categories: Dict[str, None] = {}
+
+    @property
+    def nbytes(self) -> int:
+        """Rough memory held, in bytes."""
+        return 200 * len(self.cells)
+
+    @classmethod
+    def from_columns(cls, cols: TxnColumns) -> "SpendRollup":
+        """Group the columns by (user, month, category) in one pass."""
+        rollup = cls()
+        rollup.rows = cols.rows
+        if not cols.rows:
+            return rollup
+        # One int64 per row: user code, month key + 1 (20 bits) and
+        # category code (20 bits).
+        month = cols.date_month[cols.date].astype(np.int64) + 1
+        packed = (
+            (cols.user.astype(np.int64) << 40)
+            | (month << 20)
+            | cols.category.astype(np.int64)
+        )
+        groups, inverse = np.unique(packed, return_inverse=True)
+        cents = np.bincount(inverse, weights=cols.amount)
+        counts = np.bincount(inverse)
+        users = list(cols.users)
+        categories = list(cols.categories)
+        mask = (1 << 20) - 1
+        for key, total, count in zip(
+            groups.tolist(), cents.tolist(), counts.tolist()
+        ):
+            rollup._bump(
+                users[key >> 40],
+                ((key >> 20) & mask) - 1,
+                categories[key & mask],
+                int(round(total)),
+                count,
+            )
+        return rollup
+
+    def _bump(
+        self, user_id: str, month: int, category: str, cents: int, count: int
+    ) -> None:
+        self.categories.setdefault(category, None)
+        for key in (
+            (user_id, month, category),
+            (user_id, None, category),
+            (None, month, category),
+            (None, None, category),
+        ):
+            cell = self.cells.get(key)
+            if cell is None:
+                self.cells[key] = [cents, count]
+            else:
+                cell[0] += cents
+                cell[1] += count
+
+    def add(self, record: Dict) -> None:
+        """Count one more transaction record."""
+        self._bump(
+            _user_text(record),
+            month_key(_date_text(record)),
+            _category_text(record),
+            _cents(record.get("amount")),
+            1,
+        )
+        self.rows += 1
+
+    def spent(
+        self,
+        category: str,
+        *,
+        user_id: Optional[str] = None,
+        month: Optional[str] = None,
+    ) -> float:
+        """Spend of one category for a user and/or month (else all)."""
+        key = _rollup_key(user_id, month, category)
+        cell = self.cells.get(key)
+        return cell[0] / 100 if cell else 0.0
+
+    def by_category(
+        self, *, user_id: Optional[str] = None, month: Optional[str] = None
+    ) -> Dict[str, float]:
+        """Spend per category seen for a user and/or month (else all)."""
+        out: Dict[str, float] = {}
+        for category in self.categories:
+            cell = self.cells.get(_rollup_key(user_id, month, category))
+            if cell and cell[1]:
+                out[category] = cell[0] / 100
+        return out
+
+    def total(
+        self, *, user_id: Optional[str] = None, month: Optional[str] = None
+    ) -> float:
+        """Spend over all categories for a user and/or month."""
+        cents = 0
+        for category in self.categories:
+            cell = self.cells.get(_rollup_key(user_id, month, category))
+            if cell:
+                cents += cell[0]
+        return cents / 100
+
+
+def _rollup_key(
+    user_id: Optional[str], month: Optional[str], category: str
+) -> RollupKey:
+    user = str(user_id).strip() if user_id is not None else None
+    key = _query_month(month) if month else None
+    return user, key, category
+
+
+# DailySpend only keeps dates in these years; others are typos.
+_FIRST_DAY = datetime.date(1900, 1, 1).toordinal()
+_LAST_DAY = datetime.date(2199, 12, 31).toordinal()
+# Bits of a DailySpend key: user code, category code, day. 17 bits
+# hold every day of 1900..2199; codes past their bits are refused.
+_DAY_BITS = 17
+_CAT_BITS = 23
+_USER_SHIFT = _DAY_BITS + _CAT_BITS
+_USER_BITS = 63 - _USER_SHIFT
+
+
+def _check_codes(categories: int, users: int) -> None:
+    """Refuse code counts that would not fit their DailySpend bits."""
+    if categories > 1 << _CAT_BITS or users >= 1 << _USER_BITS:
+        raise ValueError(
+            "Too many categories or users for the daily spend index."
+        )
+
+
+class DailySpend:
+    """
+    Spend per (user, category, day), sparse (see the module docstring).
+
+    Each cell with spend is one int64 key, (user code << 40) | (category
+    code << 17) | day, with user code 0 standing for all users. The keys
+    are kept sorted next to the running sum of their cents, so the
+    spend of one user and category over a range of days is the
+    difference of two sums found by binary search. Rows added later
+    wait in a list and are merged in on the next query.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        # category -> code; user_id -> code (from 1)
+        self.categories: Dict[str, int] = {}
+        self.users: Dict[str, int] = {}
+        self._keys = np.zeros(0, dtype=np.int64)
+        # _sums[i] is the cents of every cell before _keys[i].
+        self._sums = np.zeros(1, dtype=np.int64)
+        self._pending: List[Tuple[int, int]] = []
+
+    @property
+    def nbytes(self) -> int:
+        """Rough memory held, in bytes."""
+        return (
+            self._keys.nbytes
+            + self._sums.nbytes
+            + 100 * (len(self._pending) + len(self.users))
+        )
+
+    @classmethod
+    def from_columns(cls, cols: TxnColumns) -> "DailySpend":
+        """Build the cells of every user from the columns at once."""
+        daily = cls()
+        daily.rows = cols.rows
+        daily.categories = dict(cols.categories)
+        daily.users = {u: i + 1 for i, u in enumerate(cols.users)}
+        _check_codes(len(daily.categories), len(daily.users))
+        days = np.array(
+            [_day_offset(d) for d in cols.dates], dtype=np.int64
+        )[cols.date]
+        dated = days >= 0
+        cells = (cols.category.astype(np.int64) << _DAY_BITS) | days
+        users = (cols.user.astype(np.int64) + 1) << _USER_SHIFT
+        keys = np.concatenate([cells[dated], (users | cells)[dated]])
+        cents = np.concatenate([cols.amount[dated], cols.amount[dated]])
+        daily._merge(keys, cents)
+        return daily
+
+    def _merge(self, keys: np.ndarray, cents: np.ndarray) -> None:
+        """Add cents to the cells of keys (new cells are inserted)."""
+        if not len(keys):
+            return
+        keys, inverse = np.unique(keys, return_inverse=True)
+        cents = np.bincount(inverse, weights=cents).round().astype(np.int64)
+        amounts = np.diff(self._sums)
+        pos = np.searchsorted(self._keys, keys)
+        held = pos < len(self._keys)
+        held[held] = self._keys[pos[held]] == keys[held]
+        np.add.at(amounts, pos[held], cents[held])
+        new = ~held
+        self._keys = np.insert(self._keys, pos[new], keys[new])
+        amounts = np.insert(amounts, pos[new], cents[new])
+        self._sums = np.concatenate(
+            [np.zeros(1, dtype=np.int64), np.cumsum(amounts)]
+        )
+
+    def add(self, record: Dict) -> None:
+        """Count one more transaction record."""
+        self.rows += 1
+        day = _day_offset(_date_text(record))
+        if day < 0:
+            return
+        category, user_id = _category_text(record), _user_text(record)
+        _check_codes(
+            len(self.categories) + (category not in self.categories),
+            len(self.users) + (user_id not in self.users),
+        )
+        cat = self.categories.setdefault(category, len(self.categories))
+        user = self.users.setdefault(user_id, len(self.users) + 1)
+        cell = (cat << _DAY_BITS) | day
+        cents = _cents(record.get("amount"))
+        self._pending.append((cell, cents))
+        self._pending.append(((user << _USER_SHIFT) | cell, cents))
+
+    def _flush(self) -> None:
+        if self._pending:
+            keys, cents = zip(*self._pending)
+            self._pending = []
+            self._merge(
+                np.array(keys, dtype=np.int64),
+                np.array(cents, dtype=np.int64),
+            )
+
+    def _window(
+        self,
+        user_id: Optional[str],
+        start: Optional[str],
+        end: Optional[str],
+    ) -> Dict[str, int]:
+        """Cents per category dated start..end (inclusive)."""
+        self._flush()
+        if user_id is None:
+            user = 0
+        else:
+            user = self.users.get(str(user_id).strip(), -1)
+            if user < 0:
+                return {}
+        lo = _day_offset(start, clamp=True) if start else 0
+        hi = _day_offset(end, clamp=True) if end else (1 << _DAY_BITS) - 1
+        if hi < lo:
+            return {}
+        out: Dict[str, int] = {}
+        for name, cat in self.categories.items():
+            base = (user << _USER_SHIFT) | (cat << _DAY_BITS)
+            i = np.searchsorted(self._keys, base | lo, side="left")
+            j = np.searchsorted(self._keys, base | hi, side="right")
+            out[name] = int(self._sums[j] - self._sums[i])
+        return out
+
+    def spent(
+        self,
+        category: str,
+        *,
+        user_id: Optional[str] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+    ) -> float:
+        """Spend of one category dated start..end (either may be open)."""
+        return self._window(user_id, start, end).get(category, 0) / 100
+
+    def by_category(
+        self,
+        *,
+        user_id: Optional[str] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+    ) -> Dict[str, float]:
+        """
+        Spend per category dated start..end; categories with no spend
+        are left out.
+        """
+        cents = self._window(user_id, start, end)
+        return {name: c / 100 for name, c in cents.items() if c}
+
+    def total(
+        self,
+        *,
+        user_id: Optional[str] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+    ) -> float:
+        """Spend over all categories dated start..end."""
+        return sum(self._window(user_id, start, end).values()) / 100
+
+
+def _day_offset(text: str, clamp: bool = False) -> int:
+    """
+    Days since 1900-01-01 for a DailySpend date, or -1 if text is not a
+    date or out of range. clamp moves out-of-range dates to the ends.
+    """
+    day = day_number(text)
+    if day < 0:
+        return -1
+    if clamp:
+        day = min(max(day, _FIRST_DAY), _LAST_DAY)
+    elif not _FIRST_DAY <= day <= _LAST_DAY:
+        return -1
+    return day - _FIRST_DAY
+
+
+Cursor = Tuple[str, str]
+
+
+def recency_key(record: Dict) -> Cursor:
+    """(created_at, txn_id) of a record: newest first, ties by id."""
+    return (
+        str(record.get("created_at", "")),
+        str(record.get("txn_id", "")),
+    )
+
+
+class RecencyIndex:
+    """
+    Per user (and for all users, under None) the keys and records in
+    ascending recency_key order. Pages are read from the end.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self._keys: Dict[Optional[str], List[Cursor]] = {}
+        self._records: Dict[Optional[str], List[Dict]] = {}
+
+    @property
+    def nbytes(self) -> int:
+        """Rough memory held, in bytes (a key tuple per row and list)."""
+        return 160 * self.rows
+
+    def extend(self, records: List[Dict]) -> None:
+        """Add records; usually newer than all others, so O(1) each."""
+        if not self.rows and records:
+            # First load: one sort, then split per user in order.
+            ordered = sorted(records, key=recency_key)
+            for record in ordered:
+                for user in (None, _user_text(record)):
+                    self._keys.setdefault(user, []).append(
+                        recency_key(record)
+                    )
+                    self._records.setdefault(user, []).append(record)
+            self.rows = len(records)
+            return
+        for record in records:
+            key = recency_key(record)
+            for user in (None, _user_text(record)):
+                keys = self._keys.setdefault(user, [])
+                rows = self._records.setdefault(user, [])
+                if not keys or keys[-1] <= key:
+                    keys.append(key)
+                    rows.append(record)
+                else:
+                    pos = bisect_left(keys, key)
+                    keys.insert(pos, key)
+                    rows.insert(pos, record)
+            self.rows += 1
+
+    def page(
+        self,
+        *,
+        user_id: Optional[str] = None,
+        after: Optional[Cursor] = None,
+        size: int = 20,
+        date: Optional[str] = None,
+    ) -> List[Dict]:
+        """
+        Up to size records, newest first, strictly older than the
+        cursor after (from the newest when None). date keeps one day.
+        """
+        user = str(user_id).strip() if user_id is not None else None
+        keys = self._keys.get(user, [])
+        rows = self._records.get(user, [])
+        end = len(keys) if after is None else bisect_left(keys, after)
+        if not date:
+            return rows[max(0, end - size):end][::-1]
+        out: List[Dict] = []
+        for i in range(end - 1, -1, -1):
+            if _date_text(rows[i]) == date:
+                out.append(rows[i])
+                if len(out) >= size:
+                    break
+        return out
+
+
+def date_range(
+    start: Optional[str], end: Optional[str]
+) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Validate optional YYYY-MM-DD bounds (inclusive) with require_date.
+    Raises ValueError if a bound is invalid or start is after end.
+    """
+    start = require_date(start, "From date") if start else None
+    end = require_date(end, "To date") if end else None
+    if start and end and start > end:
+        raise ValueError("From date must not be after the to date.")
+    return start, end
+
+
+class DateIndex:
+    """
+    Per user (and for all users, under None) the dates, ascending, and
+    the position in the table of the row with each date. Rows without
+    a valid YYYY-MM-DD date are left out; no range can include them.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self._dates: Dict[Optional[str], List[str]] = {}
+        self._positions: Dict[Optional[str], List[int]] = {}
+
+    @property
+    def nbytes(self) -> int:
+        """Rough memory held, in bytes (a date and a position per list)."""
+        return 90 * self.rows
+
+    def extend(self, records: List[Dict]) -> None:
+        """Add records that follow the ones already indexed."""
+        first = self.rows
+        items = []
+        for pos, record in enumerate(records, start=first):
+            date = _date_text(record)
+            if is_valid_date(date):
+                items.append((date, pos, _user_text(record)))
+        self.rows += len(records)
+        if not first:
+            # First load: one sort, then split per user in order.
+            items.sort()
+            for date, pos, user in items:
+                for key in (None, user):
+                    self._dates.setdefault(key, []).append(date)
+                    self._positions.setdefault(key, []).append(pos)
+            return
+        for date, pos, user in items:
+            for key in (None, user):
+                dates = self._dates.setdefault(key, [])
+                positions = self._positions.setdefault(key, [])
+                at = bisect_right(dates, date)
+                dates.insert(at, date)
+                positions.insert(at, pos)
+
+    def positions(
+        self,
+        *,
+        user_id: Optional[str] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+    ) -> List[int]:
+        """Positions of the rows dated start..end (inclusive), by date."""
+        user = str(user_id).strip() if user_id is not None else None
+        dates = self._dates.get(user, [])
+        lo = bisect_left(dates, start) if start else 0
+        hi = bisect_right(dates, end) if end else len(dates)
+        return self._positions.get(user, [])[lo:hi]
+
+
+class _View:
+    """Derived data of one table entry."""
+
+    def __init__(self, entry: TableEntry):
+        self.ref = weakref.ref(entry)
+        self.columns = TxnColumns()
+        self.rollup: Optional[SpendRollup] = None
+        self.recency = RecencyIndex()
+        self.dates = DateIndex()
+        self.daily: Optional[DailySpend] = None
+        # Bytes counted against the entry so far (see charge()).
+        self.charged = 0
+
+    def recharge(self, entry: TableEntry) -> None:
+        """Count the views' current memory as part of the entry."""
+        parts = [self.columns, self.rollup, self.recency, self.dates,
+                 self.daily]
+        held = sum(p.nbytes for p in parts if p is not None)
+        if held != self.charged:
+            charge(entry, held - self.charged)
+            self.charged = held
+
+
+# id(entry) -> the views of that entry
+_views: Dict[int, _View] = {}
+_views_lock = threading.RLock()
+
+
+def _view(entry: TableEntry) -> _View:
+    """The views of entry (new ones if rows were removed from it)."""
+    view = _views.get(id(entry))
+    if (
+        view is None
+        or view.ref() is not entry
+        or view.columns.rows > len(entry.records)
+        or view.recency.rows > len(entry.records)
+        or view.dates.rows > len(entry.records)
+        or (view.rollup is not None
+            and view.rollup.rows > len(entry.records))
+        or (view.daily is not None
+            and view.daily.rows > len(entry.records))
+    ):
+        for key in [k for k, v in _views.items() if v.ref() is None]:
+            del _views[key]
+        if view is not None and view.ref() is entry and view.charged:
+            charge(entry, -view.charged)
+        view = _View(entry)
+        _views[id(entry)] = view
+    return view
+
+
+def catch_up(entry: TableEntry) -> None:
+    """
+    Take rows appended to entry into the views of it built so far;
+    views not built yet are left for their first use.
+    """
+    with _views_lock:
+        view = _views.get(id(entry))
+        if view is None or view.ref() is not entry:
+            return
+        if view.columns.rows:
+            columns_for(entry)
+        if view.rollup is not None:
+            rollup_for(entry)
+        if view.daily is not None:
+            daily_for(entry)
+        if view.recency.rows:
+            recency_for(entry)
+        if view.dates.rows:
+            dates_for(entry)
+
+
+def columns_for(entry: TableEntry) -> TxnColumns:
+    """
+    Return the columns of a transactions table entry, built on first
+    use and extended with rows appended to the entry since.
+    """
+    with _views_lock:
+        view = _view(entry)
+        cols = view.columns
+        cols.extend(entry.records[cols.rows:])
+        view.recharge(entry)
+        return cols
+
+
+def rollup_for(entry: TableEntry) -> SpendRollup:
+    """
+    Return the spend rollup of a transactions table entry, built on
+    first use and updated with rows appended to the entry since.
+    """
+    with _views_lock:
+        view = _view(entry)
+        if view.rollup is None:
+            view.rollup = SpendRollup.from_columns(columns_for(entry))
+        for record in entry.records[view.rollup.rows:]:
+            view.rollup.add(record)
+        view.recharge(entry)
+        return view.rollup
+
+
+def daily_for(entry: TableEntry) -> DailySpend:
+    """
+    Return the daily spend sums of a transactions table entry, built on
+    first use and updated with rows appended to the entry since.
+    """
+    with _views_lock:
+        view = _view(entry)
+        if view.daily is None:
+            view.daily = DailySpend.from_columns(columns_for(entry))
+        for record in entry.records[view.daily.rows:]:
+            view.daily.add(record)
+        view.recharge(entry)
+        return view.daily
+
+
+def recency_for(entry: TableEntry) -> RecencyIndex:
+    """
+    Return the recency index of a transactions table entry, built on
+    first use and updated with rows appended to the entry since.
+    """
+    with _views_lock:
+        view = _view(entry)
+        view.recency.extend(entry.records[view.recency.rows:])
+        view.recharge(entry)
+        return view.recency
+
+
+def dates_for(entry: TableEntry) -> DateIndex:
+    """
+    Return the date index of a transactions table entry, built on
+    first use and updated with rows appended to the entry since.
+    """
+    with _views_lock:
+        view = _view(entry)
+        view.dates.extend(entry.records[view.dates.rows:])
+        view.recharge(entry)
+        return view.dates
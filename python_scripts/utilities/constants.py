@@ -17,3 +17,39 @@ ALLOWED_CATEGORIES = [
     "savings",
     "misc",
 ]
+
+# Header row of each worksheet. The SQLite backend uses the same lists
+# as its column names.
+USERS_HEADERS = ["user_id", "email", "password_hash", "created_at"]
+ROLE_HEADERS = ["email", "role"]
+TRANSACTIONS_HEADERS = [
+    "txn_id",
+    "user_id",
+    "date",
+    "category",
+    "amount",
+    "note",
+    "created_at",
+]
+BUDGET_HEADERS = [
+    "budget_id",
+    "user_id",
+    "month",
+    "category_norm",
+    "monthly_goal",
+]
+
+SHEET_HEADERS = {
+    "users": USERS_HEADERS,
+    "Role": ROLE_HEADERS,
+    "transactions": TRANSACTIONS_HEADERS,
+    "budget": BUDGET_HEADERS,
+}
+
+# Worksheets that only ever grow at the bottom (rows are never edited,
+# moved or removed), so they can be refreshed by reading the new rows.
+APPEND_ONLY_SHEETS = ("transactions",)
+
+# Worksheets never saved to disk as snapshots: the users sheet holds
+# password hashes, which are not worth persisting for a faster start.
+NO_SNAPSHOT_SHEETS = ("users",)
@@ -0,0 +1,19 @@
+"""
+dates.py
+--------
+Month arithmetic on YYYY-MM strings.
+"""
+
+from __future__ import annotations
+
+
+def shift_month(month: str, months: int) -> str:
+    """Return the YYYY-MM month that is months after (or before) month."""
+    year, mon = int(month[:4]), int(month[5:7])
+    index = year * 12 + (mon - 1) + months
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+def previous_month(month: str) -> str:
+    """Return the month before a YYYY-MM month."""
+    return shift_month(month, -1)
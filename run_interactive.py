@@ -9,8 +9,13 @@ from __future__ import annotations
 import shlex
 
 from python_scripts.budget_planner.index import app
+from python_scripts.budget_planner.sheets_gateway import command_scope
+from python_scripts.budget_planner.storage import get_backend
+from python_scripts.budget_planner.unit_of_work import FlushError
 import os
 import difflib
+import signal
+import sys
 
 
 # Simple ANSI helpers for headings
@@ -25,11 +30,14 @@ GUIDE_BODY_BASE = """
 - login          Sign in
 - add-txn        Add a transaction
 - list-txns      Show recent transactions
+- import-txns    Import transactions from a CSV/JSONL file
 - sum-month      Show monthly total
 - set-goal       Set a monthly goal
+- set-goals      Set several goals at once (or copy last month's)
 - list-goals     Show your goals
 - budget-status  Compare goals vs spend
 - summary        Totals by category
+- trend          Spending per month with averages and changes
 - whoami         Show your account info
 - change-password Change your password
 - logout         Sign out
@@ -41,13 +49,19 @@ GUIDE_BODY_BASE = """
 GUIDE_BODY_EDITOR = """
 - list-users     List all users
 - set-role       (editor) change a user's role
+- budget-report-all (editor) goals vs spend for every account
 """
 
 GUIDE_EXAMPLES = """
 - add-txn --date 2025-10-30 --category groceries --amount 12.50 --note "Lunch"
 - list-txns --limit 20
+- list-txns --page-size 20   (then --after '<cursor>' for the next page)
+- summary --from 2025-01-15 --to 2025-03-10
+- sum-month --from 2025-09-01 --to 2025-10-31
 - set-goal --month 2025-10 --category transport --amount 45
+- set-goals --month 2025-11 --copy-last groceries=220 transport=50
 - budget-status --month 2025-10
+- trend --months 12 --by-category
 """
 
 # Extra examples editors can run against other users
@@ -58,6 +72,7 @@ GUIDE_EXAMPLES_EDITOR = """
 - set-goal --email user@example.com --month 2025-10 --category groceries
   --amount 200
 - budget-status --email user@example.com --month 2025-10
+- budget-report-all --month 2025-10 --csv budget-2025-10.csv
 """
 
 
@@ -98,10 +113,15 @@ def _dispatch(line: str) -> None:
     if line.strip():
         print("")
     try:
-        app(args=args, prog_name="bp", standalone_mode=False)
+        # One unit of work per command: sheets are read at most once and
+        # writes are saved together when the command finishes.
+        with command_scope():
+            app(args=args, prog_name="bp", standalone_mode=False)
     except SystemExit:
         # Typer/Click exits normally; suppress to keep REPL running
         pass
+    except FlushError as exc:
+        print(f"{RED}Saving changes failed: {exc}{RESET}")
     except Exception as exc:
         # Try to suggest a command if the first token looks like a typo
         name = (args[0].strip().lower() if args else "")
@@ -176,8 +196,31 @@ def onboarding() -> None:
         print("Please enter 'login' or 'signup'.")
 
 
+def save_pending() -> None:
+    """Save buffered transactions before leaving the terminal."""
+    try:
+        get_backend().flush()
+    except Exception as exc:
+        print(f"{RED}Could not save pending transactions: {exc}{RESET}")
+
+
 def main() -> None:
     """Interactive loop after onboarding."""
+    # Closing the browser tab hangs up the terminal; exit cleanly so
+    # buffered transactions are still saved.
+    if hasattr(signal, "SIGHUP"):
+        signal.signal(signal.SIGHUP, lambda *_: sys.exit(0))
+    # Saved tables from earlier sessions serve the first commands
+    # while they are refreshed in the background.
+    get_backend().warm_start()
+    try:
+        _interactive_loop()
+    finally:
+        save_pending()
+
+
+def _interactive_loop() -> None:
+    """Onboarding, then read and run commands until exit."""
     onboarding()
     print_guide()
     print("\nBudget Planner - interactive mode")
@@ -0,0 +1,63 @@
+"""
+Shared fixtures: every test runs against a fresh FakeSpreadsheet with
+its own table cache and API scheduler, so no test talks to Google,
+sees another's data or waits for another's quota.
+"""
+
+from __future__ import annotations
+
+import pytest
+
+from python_scripts.budget_planner import auth
+from python_scripts.budget_planner import sheets_gateway as gw
+from python_scripts.budget_planner import storage
+from python_scripts.budget_planner.fake_sheets import FakeSpreadsheet
+from python_scripts.services import budgets
+from python_scripts.utilities.constants import SHEET_HEADERS
+
+
+@pytest.fixture
+def sheet(monkeypatch):
+    """A seeded fake spreadsheet in use, with a 5 minute cache TTL."""
+    monkeypatch.setenv("BP_STORAGE", "sheets")
+    monkeypatch.setenv("BP_CACHE_TTL", "300")
+    monkeypatch.setenv("BP_SNAPSHOTS", "0")
+    monkeypatch.setattr(gw, "_cache", None)
+    # A fresh token bucket: the per-minute quota is not shared by tests.
+    monkeypatch.setattr(gw, "_scheduler", None)
+    storage.set_backend(None)
+    budgets.reset_goal_index()
+    fake = FakeSpreadsheet().seed(SHEET_HEADERS)
+    gw.use_sheet(fake)
+    yield fake
+    gw.use_sheet(FakeSpreadsheet())
+    storage.set_backend(None)
+    budgets.reset_goal_index()
+
+
+def add_user(fake: FakeSpreadsheet, user_id: str, email: str) -> None:
+    """Write a user straight into the sheet (as another session would)."""
+    fake.worksheet("users")._append(
+        [[user_id, email, auth.hash_password("secret1"), "2025-01-01"]],
+        "RAW",
+    )
+
+
+def values(fake: FakeSpreadsheet, title: str):
+    """Every stored row of a worksheet, header row first."""
+    return fake.worksheet(title)._snapshot()
+
+
+@pytest.fixture
+def sqlite_db(tmp_path):
+    """A fresh SQLite backend in use, with users u1 (a@b.c) and u2."""
+    backend = storage.SqliteBackend(str(tmp_path / "bp.db"))
+    storage.set_backend(backend)
+    budgets.reset_goal_index()
+    backend.append_rows(auth.USERS_SHEET, [
+        ["u1", "a@b.c", "x", "2025-01-01"],
+        ["u2", "z@b.c", "x", "2025-01-01"],
+    ])
+    yield backend
+    storage.set_backend(None)
+    budgets.reset_goal_index()
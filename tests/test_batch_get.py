@@ -0,0 +1,74 @@
+"""
+Commands that need several worksheets read them in one values:batchGet
+request, decoded like get_all_records().
+"""
+
+from __future__ import annotations
+
+from python_scripts.budget_planner import sheets_gateway as gw
+from python_scripts.utilities.constants import SHEET_HEADERS
+
+_SPECS = {title: (headers, "") for title, headers in SHEET_HEADERS.items()}
+
+
+def _seed(fake):
+    fake.worksheet("users")._append(
+        [["u1", "a@b.c", "x", "2025-01-01"], ["u2", "z@b.c"]], "RAW"
+    )
+    fake.worksheet("transactions")._append([
+        ["t1", "u1", "2025-10-01", "groceries", "12.50", "", "2025-10-01"],
+        ["t2", "u2", "2025-10-02", "transport", "3", "bus"],
+        ["t3", "u1", "2025-10-03", "social", "007"],
+    ], "RAW")
+    # Worksheet handles are listed once per session; not counted here.
+    gw.get_worksheet("users")
+
+
+def test_one_request_decodes_like_get_all_records(sheet):
+    _seed(sheet)
+    sheet.reset_stats()
+
+    tables = gw.read_tables(_SPECS)
+
+    assert sheet.calls[("*", "values_batch_get")] == 1
+    assert sheet.total_calls("read") == 1
+    for title, headers in SHEET_HEADERS.items():
+        assert tables[title].headers == headers
+        expected = sheet.worksheet(title).get_all_records()
+        assert tables[title].records == expected
+    # Short rows are padded; numbers are numericised.
+    assert tables["users"].records[1]["created_at"] == ""
+    assert tables["transactions"].records[0]["amount"] == 12.5
+    assert tables["budget"].records == []
+
+
+def test_cached_tables_are_not_requested_again(sheet):
+    _seed(sheet)
+    gw.read_tables({"users": _SPECS["users"]})
+    sheet.reset_stats()
+
+    tables = gw.read_tables(_SPECS)
+
+    assert sheet.calls[("*", "values_batch_get")] == 1
+    assert [r["user_id"] for r in tables["users"].records] == ["u1", "u2"]
+    sheet.reset_stats()
+    gw.read_tables(_SPECS)
+    assert sheet.total_calls("read") == 0
+
+
+def test_projection_decodes_only_its_columns(sheet):
+    _seed(sheet)
+
+    tables = gw.read_tables(
+        {"users": _SPECS["users"],
+         "transactions": _SPECS["transactions"]},
+        {"transactions": ["user_id", "amount"]},
+    )
+
+    txns = tables["transactions"]
+    assert set(txns.headers) >= {"user_id", "amount"}
+    assert "category" not in txns.headers
+    assert [(r["user_id"], r["amount"]) for r in txns.records] == [
+        ("u1", 12.5), ("u2", 3), ("u1", 7),
+    ]
+    assert len(tables["users"].records) == 2
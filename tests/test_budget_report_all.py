@@ -0,0 +1,105 @@
+"""
+The editor report compares every account's goals with its spend from
+one read of the users, budget and transactions sheets, and saves it
+only as a new file inside the reports directory.
+"""
+
+from __future__ import annotations
+
+import csv
+
+import pytest
+
+from python_scripts.services import budgets as bud
+
+from .conftest import add_user
+
+
+@pytest.fixture
+def goals(sheet):
+    add_user(sheet, "u1", "z@b.c")
+    add_user(sheet, "u2", "a@b.c")
+    sheet.worksheet("budget")._append([
+        ["b1", "u1", "2025-10", "groceries", "100"],
+        ["b2", "ghost", "2025-10", "social", "10"],
+        ["b3", "u2", "2025-10", "transport", "50"],
+        ["b4", "u2", "2025-09", "groceries", "20"],
+        ["b5", "u2", "2025-10", "groceries", "oops"],
+    ], "RAW")
+    sheet.worksheet("transactions")._append([
+        ["t1", "u1", "2025-10-02", "groceries", "30", "", ""],
+        ["t2", "u2", "2025-10-03", "transport", "70", "", ""],
+        ["t3", "u2", "2025-09-03", "groceries", "5", "", ""],
+    ], "RAW")
+    return sheet
+
+
+def test_rows_by_email_with_unknown_users_last(goals):
+    rows = bud.goals_vs_spend_all(month="2025-10")
+
+    assert [(r["email"], r["user_id"], r["category"]) for r in rows] == [
+        ("a@b.c", "u2", "transport"),
+        ("z@b.c", "u1", "groceries"),
+        ("", "ghost", "social"),
+    ]
+    assert [(r["goal"], r["spent"], r["diff"]) for r in rows] == [
+        (50.0, 70.0, -20.0), (100.0, 30.0, 70.0), (10.0, 0.0, 10.0),
+    ]
+
+
+def test_without_a_month_every_goal_counts_all_spend(goals):
+    rows = bud.goals_vs_spend_all()
+
+    assert [(r["month"], r["category"], r["spent"])
+            for r in rows if r["user_id"] == "u2"] == [
+        ("2025-10", "transport", 70.0), ("2025-09", "groceries", 5.0),
+    ]
+
+
+def test_report_reads_the_sheets_once(goals):
+    goals.reset_stats()
+
+    bud.goals_vs_spend_all(month="2025-10")
+
+    assert goals.calls[("*", "values_batch_get")] == 1
+
+
+def test_write_report_csv(goals, tmp_path):
+    rows = bud.goals_vs_spend_all(month="2025-10")
+    path = tmp_path / "report.csv"
+
+    assert bud.write_report_csv(rows, str(path)) == 3
+
+    with open(path, newline="", encoding="utf-8") as fh:
+        written = list(csv.DictReader(fh))
+    assert list(written[0]) == bud.REPORT_FIELDS
+    assert written[0] == {
+        "email": "a@b.c", "user_id": "u2", "month": "2025-10",
+        "category": "transport", "goal": "50.00", "spent": "70.00",
+        "diff": "-20.00",
+    }
+
+
+@pytest.mark.parametrize(
+    "name", ["run.py", "../report.csv", "sub/report.csv", "/tmp/r.csv",
+             ".csv", ""],
+)
+def test_report_name_must_be_a_plain_csv_name(name, tmp_path, monkeypatch):
+    monkeypatch.setenv("BP_REPORTS_DIR", str(tmp_path / "reports"))
+    with pytest.raises(ValueError, match="file name ending in .csv"):
+        bud.report_csv_path(name)
+
+
+def test_report_is_written_once_in_the_reports_dir(
+    goals, tmp_path, monkeypatch
+):
+    monkeypatch.setenv("BP_REPORTS_DIR", str(tmp_path / "reports"))
+    rows = bud.goals_vs_spend_all(month="2025-10")
+    path = bud.report_csv_path("budget-2025-10.csv")
+
+    assert path == str(tmp_path / "reports" / "budget-2025-10.csv")
+    bud.write_report_csv(rows, path)
+    with pytest.raises(ValueError, match="already exists"):
+        bud.write_report_csv([], path)
+    with open(path, newline="", encoding="utf-8") as fh:
+        assert len(list(csv.DictReader(fh))) == 3
@@ -0,0 +1,63 @@
+"""
+Users are found by email through an index built from one download of
+the users sheet.
+"""
+
+from __future__ import annotations
+
+from python_scripts.budget_planner import auth
+
+from .conftest import add_user
+
+
+def test_lookup_is_case_insensitive_and_trimmed(sheet):
+    add_user(sheet, "u1", "a@b.c")
+    add_user(sheet, "u2", "Z@B.c")
+
+    assert auth.get_user_by_email(" A@b.C ")["user_id"] == "u1"
+    assert auth.get_user_by_email("z@b.c")["user_id"] == "u2"
+
+
+def test_first_row_wins_for_a_repeated_email(sheet):
+    add_user(sheet, "u1", "a@b.c")
+    add_user(sheet, "u9", "a@b.c")
+
+    assert auth.get_user_by_email("a@b.c")["user_id"] == "u1"
+
+
+def test_lookups_share_one_download(sheet):
+    sheet.worksheet("users")._append(
+        [[f"u{i}", f"user{i}@b.c", "x", "2025-01-01"] for i in range(20)],
+        "RAW",
+    )
+    auth.get_user_by_email("user0@b.c")
+    sheet.reset_stats()
+
+    for i in range(20):
+        assert auth.get_user_by_email(f"user{i}@b.c")["user_id"] == f"u{i}"
+
+    assert sheet.total_calls("read") == 0
+
+
+def test_signup_adds_the_new_user_to_the_index(sheet):
+    add_user(sheet, "u1", "a@b.c")
+    auth.get_user_by_email("a@b.c")
+
+    assert auth.signup("new@b.c", "secret1")
+    sheet.reset_stats()
+
+    assert auth.get_user_by_email("new@b.c")["email"] == "new@b.c"
+    assert sheet.total_calls("read") == 0
+
+
+def test_miss_downloads_again_once(sheet):
+    add_user(sheet, "u1", "a@b.c")
+    auth.get_user_by_email("a@b.c")
+    # Created by another session after our download.
+    add_user(sheet, "u2", "z@b.c")
+    sheet.reset_stats()
+
+    assert auth.get_user_by_email("z@b.c")["user_id"] == "u2"
+    assert sheet.total_calls("read") == 1
+    assert auth.get_user_by_email("nobody@b.c") is None
+    assert sheet.total_calls("read") == 2
@@ -0,0 +1,128 @@
+"""
+Goal rows are addressed by number; the number must always be checked
+against the stored row before it is written to.
+"""
+
+from __future__ import annotations
+
+import pytest
+import typer
+
+from python_scripts.budget_planner import index
+from python_scripts.services import budgets as bud
+
+from .conftest import add_user, values
+
+
+def _goal_rows(fake):
+    return [r for r in values(fake, "budget")[1:]]
+
+
+def _other_session_adds_goal(fake, user_id, goal):
+    fake.worksheet("budget")._append(
+        [[f"other-{user_id}", user_id, "2025-10", "groceries", goal]], "RAW"
+    )
+
+
+def test_update_after_stale_append_keeps_other_users_row(sheet):
+    add_user(sheet, "u1", "a@b.c")
+    add_user(sheet, "u2", "z@b.c")
+    # Our cached copy of the budget sheet is empty from here on.
+    assert bud.list_goals() == []
+    _other_session_adds_goal(sheet, "u2", 999)
+
+    bud.set_goal(email="a@b.c", month="2025-10", category="groceries",
+                 amount=10)
+    bud.set_goal(email="a@b.c", month="2025-10", category="groceries",
+                 amount=20)
+
+    rows = _goal_rows(sheet)
+    assert [r[1:] for r in rows] == [
+        ["u2", "2025-10", "groceries", "999"],
+        ["u1", "2025-10", "groceries", "20"],
+    ]
+
+
+def test_set_goals_batch_does_not_touch_other_rows(sheet):
+    add_user(sheet, "u1", "a@b.c")
+    add_user(sheet, "u2", "z@b.c")
+    bud.list_goals()
+    _other_session_adds_goal(sheet, "u2", 999)
+
+    bud.set_goals(email="a@b.c", month="2025-10",
+                  goals={"groceries": 10, "transport": 5})
+    result = bud.set_goals(email="a@b.c", month="2025-10",
+                           goals={"groceries": 30, "transport": 6})
+
+    assert [r["action"] for r in result] == ["updated", "updated"]
+    rows = _goal_rows(sheet)
+    assert rows[0][1:] == ["u2", "2025-10", "groceries", "999"]
+    assert sorted(r[3:] for r in rows[1:]) == [
+        ["groceries", "30"], ["transport", "6"],
+    ]
+
+
+def test_update_hit_reads_the_row_back(sheet):
+    add_user(sheet, "u1", "a@b.c")
+    bud.set_goal(email="a@b.c", month="2025-10", category="groceries",
+                 amount=10)
+    bud.list_goals()
+    sheet.reset_stats()
+
+    bud.set_goal(email="a@b.c", month="2025-10", category="groceries",
+                 amount=15)
+
+    # One batchGet of the target row, one write; no table download.
+    assert sheet.calls[("*", "values_batch_get")] == 1
+    assert sheet.total_calls("write") == 1
+    assert _goal_rows(sheet)[0][4] == "15"
+
+
+def test_failed_save_forgets_queued_rows(sheet, monkeypatch):
+    add_user(sheet, "u1", "a@b.c")
+    bud.list_goals()
+    ws = sheet.worksheet("budget")
+
+    def refuse(*args, **kwargs):
+        raise RuntimeError("backend down")
+
+    with monkeypatch.context() as m:
+        m.setattr(ws, "append_rows", refuse)
+        m.setattr(ws, "append_row", refuse)
+        with pytest.raises(typer.Exit):
+            with index._command_scope():
+                bud.set_goal(email="a@b.c", month="2025-10",
+                             category="groceries", amount=10)
+    assert bud._goal_index == {}
+
+    bud.set_goal(email="a@b.c", month="2025-10", category="groceries",
+                 amount=12)
+    assert [r[1:] for r in _goal_rows(sheet)] == [
+        ["u1", "2025-10", "groceries", "12"],
+    ]
+
+
+@pytest.mark.parametrize(
+    "category, amount, message",
+    [
+        ("toys", 10, "Invalid category 'toys'"),
+        ("groceries", "ten", "Amount must be numeric."),
+        ("groceries", 0, "Amount must be greater than zero."),
+    ],
+)
+def test_goal_input_is_checked_before_any_read(
+    sheet, category, amount, message
+):
+    sheet.reset_stats()
+    with pytest.raises(ValueError, match=message):
+        bud.set_goal(email="a@b.c", month="2025-10", category=category,
+                     amount=amount)
+    assert sheet.total_calls() == 0
+
+
+def test_set_goals_lists_every_bad_entry(sheet):
+    with pytest.raises(ValueError) as err:
+        bud.set_goals(email="a@b.c", month="2025-10",
+                      goals={"toys": 5, "transport": -1, "groceries": 3})
+    assert "toys: Invalid category" in str(err.value)
+    assert "transport: Amount must be greater than zero." in str(err.value)
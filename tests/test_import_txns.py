@@ -0,0 +1,127 @@
+"""
+import_transactions streams a CSV or JSONL file into the transactions
+sheet in append_rows chunks, skipping (and reporting) invalid rows.
+"""
+
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from python_scripts.budget_planner.fake_sheets import _api_error
+from python_scripts.services import transactions as tx
+
+from .conftest import add_user, values
+
+
+def _stored(fake):
+    return [r[1:6] for r in values(fake, "transactions")[1:]]
+
+
+def test_csv_rows_are_validated_and_written(sheet, tmp_path):
+    add_user(sheet, "u1", "a@b.c")
+    path = tmp_path / "bank.csv"
+    # A BOM, like many bank exports; lines 3 to 5 are invalid.
+    path.write_text(
+        "\ufeffdate,category,amount,note\n"
+        "2025-10-01,Groceries,12.50,milk\n"
+        "2025-13-01,groceries,1,\n"
+        "2025-10-02,pets,1,\n"
+        "2025-10-03,transport,abc,\n"
+        "2025-10-04,transport,3,bus\n",
+        encoding="utf-8",
+    )
+
+    result = tx.import_transactions(email="a@b.c", path=str(path))
+
+    assert (result.imported, result.skipped) == (2, 3)
+    assert [line for line, _ in result.errors] == [3, 4, 5]
+    assert _stored(sheet) == [
+        ["u1", "2025-10-01", "groceries", "12.5", "milk"],
+        ["u1", "2025-10-04", "transport", "3", "bus"],
+    ]
+
+
+def test_jsonl_reports_bad_lines(sheet, tmp_path):
+    add_user(sheet, "u1", "a@b.c")
+    path = tmp_path / "bank.jsonl"
+    path.write_text(
+        json.dumps({"date": "2025-10-01", "category": "social",
+                    "amount": 5}) + "\n"
+        "{not json\n"
+        "\n"
+        "[1, 2]\n",
+        encoding="utf-8",
+    )
+
+    result = tx.import_transactions(email="a@b.c", path=str(path))
+
+    assert (result.imported, result.skipped) == (1, 2)
+    assert [line for line, _ in result.errors] == [2, 4]
+    assert result.errors[0][1].startswith("Invalid JSON")
+
+
+def test_rows_are_written_in_chunks(sheet, tmp_path):
+    add_user(sheet, "u1", "a@b.c")
+    path = tmp_path / "bank.csv"
+    path.write_text(
+        "date,category,amount\n"
+        + "".join(f"2025-10-{d:02d},groceries,{d}\n" for d in range(1, 6)),
+        encoding="utf-8",
+    )
+    seen = []
+
+    result = tx.import_transactions(
+        email="a@b.c", path=str(path), chunk_size=2,
+        progress=lambda r: seen.append(r.imported),
+    )
+
+    assert result.imported == 5
+    assert seen == [2, 4, 5]
+    assert sheet.calls[("transactions", "append_rows")] == 3
+    assert [r[2] for r in _stored(sheet)] == ["groceries"] * 5
+
+
+def test_unknown_format_is_refused(sheet, tmp_path):
+    path = tmp_path / "bank.txt"
+    path.write_text("", encoding="utf-8")
+
+    with pytest.raises(ValueError, match="csv"):
+        tx.import_transactions(email="a@b.c", path=str(path), fmt="xml")
+
+
+def test_failed_batch_reports_progress_and_can_resume(
+    sheet, tmp_path, monkeypatch
+):
+    add_user(sheet, "u1", "a@b.c")
+    path = tmp_path / "bank.csv"
+    path.write_text(
+        "date,category,amount\n"
+        + "".join(f"2025-10-{d:02d},groceries,{d}\n" for d in range(1, 6)),
+        encoding="utf-8",
+    )
+    ws = sheet.worksheet("transactions")
+    append = ws.append_rows
+    calls = []
+
+    def fail_second(*args, **kwargs):
+        calls.append(1)
+        if len(calls) == 2:
+            raise _api_error(400, "INVALID_ARGUMENT", "boom")
+        return append(*args, **kwargs)
+
+    monkeypatch.setattr(ws, "append_rows", fail_second)
+
+    with pytest.raises(tx.ImportFailed) as failed:
+        tx.import_transactions(email="a@b.c", path=str(path), chunk_size=2)
+
+    # Lines 2 and 3 (the first batch) are saved, 4 and 5 are not.
+    assert (failed.value.result.imported, failed.value.result.last_line) \
+        == (2, 3)
+    assert "through line 3" in str(failed.value)
+    result = tx.import_transactions(
+        email="a@b.c", path=str(path), chunk_size=2, after_line=3
+    )
+    assert result.imported == 3
+    assert [r[3] for r in _stored(sheet)] == ["1", "2", "3", "4", "5"]
@@ -0,0 +1,68 @@
+"""
+monthly_series reports several months from one read of the
+transactions sheet.
+"""
+
+from __future__ import annotations
+
+import pytest
+
+from python_scripts.services import reports
+
+from .conftest import add_user
+
+
+def _spend(fake, rows):
+    fake.worksheet("transactions")._append([
+        [f"t{i}", user, date, cat, amount, "", "2025-11-01 09:00:00"]
+        for i, (user, date, cat, amount) in enumerate(rows)
+    ], "RAW")
+
+
+@pytest.fixture
+def spend(sheet):
+    add_user(sheet, "u1", "a@b.c")
+    _spend(sheet, [
+        ("u1", "2025-08-03", "groceries", 10),
+        ("u2", "2025-08-04", "transport", 20),
+        ("u1", "2025-09-10", "groceries", 60),
+        ("u1", "2025-10-01", "social", 30),
+        ("u1", "2025-10-20", "groceries", 60),
+    ])
+    return sheet
+
+
+def test_series_totals_averages_and_changes(spend):
+    series = reports.monthly_series("2025-10", months=3, window=2)
+
+    assert [s["month"] for s in series] == ["2025-08", "2025-09", "2025-10"]
+    assert [s["total"] for s in series] == [30.0, 60.0, 90.0]
+    # July had no spend: it counts in the average, but gives no change %.
+    assert [s["rolling_avg"] for s in series] == [15.0, 45.0, 75.0]
+    assert [s["change"] for s in series] == [30.0, 30.0, 30.0]
+    assert [s["change_pct"] for s in series] == [None, 100.0, 50.0]
+    assert series[0]["categories"] == {"groceries": 10.0, "transport": 20.0}
+    assert series[1]["category_change"] == {
+        "groceries": 50.0, "transport": -20.0,
+    }
+
+
+def test_series_for_one_user_reads_once(spend):
+    spend.reset_stats()
+
+    series = reports.monthly_series("2025-10", months=3, email="a@b.c")
+
+    assert [s["total"] for s in series] == [10.0, 60.0, 90.0]
+    # Users and transactions together (after listing the worksheets).
+    assert spend.calls[("*", "values_batch_get")] == 1
+    assert spend.total_calls("read") == 2
+
+
+@pytest.mark.parametrize("args", [
+    {"end_month": "2025-1"},
+    {"end_month": "2025-10", "months": 0},
+    {"end_month": "2025-10", "window": 0},
+])
+def test_series_refuses_bad_arguments(sheet, args):
+    with pytest.raises(ValueError):
+        reports.monthly_series(**args)
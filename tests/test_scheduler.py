@@ -0,0 +1,85 @@
+"""
+ApiScheduler: quota and server errors are retried with backoff, other
+errors (and server errors of non-idempotent calls) are not.
+"""
+
+from __future__ import annotations
+
+import time
+
+import pytest
+from gspread.exceptions import APIError
+
+from python_scripts.budget_planner.fake_sheets import _api_error
+from python_scripts.budget_planner.scheduler import (
+    READ,
+    WRITE,
+    ApiScheduler,
+    TokenBucket,
+)
+
+
+def _failing(*codes):
+    """A call that raises an APIError per code, then returns 'ok'."""
+    errors = [_api_error(c, "ERR", "boom") for c in codes]
+
+    def call():
+        if errors:
+            raise errors.pop(0)
+        return "ok"
+    return call
+
+
+def _scheduler(**kwargs):
+    """An unlimited scheduler with millisecond delays it records."""
+    slept = []
+
+    def sleep(seconds):
+        slept.append(seconds)
+        time.sleep(seconds)
+    sched = ApiScheduler(
+        reads_per_min=0, writes_per_min=0, base_delay=0.001, sleep=sleep,
+        **kwargs
+    )
+    return sched, slept
+
+
+def test_quota_and_server_errors_are_retried():
+    sched, slept = _scheduler()
+    assert sched.call(READ, _failing(500, 503)) == "ok"
+    assert sched.retries == 2 and sched.throttled == 0
+    assert len(slept) == 2 and slept[0] <= slept[1] * 2
+
+
+def test_quota_error_pauses_every_caller():
+    sched, slept = _scheduler()
+    sched.call(READ, _failing(429))
+    assert sched.throttled == 1
+    # The wait is a pause shared by all callers, not a private sleep.
+    assert slept and sched.headroom()["paused_for"] == 0.0
+    sched._pause(60)
+    assert sched.headroom()["paused_for"] > 59
+
+
+def test_errors_not_worth_retrying_are_raised():
+    sched, _ = _scheduler(max_retries=3)
+    with pytest.raises(APIError):
+        sched.call(READ, _failing(400))
+    with pytest.raises(APIError):
+        sched.call(WRITE, _failing(500), idempotent=False)
+    assert sched.retries == 0
+
+
+def test_retries_are_limited():
+    sched, slept = _scheduler(max_retries=2)
+    with pytest.raises(APIError):
+        sched.call(READ, _failing(500, 500, 500))
+    assert len(slept) == 2
+
+
+def test_token_bucket_makes_callers_wait():
+    bucket = TokenBucket(60, capacity=1)
+    slept = []
+    bucket.take(slept.append)
+    assert slept == []
+    assert bucket.try_take() > 0
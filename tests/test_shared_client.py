@@ -0,0 +1,82 @@
+"""
+One gspread client and one spreadsheet handle are shared by every
+module, created on first use and dropped by reset_client().
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+
+from python_scripts.budget_planner import sheets_gateway as gw
+from python_scripts.budget_planner.fake_sheets import FakeSpreadsheet
+from python_scripts.utilities.constants import SHEET_HEADERS
+
+
+class _Client:
+    def __init__(self, opened):
+        self.opened = opened
+
+    def open_by_key(self, key):
+        self.opened.append(key)
+        return FakeSpreadsheet().seed(SHEET_HEADERS)
+
+
+@pytest.fixture
+def authorize(monkeypatch):
+    """Count authorizations and spreadsheet opens (no network)."""
+    calls = {"authorize": 0, "opened": []}
+
+    def fake_authorize(creds):
+        calls["authorize"] += 1
+        time.sleep(0.01)  # let other threads reach the lock
+        return _Client(calls["opened"])
+
+    monkeypatch.setenv("SHEET_ID", "sheet-1")
+    monkeypatch.delenv("BP_FAKE_SHEETS", raising=False)
+    monkeypatch.setattr(gw, "load_dotenv", lambda: None)
+    monkeypatch.setattr(gw, "_credentials_from_env", lambda: object())
+    monkeypatch.setattr(gw.gspread, "authorize", fake_authorize)
+    gw.reset_client()
+    yield calls
+    gw.use_sheet(FakeSpreadsheet())
+
+
+def test_client_and_sheet_are_opened_once(authorize):
+    client = gw.get_client()
+    sheet = gw.get_sheet()
+
+    assert gw.get_client() is client
+    assert gw.get_sheet() is sheet
+    assert gw.get_sheet(client) is sheet
+    assert authorize["authorize"] == 1
+    assert authorize["opened"] == ["sheet-1"]
+
+
+def test_threads_share_one_client(authorize):
+    sheets = []
+    threads = [
+        threading.Thread(target=lambda: sheets.append(gw.get_sheet()))
+        for _ in range(8)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len({id(s) for s in sheets}) == 1
+    assert authorize["authorize"] == 1
+    assert len(authorize["opened"]) == 1
+
+
+def test_reset_client_authorizes_again(authorize, monkeypatch):
+    first = gw.get_sheet()
+    monkeypatch.setenv("SHEET_ID", "sheet-2")
+
+    gw.reset_client()
+
+    assert gw.get_sheet() is not first
+    assert authorize["authorize"] == 2
+    assert authorize["opened"] == ["sheet-1", "sheet-2"]
@@ -0,0 +1,83 @@
+"""
+Snapshots round-trip a worksheet, and a tail is appended to the file
+in place; a cut-short or repeated tail is ignored when loading. The
+gateway never keeps a snapshot of the users sheet.
+"""
+
+from __future__ import annotations
+
+import os
+
+import pytest
+
+from python_scripts.budget_planner import sheets_gateway as gw
+from python_scripts.budget_planner.snapshot_store import SnapshotStore
+
+_VALUES = [["txn_id", "note"], ["t1", "café"], ["t2", ""]]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SnapshotStore(str(tmp_path), "sheet-1")
+    store.save("transactions", _VALUES)
+    return store
+
+
+def test_round_trip(store):
+    assert store.load("transactions") == _VALUES
+    assert store.load("users") is None
+    assert SnapshotStore(store.directory, "sheet-2").load(
+        "transactions"
+    ) is None
+
+
+def test_extend_appends_in_place(store):
+    path = store.path("transactions")
+    with open(path, "rb") as fh:
+        before = fh.read()
+    store.extend("transactions", 2, [["t3", "x", "cut"], ["t4"]])
+    with open(path, "rb") as fh:
+        after = fh.read()
+    assert after.startswith(before)
+    assert store.load("transactions") == _VALUES + [
+        ["t3", "x"], ["t4", ""]
+    ]
+
+
+def test_extend_out_of_step_discards(store):
+    store.extend("transactions", 5, [["t9", ""]])
+    assert not os.path.exists(store.path("transactions"))
+
+
+def test_cut_short_and_repeated_tails_are_ignored(store):
+    path = store.path("transactions")
+    store.extend("transactions", 2, [["t3", ""]])
+    with open(path, "rb") as fh:
+        data = fh.read()
+    with open(path, "ab") as fh:
+        fh.write(data[-30:-5])
+    assert store.load("transactions") == _VALUES + [["t3", ""]]
+    # The next tail replaces the cut-short bytes.
+    store.extend("transactions", 3, [["t4", ""]])
+    assert store.load("transactions")[-1] == ["t4", ""]
+    # The same tail added twice (two sessions) is read once.
+    size = os.path.getsize(path)
+    with open(path, "rb") as fh:
+        data = fh.read()
+    with open(path, "ab") as fh:
+        fh.write(data[size - 26:])  # the last block, again
+    assert len(store.load("transactions")) == 5
+
+
+def test_users_sheet_is_never_kept(store, sheet, monkeypatch):
+    users = [["user_id", "email", "password_hash"], ["u1", "a@b.c", "$2b"]]
+    store.save("users", users)  # left by an older version
+    monkeypatch.setattr(gw, "get_snapshots", lambda: store)
+
+    assert gw.warm_start(["users"]) == []
+    assert not os.path.exists(store.path("users"))
+    gw._write_snapshot("save", "users", users)
+    gw._write_snapshot("save", "budget", [["user_id"], ["u1"]])
+    gw._snapshot_writer.submit(lambda: None).result()
+    assert not os.path.exists(store.path("users"))
+    assert store.load("budget") == [["user_id"], ["u1"]]
@@ -0,0 +1,57 @@
+"""
+Month totals count every row whose date starts with the month, as the
+original reports did; date ranges count rows with a full date.
+"""
+
+from __future__ import annotations
+
+from python_scripts.services import budgets as bud
+from python_scripts.services import reports
+from python_scripts.services import transactions as tx
+
+from .conftest import add_user
+
+_ROWS = [
+    ("t1", "u1", "2025-10-01", "groceries", "10"),
+    ("t2", "u1", "2025-10", "groceries", "20"),
+    ("t3", "u1", "2025-10-5", "transport", "4"),
+    ("t4", "u1", "", "groceries", "1.5"),
+    ("t5", "u2", "2025-10-03", "groceries", "100"),
+    ("t6", "u1", "2025-09-30", "groceries", "7"),
+]
+
+
+def _seed(fake):
+    add_user(fake, "u1", "a@b.c")
+    add_user(fake, "u2", "z@b.c")
+    fake.worksheet("transactions")._append(
+        [list(r) + ["", "2025-10-01 10:00:00"] for r in _ROWS], "RAW"
+    )
+    fake.worksheet("budget")._append(
+        [["b1", "u1", "2025-10", "groceries", "50"]], "RAW"
+    )
+
+
+def test_month_total_counts_loose_dates(sheet):
+    _seed(sheet)
+    assert reports.monthly_total("2025-10") == 134.0
+    assert reports.monthly_total("2025-10", "a@b.c") == 34.0
+
+
+def test_goals_vs_spend_counts_loose_dates(sheet):
+    _seed(sheet)
+    month = bud.goals_vs_spend(email="a@b.c", month="2025-10")
+    assert month[0]["spent"] == 30.0
+    # Without a month every groceries row of the user counts.
+    overall = bud.goals_vs_spend(email="a@b.c", month=None)
+    assert overall[0]["spent"] == 38.5
+
+
+def test_range_total_needs_full_dates(sheet):
+    _seed(sheet)
+    assert reports.range_total("2025-09-30", "2025-10-01", "a@b.c") == 17.0
+    assert reports.range_total("2025-10-01", None) == 110.0
+    summary = tx.summarize_by_category(
+        email="a@b.c", date_from="2025-09-01", date_to="2025-10-31"
+    )
+    assert summary == {"groceries": 17.0}
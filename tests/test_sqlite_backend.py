@@ -0,0 +1,160 @@
+"""
+SqliteBackend: lookups match the Sheets backend, projections and
+filtered reads are read and patched like whole tables, and other
+connections' commits show.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+
+import pytest
+
+from python_scripts.budget_planner.storage import SqliteBackend
+
+_SCHEMAS = {
+    "Role": ["email", "role"],
+    "transactions": ["txn_id", "user_id", "date", "amount", "note"],
+    "budget": ["budget_id", "user_id", "month", "category_norm",
+               "monthly_goal"],
+}
+
+
+@pytest.fixture
+def db(tmp_path):
+    backend = SqliteBackend(str(tmp_path / "bp.db"), _SCHEMAS)
+    backend.append_rows("Role", [[" Ann@B.c ", "editor"], ["z@b.c", "user"]])
+    backend.append_rows("transactions", [
+        ["t1", "u1", "2025-10-01", "10", "lunch"],
+        ["t2", "u2", "2025-10-02", "2.5", ""],
+    ])
+    return backend
+
+
+def test_find_row_compares_trimmed_text(db):
+    found = db.find_row("Role", {"email": "ann@b.c"})
+    assert found is not None
+    assert found[0] == 2 and found[1]["role"] == "editor"
+    assert db.find_row("Role", {"email": "nobody@b.c"}) is None
+
+
+def test_find_row_uses_an_index(db):
+    db.read_table("Role")
+    plan = db._conn.execute(
+        'EXPLAIN QUERY PLAN SELECT rowid FROM "Role" '
+        'WHERE TRIM("email") COLLATE NOCASE = ?', ("ann@b.c",)
+    ).fetchall()
+    assert "USING INDEX" in plan[0][3]
+
+
+def test_read_tables_selects_only_the_columns_asked_for(db):
+    spec = {"transactions": (None, "")}
+    entry = db.read_tables(spec, {"transactions": ["amount", "user_id"]})[
+        "transactions"
+    ]
+    assert entry.headers == ["user_id", "amount"]
+    assert entry.columns == [2, 4]
+    db.append_rows("transactions", [["t3", "u1", "2025-10-03", "4", "x"]])
+    assert entry.records[-1] == {"user_id": "u1", "amount": 4}
+    db.update_cells("transactions", [(2, 4, "11")])
+    assert entry.records[0]["amount"] == 11
+    # A whole table in memory is used instead of a projection.
+    full = db.read_table("transactions")
+    assert db.read_tables(spec, {"transactions": ["amount"]})[
+        "transactions"
+    ] is full
+
+
+def test_other_connections_writes_are_seen(db):
+    entry = db.read_table("transactions")
+    other = sqlite3.connect(db.path)
+    with other:
+        other.execute(
+            'INSERT INTO "transactions" (txn_id, user_id, date, amount, '
+            'note) VALUES (?, ?, ?, ?, ?)',
+            ("t9", "u9", "2025-10-09", "1", ""),
+        )
+    other.close()
+    fresh = db.read_table("transactions")
+    assert fresh is not entry
+    assert [r["txn_id"] for r in fresh.records] == ["t1", "t2", "t9"]
+
+
+def test_read_rows_reads_the_store(db):
+    rows = db.read_rows("transactions", [3, 2, 9], _SCHEMAS["transactions"])
+    assert sorted(rows) == [2, 3]
+    assert rows[3]["txn_id"] == "t2"
+
+
+def _plan(db, sql, *args):
+    return " ".join(
+        r[3] for r in db._conn.execute("EXPLAIN QUERY PLAN " + sql, args)
+    )
+
+
+def test_filters_use_indexes(db):
+    db.read_table("budget")
+    trimmed = 'TRIM("{}") COLLATE NOCASE'.format
+    assert "USING INDEX" in _plan(
+        db, f'SELECT * FROM "transactions" WHERE {trimmed("user_id")} = ?',
+        "u1",
+    )
+    assert "USING INDEX" in _plan(
+        db, f'SELECT * FROM "transactions" WHERE {trimmed("date")} >= ? '
+        f'AND {trimmed("date")} < ?', "2025-10", "2025-10\U0010ffff",
+    )
+    assert "USING INDEX" in _plan(
+        db, f'SELECT * FROM "budget" WHERE {trimmed("user_id")} = ? '
+        f'AND {trimmed("month")} = ?', "u1", "2025-10",
+    )
+
+
+def test_read_tables_selects_only_the_rows_asked_for(db):
+    spec = {"transactions": (None, "")}
+    where = {"transactions": [("user_id", "=", " U1"),
+                              ("date", "^", "2025-10")]}
+    entry = db.read_tables(spec, {"transactions": ["amount"]}, where)[
+        "transactions"
+    ]
+    assert entry.records == [{"amount": 10}]
+    assert db.cached_table("transactions") is None
+    assert db.read_tables(spec, {"transactions": ["amount"]}, where)[
+        "transactions"
+    ] is entry
+    db.append_rows("transactions", [
+        ["t3", "u1", "2025-10-03", "4", ""],
+        ["t4", "u2", "2025-10-03", "5", ""],
+        ["t5", "u1", "2025-11-01", "6", ""],
+    ])
+    assert entry.records == [{"amount": 10}, {"amount": 4}]
+    # Filtered copies are not numbered like sheet rows: writes drop them.
+    db.update_cells("transactions", [(2, 4, "11")])
+    fresh = db.read_tables(spec, {"transactions": ["amount"]}, where)[
+        "transactions"
+    ]
+    assert fresh is not entry
+    assert fresh.records == [{"amount": 11}, {"amount": 4}]
+
+
+def test_row_numbers_survive_vacuum(tmp_path):
+    path = str(tmp_path / "old.db")
+    # A table made before the explicit row key, with a gap in rowids.
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.execute('CREATE TABLE "Role" ("email", "role")')
+        conn.executemany('INSERT INTO "Role" VALUES (?, ?)', [
+            ("a@b.c", "user"), ("b@b.c", "user"), ("c@b.c", "editor"),
+        ])
+        conn.execute('DELETE FROM "Role" WHERE rowid = 1')
+    conn.close()
+
+    db = SqliteBackend(path, _SCHEMAS)
+    assert db.find_row("Role", {"email": "c@b.c"})[0] == 4
+    db._conn.execute("VACUUM")
+    db.update_cells("Role", [(4, 2, "user")])
+    rows = db.read_rows("Role", [3, 4], _SCHEMAS["Role"])
+    assert rows == {3: {"email": "b@b.c", "role": "user"},
+                    4: {"email": "c@b.c", "role": "user"}}
+    assert [r["email"] for r in db.read_table("Role").records] == [
+        "b@b.c", "c@b.c",
+    ]
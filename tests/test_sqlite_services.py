@@ -0,0 +1,83 @@
+"""
+The services give the same answers on the SQLite backend, reading only
+the spend columns of the rows they filter for and patching them on
+writes.
+"""
+
+from __future__ import annotations
+
+from python_scripts.services import budgets as bud
+from python_scripts.services import reports
+from python_scripts.services import transactions as tx
+
+
+def _add(email, date, category, amount):
+    return tx.add_transaction(
+        email=email, date=date, category=category, amount=amount
+    )
+
+
+def test_spend_and_goals(sqlite_db):
+    _add("a@b.c", "2025-10-01", "Groceries", 10)
+    _add("a@b.c", "2025-10-15", "transport", 4.5)
+    _add("z@b.c", "2025-10-02", "groceries", 100)
+    assert tx.summarize_by_category(email="a@b.c") == {
+        "groceries": 10.0, "transport": 4.5,
+    }
+    assert reports.monthly_total("2025-10") == 114.5
+    assert reports.range_total("2025-10-02", "2025-10-31", "a@b.c") == 4.5
+    # Written after the projection was read: patched into it.
+    _add("a@b.c", "2025-10-20", "groceries", 2)
+    assert tx.summarize_by_category(email="a@b.c")["groceries"] == 12.0
+
+    bud.set_goals(email="a@b.c", month="2025-10",
+                  goals={"groceries": 50, "transport": 5})
+    bud.set_goal(email="a@b.c", month="2025-10", category="groceries",
+                 amount=40)
+    rows = {r["category"]: r for r in bud.goals_vs_spend(
+        email="a@b.c", month="2025-10"
+    )}
+    assert rows["groceries"]["goal"] == 40.0
+    assert rows["groceries"]["spent"] == 12.0
+    assert len(sqlite_db.read_table("budget").records) == 2
+
+
+def test_listing_pages(sqlite_db):
+    ids = [_add("a@b.c", f"2025-10-{d:02d}", "misc", d) for d in (1, 2, 3)]
+    page = tx.list_transactions(email="a@b.c", page_size=2)
+    assert len(page) == 2
+    rest = tx.list_transactions(
+        email="a@b.c", page_size=2, after=tx.cursor_of(page[-1])
+    )
+    assert {r["txn_id"] for r in page + rest} == set(ids)
+    dated = tx.list_transactions(
+        email="a@b.c", date_from="2025-10-02", date_to="2025-10-02"
+    )
+    assert [r["amount"] for r in dated] == [2]
+
+
+def test_filters_are_sent_to_the_store(sqlite_db):
+    _add("a@b.c", "2025-10-01", "groceries", 10)
+    _add("z@b.c", "2025-10-02", "groceries", 100)
+    _add("z@b.c", "2025-09-02", "groceries", 1000)
+    bud.set_goal(email="z@b.c", month="2025-10", category="groceries",
+                 amount=5)
+    sqlite_db.invalidate("transactions")
+    sqlite_db.invalidate("budget")
+
+    assert tx.summarize_by_category(email="a@b.c") == {"groceries": 10.0}
+    assert tx.list_transactions(date="2025-10-02")[0]["amount"] == 100
+    assert reports.monthly_total("2025-10") == 110.0
+    assert bud.list_goals(email="a@b.c") == []
+    assert [r["spent"] for r in bud.goals_vs_spend(
+        email="z@b.c", month="2025-10"
+    )] == [100.0]
+    assert [r["email"] for r in bud.goals_vs_spend_all(
+        month="2025-10"
+    )] == ["z@b.c"]
+
+    # Every answer came from filtered reads, not the whole tables.
+    assert sqlite_db.cached_table("transactions") is None
+    assert sqlite_db.cached_table("budget") is None
+    held = sqlite_db._filtered["transactions"]
+    assert max(len(e.records) for _, e in held.values()) == 2
@@ -0,0 +1,72 @@
+"""
+TableCache: expiry, the memory budget, and writes patched into whole
+tables and their projections.
+"""
+
+from __future__ import annotations
+
+from python_scripts.budget_planner.table_cache import (
+    TableCache,
+    charge,
+    table_key,
+)
+
+_HEADERS = ["txn_id", "user_id", "amount"]
+
+
+def _put(cache, key="transactions", columns=None):
+    """Store one row of 100 bytes (only the given sheet columns)."""
+    cols = columns or [1, 2, 3]
+    headers = [_HEADERS[c - 1] for c in cols]
+    row = ["t1", "u1", 5]
+    record = {h: row[c - 1] for h, c in zip(headers, cols)}
+    return cache.put(key, headers, [record], 100, columns=columns)
+
+
+def test_expired_entries_are_kept_but_not_served():
+    cache = TableCache(ttl=30)
+    entry = _put(cache)
+    assert cache.get("transactions") is entry
+    entry.loaded_at -= 60
+    assert cache.get("transactions") is None
+    assert cache.peek("transactions") is entry
+    assert cache.store("transactions", entry) is entry
+    assert cache.get("transactions") is entry
+
+
+def test_least_recently_used_is_evicted_over_budget():
+    cache = TableCache(ttl=30, max_bytes=250)
+    _put(cache, "users")
+    _put(cache, "budget")
+    cache.get("users")
+    _put(cache, "transactions")
+    assert cache.peek("budget") is None
+    assert cache.peek("users") is not None
+    assert cache._bytes == 200
+
+
+def test_charge_counts_derived_data_and_evicts():
+    cache = TableCache(ttl=30, max_bytes=250)
+    users = _put(cache, "users")
+    budget = _put(cache, "budget")
+    charge(budget, 100)
+    assert budget.size == 200 and cache._bytes == 300 - 100
+    assert cache.peek("users") is None
+    charge(users, 10)  # not stored any more: only the entry grows
+    assert users.size == 110 and cache._bytes == 200
+
+
+def test_writes_patch_tables_and_projections():
+    cache = TableCache(ttl=30)
+    full = _put(cache)
+    key = table_key("transactions", ["txn_id", "amount"])
+    part = _put(cache, key, columns=[1, 3])
+    cache.append("transactions", [["t2", "u2", "7"]])
+    assert full.records[-1] == {"txn_id": "t2", "user_id": "u2",
+                                "amount": 7}
+    assert part.records[-1] == {"txn_id": "t2", "amount": 7}
+    cache.update("transactions", 3, 3, "8")
+    assert full.records[1]["amount"] == 8 and part.records[1]["amount"] == 8
+    # A cell outside the rows held drops the tables instead.
+    cache.update("transactions", 9, 1, "x")
+    assert cache.peek("transactions") is None and cache.peek(key) is None
@@ -0,0 +1,137 @@
+"""
+An expired transactions table is refreshed by reading only its new
+rows, into the same entry when it can be, so the views built over it
+are extended instead of rebuilt.
+"""
+
+from __future__ import annotations
+
+from python_scripts.budget_planner import sheets_gateway as gw
+from python_scripts.services import transactions as tx
+from python_scripts.services import txn_columns
+
+from .conftest import add_user
+
+
+def _row(i, user="u1", date="2025-10-01", amount="1"):
+    return [f"t{i}", user, date, "groceries", amount, "",
+            f"2025-10-01 10:00:{i:02d}"]
+
+
+def _append(fake, rows):
+    fake.worksheet("transactions")._append(rows, "RAW")
+
+
+def _entry():
+    return gw.read_table(gw.get_worksheet("transactions"))
+
+
+def _expire(entry):
+    entry.loaded_at -= 3600
+
+
+def test_tail_refresh_extends_the_same_entry(sheet):
+    add_user(sheet, "u1", "a@b.c")
+    _append(sheet, [_row(i) for i in range(3)])
+    entry = _entry()
+    recency = txn_columns.recency_for(entry)
+    _append(sheet, [_row(3), _row(4)])
+    _expire(entry)
+    sheet.reset_stats()
+
+    assert _entry() is entry
+    assert sheet.calls == {("*", "values_batch_get"): 1}
+    assert [r["txn_id"] for r in entry.records][-2:] == ["t3", "t4"]
+    page = tx.list_transactions(email="a@b.c", page_size=2)
+    assert [r["txn_id"] for r in page] == ["t4", "t3"]
+    assert txn_columns.recency_for(entry) is recency
+
+
+def test_own_appends_are_not_added_twice(sheet, monkeypatch):
+    monkeypatch.setenv("BP_TXN_BUFFER_ROWS", "1")
+    add_user(sheet, "u1", "a@b.c")
+    _append(sheet, [_row(0)])
+    entry = _entry()
+    rollup = txn_columns.rollup_for(entry)
+    tx.add_transaction(email="a@b.c", date="2025-10-02",
+                       category="groceries", amount=5)
+    gw.flush_buffers()
+    _append(sheet, [_row(9)])
+    _expire(entry)
+
+    assert _entry() is entry
+    assert len(entry.records) == 3
+    assert txn_columns.rollup_for(entry) is rollup
+    assert rollup.total(month="2025-10") == 7.0
+
+
+def test_other_writers_in_between_give_a_new_entry(sheet, monkeypatch):
+    monkeypatch.setenv("BP_TXN_BUFFER_ROWS", "1")
+    add_user(sheet, "u1", "a@b.c")
+    _append(sheet, [_row(0)])
+    entry = _entry()
+    # Another session saves a row before ours reaches the sheet.
+    _append(sheet, [_row(1, amount="2")])
+    tx.add_transaction(email="a@b.c", date="2025-10-02",
+                       category="groceries", amount=5)
+    gw.flush_buffers()
+    _expire(entry)
+
+    fresh = _entry()
+    assert fresh is not entry
+    assert [r["amount"] for r in fresh.records] == [1, 2, 5]
+
+
+def test_removed_rows_force_a_full_download(sheet):
+    add_user(sheet, "u1", "a@b.c")
+    _append(sheet, [_row(i) for i in range(3)])
+    entry = _entry()
+    ws = sheet.worksheet("transactions")
+    del ws._rows[2]
+    _expire(entry)
+    sheet.reset_stats()
+
+    fresh = _entry()
+    assert [r["txn_id"] for r in fresh.records] == ["t0", "t2"]
+    assert sheet.calls[("*", "values_batch_get")] == 2
+
+
+def test_add_transaction_builds_no_views(sheet):
+    add_user(sheet, "u1", "a@b.c")
+    entry = _entry()
+    tx.add_transaction(email="a@b.c", date="2025-10-02",
+                       category="groceries", amount=5)
+    assert id(entry) not in txn_columns._views
+
+
+def test_projection_is_refreshed_by_its_tail(sheet):
+    add_user(sheet, "u1", "a@b.c")
+    _append(sheet, [_row(i) for i in range(3)])
+    assert tx.summarize_by_category(email="a@b.c") == {"groceries": 3.0}
+    cache = gw.get_cache()
+    (key,) = [k for k in cache._entries if k != "transactions"
+              and k.startswith("transactions")]
+    entry = cache._entries[key]
+    assert "txn_id" in entry.headers and "note" not in entry.headers
+    _append(sheet, [_row(3, amount="4")])
+    for stored in cache._entries.values():
+        _expire(stored)
+    sheet.reset_stats()
+
+    assert tx.summarize_by_category(email="a@b.c") == {"groceries": 7.0}
+    assert cache._entries[key] is entry
+    assert sheet.calls[("*", "values_batch_get")] == 1
+    assert "transactions" not in cache._entries
+
+
+def test_evicted_table_is_downloaded_whole(sheet):
+    add_user(sheet, "u1", "a@b.c")
+    _append(sheet, [_row(i) for i in range(3)])
+    entry = _entry()
+    gw.get_cache().invalidate("transactions")
+    del entry
+    _append(sheet, [_row(3)])
+    sheet.reset_stats()
+
+    assert len(_entry().records) == 4
+    assert sheet.total_calls("read") == 1
@@ -0,0 +1,53 @@
+"""
+command_scope: each table is read once per command, writes are queued
+and sent together at the end, and a failed save drops the tables the
+writes were meant for.
+"""
+
+from __future__ import annotations
+
+import pytest
+
+from python_scripts.budget_planner import sheets_gateway as gw
+from python_scripts.budget_planner.unit_of_work import FlushError
+
+
+def _budget():
+    return gw.get_worksheet("budget")
+
+
+def test_tables_are_read_once_per_command(sheet):
+    with gw.command_scope():
+        first = gw.read_table(_budget())
+        first.loaded_at -= 3600  # expired in the cache
+        assert gw.read_table(_budget()) is first
+    assert sheet.calls[("budget", "get_all_values")] == 1
+
+
+def test_writes_are_sent_together_at_the_end(sheet):
+    ws = _budget()
+    with gw.command_scope():
+        gw.read_table(ws)
+        gw.append_rows(ws, [["b1", "u1", "2025-10", "food", "10"]])
+        gw.append_rows(ws, [["b2", "u1", "2025-10", "bus", "5"]])
+        gw.update_cell(ws, 2, 5, "12")
+        # Patched in memory, not saved yet.
+        assert sheet.total_calls("write") == 0
+        assert gw.read_table(ws).records[0]["monthly_goal"] == 12
+    assert sheet.calls[("budget", "append_rows")] == 1
+    assert sheet.calls[("budget", "batch_update")] == 1
+    assert sheet.worksheet("budget")._snapshot()[1][4] == "12"
+
+
+def test_failed_save_drops_the_cached_table(sheet, monkeypatch):
+    ws = _budget()
+    gw.read_table(ws)
+
+    def refuse(*args, **kwargs):
+        raise ConnectionError("offline")
+    monkeypatch.setattr(ws, "append_rows", refuse)
+    with pytest.raises(FlushError) as info:
+        with gw.command_scope():
+            gw.append_rows(ws, [["b1", "u1", "2025-10", "food", "10"]])
+    assert info.value.titles == ["budget"]
+    assert gw.get_cache().peek("budget") is None
@@ -0,0 +1,70 @@
+"""
+User and role rows are found in cached copies of their sheets; a row
+number from one must be checked against the stored row before it is
+written to.
+"""
+
+from __future__ import annotations
+
+from python_scripts.budget_planner import auth
+
+from .conftest import add_user, values
+
+
+def test_password_update_after_row_removed_hits_right_user(sheet):
+    add_user(sheet, "u1", "a@b.c")
+    add_user(sheet, "u2", "z@b.c")
+    add_user(sheet, "u3", "q@b.c")
+    # Warm the index: z@b.c is row 3 in our copy.
+    assert auth.get_user_by_email("z@b.c")["user_id"] == "u2"
+    sheet.worksheet("users").delete_rows(2)
+
+    auth.update_password_hash("z@b.c", "NEWHASH")
+
+    rows = {r[1]: r[2] for r in values(sheet, "users")[1:]}
+    assert rows["z@b.c"] == "NEWHASH"
+    assert rows["q@b.c"] != "NEWHASH"
+
+
+def test_password_update_hit_reads_the_row_back(sheet):
+    add_user(sheet, "u1", "a@b.c")
+    auth.get_user_by_email("a@b.c")
+    sheet.reset_stats()
+
+    auth.update_password_hash("a@b.c", "NEWHASH")
+
+    # One batchGet of the target row, one write; no table download.
+    assert sheet.calls[("*", "values_batch_get")] == 1
+    assert sheet.total_calls("write") == 1
+    assert values(sheet, "users")[1][2] == "NEWHASH"
+
+
+def _add_role(fake, email, role):
+    fake.worksheet("Role")._append([[email, role]], "RAW")
+
+
+def test_set_role_after_row_removed_hits_right_email(sheet):
+    for email in ("a@b.c", "b@b.c", "c@b.c"):
+        _add_role(sheet, email, "user")
+    # Warm the cached Role table.
+    assert auth.get_role("c@b.c") == "user"
+    sheet.worksheet("Role").delete_rows(2)
+
+    auth.set_role("b@b.c", "editor")
+
+    assert values(sheet, "Role")[1:] == [
+        ["b@b.c", "editor"], ["c@b.c", "user"],
+    ]
+
+
+def test_set_role_finds_row_added_by_another_session(sheet):
+    _add_role(sheet, "a@b.c", "user")
+    assert auth.get_role("b@b.c") == "user"
+    _add_role(sheet, "b@b.c", "user")
+
+    auth.set_role("b@b.c", "editor")
+
+    # Updated in place rather than appended after the stale miss.
+    assert values(sheet, "Role")[1:] == [
+        ["a@b.c", "user"], ["b@b.c", "editor"],
+    ]
@@ -0,0 +1,54 @@
+"""
+Views over the transactions table are counted in the cache budget, and
+the daily spend view stays small however wide its date span.
+"""
+
+from __future__ import annotations
+
+from python_scripts.budget_planner import sheets_gateway as gw
+from python_scripts.services import reports
+from python_scripts.services import txn_columns
+
+from .conftest import add_user
+
+
+def _seed(fake, dates):
+    add_user(fake, "u1", "a@b.c")
+    fake.worksheet("transactions")._append(
+        [
+            [f"t{i}", "u1", d, "groceries", "1", "", "2025-01-01 10:00:00"]
+            for i, d in enumerate(dates)
+        ],
+        "RAW",
+    )
+
+
+def _entry():
+    """The cached transactions table (or projection) the reports read."""
+    cache = gw.get_cache()
+    keys = [k for k in cache._entries if k.startswith("transactions")]
+    assert keys
+    return cache._entries[keys[0]]
+
+
+def test_views_are_charged_to_the_cache(sheet):
+    _seed(sheet, ["2025-10-01", "2025-10-02"])
+    reports.monthly_total("2025-10")
+    entry = _entry()
+    cache = gw.get_cache()
+    before, total = entry.size, cache._bytes
+    daily = txn_columns.daily_for(entry)
+    assert entry.size > before
+    assert cache._bytes - total == entry.size - before
+    assert daily.nbytes < entry.size
+
+
+def test_daily_spend_is_sparse_over_wide_ranges(sheet):
+    _seed(sheet, ["1900-01-01", "2199-12-31", "2025-06-15"])
+    reports.monthly_total("2025-06")
+    entry = _entry()
+    daily = txn_columns.daily_for(entry)
+    # Three cells for the user plus three for all users.
+    assert daily.nbytes < 4096
+    assert reports.range_total("1900-01-01", "2199-12-31") == 3.0
+    assert reports.range_total("2025-06-01", "2025-06-30", "a@b.c") == 1.0
@@ -0,0 +1,58 @@
+"""
+WriteBuffer: rows are sent together, and a retry after a failed flush
+never saves a row twice.
+"""
+
+from __future__ import annotations
+
+import pytest
+
+from python_scripts.budget_planner.fake_sheets import FakeSpreadsheet
+from python_scripts.budget_planner.write_buffer import WriteBuffer
+
+
+class _LostResponse:
+    """A worksheet whose next append is saved but reported as failed."""
+
+    def __init__(self, ws):
+        self.ws = ws
+        self.fail_next = False
+
+    def append_rows(self, rows, **kwargs):
+        self.ws.append_rows(rows, **kwargs)
+        if self.fail_next:
+            self.fail_next = False
+            raise ConnectionError("response lost")
+
+    def col_values(self, col):
+        return self.ws.col_values(col)
+
+
+@pytest.fixture
+def ws():
+    fake = FakeSpreadsheet().seed({"transactions": ["txn_id", "amount"]})
+    return fake.worksheet("transactions")
+
+
+def test_rows_are_sent_in_one_call_when_full(ws):
+    buf = WriteBuffer(ws, max_rows=3, max_age=3600)
+    for i in range(3):
+        buf.add([f"t{i}", i])
+        assert buf.is_due() == (i == 2)
+    assert buf.flush() == 3
+    assert ws.spreadsheet.calls[("transactions", "append_rows")] == 1
+    assert buf.pending() == [] and not buf.is_due()
+
+
+def test_retry_skips_rows_already_saved(ws):
+    target = _LostResponse(ws)
+    buf = WriteBuffer(target, max_rows=10, max_age=0)
+    buf.add(["t1", 1])
+    target.fail_next = True
+    with pytest.raises(ConnectionError):
+        buf.flush()
+    assert buf.uncertain and buf.pending() == [["t1", 1]]
+    buf.add(["t2", 2])
+    assert buf.flush() == 1
+    assert not buf.uncertain
+    assert ws.col_values(1) == ["txn_id", "t1", "t2"]
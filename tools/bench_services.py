@@ -0,0 +1,127 @@
+"""
+Time the service functions against the in-memory fake spreadsheet.
+
+No credentials or network are needed. Example:
+
+    python -m tools.bench_services --users 50 --txns 20000 --latency-ms 80
+"""
+
+import argparse
+import random
+import time
+import uuid
+
+from python_scripts.budget_planner import auth
+from python_scripts.budget_planner import sheets_gateway as gw
+from python_scripts.budget_planner.fake_sheets import FakeSpreadsheet
+from python_scripts.services import budgets as bud
+from python_scripts.services import reports
+from python_scripts.services import transactions as tx
+from python_scripts.utilities.constants import (
+    ALLOWED_CATEGORIES,
+    SHEET_HEADERS,
+)
+
+
+def seed(sheet: FakeSpreadsheet, users: int, txns: int) -> list:
+    """Fill the fake sheet with users, transactions and goals."""
+    emails = [f"user{i}@example.com" for i in range(users)]
+    ids = [str(uuid.uuid4()) for _ in emails]
+    pw_hash = auth.hash_password("secret123")
+    user_rows = [
+        [uid, email, pw_hash, "2025-01-01 00:00:00"]
+        for uid, email in zip(ids, emails)
+    ]
+    sheet.worksheet("users")._append(user_rows, "RAW")
+
+    rng = random.Random(42)
+    txn_rows = []
+    for _ in range(txns):
+        month = rng.randint(1, 12)
+        day = rng.randint(1, 28)
+        date = f"2025-{month:02d}-{day:02d}"
+        txn_rows.append([
+            str(uuid.uuid4()),
+            rng.choice(ids),
+            date,
+            rng.choice(ALLOWED_CATEGORIES),
+            round(rng.uniform(1, 200), 2),
+            "",
+            f"{date} 12:00:00",
+        ])
+    sheet.worksheet("transactions")._append(txn_rows, "USER_ENTERED")
+
+    goal_rows = [
+        [str(uuid.uuid4()), uid, f"2025-{m:02d}", cat, 100]
+        for uid in ids
+        for m in range(1, 13)
+        for cat in ALLOWED_CATEGORIES
+    ]
+    sheet.worksheet("budget")._append(goal_rows, "USER_ENTERED")
+    sheet.reset_stats()
+    return emails
+
+
+def timed(
+    sheet: FakeSpreadsheet, label: str, func, repeat: int, cold: bool
+) -> None:
+    """Run func repeat times inside a command scope and print the cost."""
+    sheet.reset_stats()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        if cold:
+            gw.get_cache().clear()
+        with gw.command_scope():
+            func()
+    elapsed = (time.perf_counter() - started) / repeat
+    calls = sheet.total_calls() / repeat
+    print(f"{label:<28} {elapsed * 1000:9.2f} ms  {calls:6.1f} calls")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--txns", type=int, default=5000)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--cold",
+        action="store_true",
+        help="Empty the table cache before every run.",
+    )
+    args = parser.parse_args()
+
+    sheet = FakeSpreadsheet().seed(SHEET_HEADERS)
+    emails = seed(sheet, args.users, args.txns)
+    gw.use_sheet(sheet)
+    sheet.latency = args.latency_ms / 1000.0
+    email = emails[0]
+
+    print(f"{args.users} users, {args.txns} transactions, "
+          f"{args.latency_ms:g} ms latency per call")
+    category = ALLOWED_CATEGORIES[0]
+    cases = [
+        ("list_transactions",
+         lambda: tx.list_transactions(email=email)),
+        ("summarize_by_category",
+         lambda: tx.summarize_by_category(email=email)),
+        ("monthly_total",
+         lambda: reports.monthly_total("2025-06", email)),
+        ("monthly_series",
+         lambda: reports.monthly_series("2025-06", 12, email)),
+        ("goals_vs_spend",
+         lambda: bud.goals_vs_spend(email=email, month="2025-06")),
+        ("set_goal",
+         lambda: bud.set_goal(email=email, month="2025-06",
+                              category=category, amount=150)),
+        ("add_transaction",
+         lambda: tx.add_transaction(email=email, date="2025-06-01",
+                                    category=category, amount=12.5)),
+    ]
+    for label, func in cases:
+        timed(sheet, label, func, args.repeat, args.cold)
+    gw.flush_buffers()
+
+
+if __name__ == "__main__":
+    main()